@@ -0,0 +1,66 @@
+import argparse
+from typing import Union
+from name_matching.server import serve
+
+
+def main(args: Union[list, None] = None) -> None:
+    """
+    The command line interface of the name_matching package. The serve command loads
+    an index stored with NameMatcher.save_index and serves match requests over HTTP:
+
+        python -m name_matching serve --index path/to/index --port 8000
+
+    The served index can only be replaced over HTTP if --reload-root is given, and
+    then only by the indexes under that directory.
+
+    Parameters
+    ----------
+    args : Union[list, None]
+        The command line arguments, if None the arguments of the process are used
+        default=None
+    """
+    parser = argparse.ArgumentParser(prog="python -m name_matching")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser(
+        "serve", help="serve match requests for a saved index over HTTP"
+    )
+    serve_parser.add_argument(
+        "--index", required=True, help="the directory of the saved index"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument(
+        "--mmap-mode", default=None, help="memory map the index with this mode, e.g. r"
+    )
+    serve_parser.add_argument("--top-n", type=int, default=50)
+    serve_parser.add_argument("--number-of-matches", type=int, default=1)
+    serve_parser.add_argument("--min-cosine", type=float, default=0)
+    serve_parser.add_argument("--score-cache-size", type=int, default=0)
+    serve_parser.add_argument(
+        "--log-requests", action="store_true", help="log every request to stderr"
+    )
+    serve_parser.add_argument(
+        "--reload-root",
+        default=None,
+        help="enable /reload for the indexes under this trusted directory",
+    )
+
+    args = parser.parse_args(args)
+    if args.command == "serve":
+        serve(
+            args.index,
+            host=args.host,
+            port=args.port,
+            mmap_mode=args.mmap_mode,
+            log_requests=args.log_requests,
+            reload_root=args.reload_root,
+            top_n=args.top_n,
+            number_of_matches=args.number_of_matches,
+            min_cosine=args.min_cosine,
+            score_cache_size=args.score_cache_size,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import numpy as np
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Tuple, Union
+from name_matching.name_matcher import NameMatcher, Match
+
+
+class AsyncNameMatcher:
+    """
+    An asyncio front-end for a NameMatcher which coalesces concurrent requests into
+    micro-batches. The names of the requests which arrive while a batch is being
+    collected are matched with a single call of match_batch, such that the sparse
+    cosine similarity and the fuzzy matching are done for the whole batch at once.
+    A batch is matched as soon as it contains max_batch_size names or when max_wait
+    seconds have passed since its first request arrived. The batches are matched one
+    at a time in the executor, so the event loop is not blocked and the NameMatcher
+    is never used by two threads at once.
+
+    Parameters
+    ----------
+    matcher : NameMatcher
+        The NameMatcher, with the master data loaded, which is used for the matching.
+        Setting verbose=False for this NameMatcher prevents progress printing for
+        every batch.
+    max_batch_size : int
+        The maximum number of names which are matched at once
+        default=256
+    max_wait : float
+        The maximum number of seconds a request waits for other requests to be added
+        to its batch
+        default=0.005
+    executor : Union[Executor, None]
+        The executor in which the batches are matched. If None a single thread is
+        started, which is shut down by close.
+        default=None
+    """
+
+    def __init__(
+        self,
+        matcher: NameMatcher,
+        max_batch_size: int = 256,
+        max_wait: float = 0.005,
+        executor: Union[Executor, None] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size should be at least 1")
+        self._matcher = matcher
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._own_executor = executor is None
+        self._executor = ThreadPoolExecutor(1) if executor is None else executor
+        self._queue = None
+        self._batcher = None
+        self._number_of_requests = 0
+        self._number_of_batches = 0
+
+    async def match(self, name: str) -> Union[Tuple[Match, ...], np.array]:
+        """
+        Matches a single name to the matching data of the NameMatcher, together with
+        the other names which are requested at the same time.
+
+        Parameters
+        ----------
+        name : str
+            The name which should be matched
+
+        Returns
+        -------
+        Union[Tuple[Match, ...], np.array]
+            The matches of the name, as returned by NameMatcher.match_batch
+        """
+        loop = asyncio.get_running_loop()
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._batcher = loop.create_task(self._collect_batches())
+        future = loop.create_future()
+        self._queue.put_nowait((name, future))
+
+        return await future
+
+    def stats(self) -> dict:
+        """
+        Gives the number of requests and batches which have been matched.
+
+        Returns
+        -------
+        dict
+            The number of requests, the number of batches and the mean batch size
+        """
+        return {
+            "requests": self._number_of_requests,
+            "batches": self._number_of_batches,
+            "mean_batch_size": self._number_of_requests
+            / max(self._number_of_batches, 1),
+        }
+
+    async def close(self) -> None:
+        """
+        Stops collecting batches and shuts down the executor if it was started by
+        the AsyncNameMatcher. Requests which are still waiting are cancelled.
+        """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+            while not self._queue.empty():
+                self._queue.get_nowait()[1].cancel()
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _collect_batches(self) -> None:
+        """
+        Collects the requests in batches and matches them until the task is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            names = [name for name, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self._matcher.match_batch, names
+                )
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self._number_of_requests = self._number_of_requests + len(batch)
+            self._number_of_batches = self._number_of_batches + 1
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,45 @@
+import copy
+from typing import Union
+from name_matching.inverted_index import InvertedIndex
+from name_matching.minhash_lsh import MinHashLSH
+
+
+def make_candidate_generator(candidate_generator: Union[str, object]) -> object:
+    """
+    Creates an unfitted candidate generator of a NameMatcher. Besides the InvertedIndex
+    and the MinHashLSH any object can be used which has a fit method, which takes the
+    n-grams matrix of the matching data and the scales of its rows and returns the
+    fitted generator, and a search method with the arguments and results of
+    InvertedIndex.search.
+
+    Parameters
+    ----------
+    candidate_generator : Union[str, object]
+        Either sparse_cosine, for which no generator is needed, inverted_index for an
+        InvertedIndex, minhash_lsh for a MinHashLSH with the default bands and rows or
+        a candidate generator object, of which a copy is returned such that the object
+        itself is not fitted
+
+    Returns
+    -------
+    object
+        The candidate generator, or None for sparse_cosine
+    """
+    if candidate_generator == "sparse_cosine":
+        return None
+    if candidate_generator == "inverted_index":
+        return InvertedIndex()
+    if candidate_generator == "minhash_lsh":
+        return MinHashLSH()
+    if isinstance(candidate_generator, str):
+        raise ValueError(
+            f"The candidate_generator {candidate_generator} is not known, please use "
+            + "sparse_cosine, inverted_index, minhash_lsh or an object with a fit and "
+            + "a search method"
+        )
+    if not (
+        hasattr(candidate_generator, "fit") and hasattr(candidate_generator, "search")
+    ):
+        raise TypeError("The candidate_generator should have a fit and a search method")
+
+    return copy.deepcopy(candidate_generator)
@@ -0,0 +1,189 @@
+import os
+import pandas as pd
+from typing import Iterator, Union
+
+_FILE_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".json": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+_COMPRESSIONS = (".gz", ".bz2", ".zip", ".xz", ".zst")
+
+
+def _import_pyarrow():
+    """
+    Imports pyarrow, which is an optional dependency only needed for parquet files.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "Reading and writing parquet files requires pyarrow, which can be "
+            + "installed via: pip install pyarrow"
+        )
+
+    return pyarrow
+
+
+def infer_file_format(path: str, file_format: Union[str, None] = None) -> str:
+    """
+    Determines the format of a file based on its extension, compression extensions
+    like .gz are ignored.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file
+    file_format: Union[str, None]
+        The format of the file, either csv, jsonl or parquet. If None the format is
+        determined from the extension of the file
+        default=None
+
+    Returns
+    -------
+    str
+        The format of the file
+    """
+    if file_format is None:
+        root, extension = os.path.splitext(path.lower())
+        if extension in _COMPRESSIONS:
+            extension = os.path.splitext(root)[1]
+        file_format = _FILE_FORMATS.get(extension)
+    if file_format not in ("csv", "jsonl", "parquet"):
+        raise ValueError(
+            f"The format of {path} could not be determined, please give the "
+            + "file_format as csv, jsonl or parquet"
+        )
+
+    return file_format
+
+
+def read_chunks(
+    path: str,
+    chunksize: int,
+    file_format: Union[str, None] = None,
+    columns: Union[list, None] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads a csv, jsonl or parquet file in chunks of at most chunksize rows. The index of
+    the chunks is the row number in the file.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file
+    chunksize: int
+        The maximum number of rows of a chunk
+    file_format: Union[str, None]
+        The format of the file, either csv, jsonl or parquet. If None the format is
+        determined from the extension of the file
+        default=None
+    columns: Union[list, None]
+        The columns which should be read, if None all the columns are read
+        default=None
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        The chunks of the file
+    """
+    file_format = infer_file_format(path, file_format)
+    if file_format == "csv":
+        with pd.read_csv(path, chunksize=chunksize, usecols=columns) as reader:
+            yield from reader
+    elif file_format == "jsonl":
+        with pd.read_json(path, lines=True, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk if columns is None else chunk[columns]
+    else:
+        pyarrow = _import_pyarrow()
+        start = 0
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(
+            batch_size=chunksize, columns=columns
+        ):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start = start + len(chunk)
+            yield chunk
+
+
+class ChunkWriter:
+    """
+    Writes dataframes chunk by chunk to a single csv, jsonl or parquet file, such that
+    only a single chunk has to be held in memory. The index of the dataframes is
+    written as well. Should be used as a context manager or closed after writing.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file
+    file_format: Union[str, None]
+        The format of the file, either csv, jsonl or parquet. If None the format is
+        determined from the extension of the file
+        default=None
+    """
+
+    def __init__(self, path: str, file_format: Union[str, None] = None):
+        self._path = path
+        self._file_format = infer_file_format(path, file_format)
+        self._number_of_chunks = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """
+        Appends a chunk to the file.
+
+        Parameters
+        ----------
+        chunk: pd.DataFrame
+            The dataframe which should be written
+        """
+        first = self._number_of_chunks == 0
+        if self._file_format == "csv":
+            chunk.to_csv(self._path, mode="w" if first else "a", header=first)
+        elif self._file_format == "jsonl":
+            if first:
+                self._file = open(self._path, "w", encoding="utf-8")
+            records = chunk.reset_index().to_json(orient="records", lines=True)
+            self._file.write(records if records.endswith("\n") else records + "\n")
+        else:
+            pyarrow = _import_pyarrow()
+            if first:
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=True)
+                # Columns without any value in the first chunk are stored as strings
+                schema = pyarrow.schema(
+                    [
+                        field.with_type(pyarrow.string())
+                        if pyarrow.types.is_null(field.type)
+                        else field
+                        for field in table.schema
+                    ],
+                    metadata=table.schema.metadata,
+                )
+                self._writer = pyarrow.parquet.ParquetWriter(self._path, schema)
+            table = pyarrow.Table.from_pandas(
+                chunk, schema=self._writer.schema, preserve_index=True
+            )
+            self._writer.write_table(table)
+        self._number_of_chunks += 1
+
+    def close(self) -> None:
+        """
+        Closes the file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,360 @@
+import numpy as np
+from scipy.sparse import csc_matrix, spmatrix
+from typing import Tuple, Union
+import name_matching.sparse_cosine as sparse_cosine
+
+# The factor with which the lowest contribution that is scanned is lowered in each
+# round of the search
+_CUT_FACTOR = 0.85
+
+# The cost of scoring a row exactly with the rows of the index for each of its n-grams,
+# relative to the cost of visiting a posting of a posting list
+_ROW_COST = 8.0
+
+if sparse_cosine._numba_available:
+    from numba import njit
+    from name_matching.sparse_cosine import _sift_down
+
+    @njit(cache=True, nogil=True)
+    def _max_score_top_n_numba(
+        index_ptr,
+        index_rows,
+        index_weights,
+        row_ptr,
+        row_columns,
+        row_weights,
+        query,
+        vector_ptr,
+        vector_ind,
+        vector_data,
+        top_n,
+        row_start,
+        row_end,
+        candidate_mask,
+        mask_groups,
+        results_arg,
+        results_val,
+    ):
+        """
+        Compiled search of the top n rows of an inverted index for a block of vectors
+        given in the csr format. The posting lists are ordered from the highest to the
+        lowest weight, such that a row which is not found in a list at the current
+        position can at most add the weight at that position. The lists of the terms of
+        a vector are scanned in rounds, in each round down to a lower contribution. A
+        row which is not found in any of the lists can at most have the sum of the
+        contributions at the current positions, once this bound is not above the n-th
+        best accumulated product the scanning stops. The rows found so far which can
+        still enter the top n are then completed with the rest of the lists, or scored
+        exactly with the rows of the index once there are few enough of them, which
+        gives a result equal to an exhaustive search.
+        """
+        length = row_end - row_start
+        masked = candidate_mask.shape[1] > 0
+        sums = np.zeros(length)
+        touched = np.empty(length, np.int64)
+        is_touched = np.zeros(length, np.bool_)
+        heap_val = np.empty(top_n)
+        heap_ind = np.empty(top_n, np.int64)
+        candidates = np.empty(length, np.int64)
+        row_length = _ROW_COST * len(row_columns) / max(len(row_ptr) - 1, 1)
+        for vector in range(len(vector_ptr) - 1):
+            first = vector_ptr[vector]
+            number_of_terms = vector_ptr[vector + 1] - first
+            positions = np.empty(number_of_terms, np.int64)
+            ends = np.empty(number_of_terms, np.int64)
+            cut = 0.0
+            for term in range(number_of_terms):
+                column = vector_ind[first + term]
+                query[column] = vector_data[first + term]
+                positions[term] = index_ptr[column]
+                ends[term] = index_ptr[column + 1]
+                if positions[term] < ends[term]:
+                    weight = vector_data[first + term] * index_weights[positions[term]]
+                    cut = max(cut, weight)
+
+            number_touched = 0
+            best = 0.0
+            threshold = 0.0
+            bound = cut * number_of_terms
+            scanned = 0
+            while bound > threshold:
+                cut = _CUT_FACTOR * cut
+                bound = 0.0
+                for term in range(number_of_terms):
+                    weight = vector_data[first + term]
+                    ind = positions[term]
+                    while (ind < ends[term]) and (weight * index_weights[ind] >= cut):
+                        row = index_rows[ind]
+                        value = weight * index_weights[ind]
+                        ind += 1
+                        if (row < row_start) or (row >= row_end):
+                            continue
+                        if masked:
+                            if not candidate_mask[mask_groups[vector], row]:
+                                continue
+                        row = row - row_start
+                        sums[row] += value
+                        best = max(best, sums[row])
+                        if not is_touched[row]:
+                            is_touched[row] = True
+                            touched[number_touched] = row
+                            number_touched += 1
+                    scanned += ind - positions[term]
+                    positions[term] = ind
+                    if ind < ends[term]:
+                        bound += weight * index_weights[ind]
+                # the n-th best product is determined again once at least as many
+                # postings are scanned as there are rows found, which bounds its cost
+                # by the cost of the scanning
+                if (
+                    (number_touched >= top_n)
+                    and (bound <= best)
+                    and ((scanned >= number_touched) or (bound == 0))
+                ):
+                    scanned = 0
+                    threshold = np.partition(
+                        sums[touched[:number_touched]], number_touched - top_n
+                    )[number_touched - top_n]
+                if bound == 0:
+                    break
+
+            # the rows which can still enter the top n are completed with the rest of
+            # the posting lists, starting with the lists which can add the most. After
+            # each list the rows which can no longer enter the top n are dropped, once
+            # the candidates are cheaper to score with the rows of the index than the
+            # rest of the lists they are scored exactly
+            if bound > 0:
+                number_of_candidates = 0
+                for i in range(number_touched):
+                    row = touched[i]
+                    if sums[row] + bound < threshold:
+                        is_touched[row] = False
+                    else:
+                        candidates[number_of_candidates] = row
+                        number_of_candidates += 1
+                frontier = np.zeros(number_of_terms)
+                remaining = 0
+                scanned = 0
+                for term in range(number_of_terms):
+                    if positions[term] < ends[term]:
+                        frontier[term] = (
+                            vector_data[first + term] * index_weights[positions[term]]
+                        )
+                        remaining += ends[term] - positions[term]
+                for term in np.argsort(-frontier):
+                    if (frontier[term] == 0) or (
+                        number_of_candidates * row_length <= remaining
+                    ):
+                        break
+                    weight = vector_data[first + term]
+                    for ind in range(positions[term], ends[term]):
+                        row = index_rows[ind] - row_start
+                        if (row >= 0) and (row < length) and is_touched[row]:
+                            sums[row] += weight * index_weights[ind]
+                    remaining -= ends[term] - positions[term]
+                    scanned += ends[term] - positions[term]
+                    positions[term] = ends[term]
+                    frontier[term] = 0
+                    bound = np.sum(frontier)
+                    # the candidates are only pruned again once at least as many
+                    # postings are visited as there are candidates
+                    if scanned < number_of_candidates:
+                        continue
+                    scanned = 0
+                    threshold = np.partition(
+                        sums[candidates[:number_of_candidates]],
+                        number_of_candidates - top_n,
+                    )[number_of_candidates - top_n]
+                    kept = 0
+                    for i in range(number_of_candidates):
+                        row = candidates[i]
+                        if sums[row] + bound < threshold:
+                            is_touched[row] = False
+                        else:
+                            candidates[kept] = row
+                            kept += 1
+                    number_of_candidates = kept
+                if remaining > 0:
+                    for i in range(number_of_candidates):
+                        row = candidates[i]
+                        value = 0.0
+                        for ind in range(
+                            row_ptr[row + row_start], row_ptr[row + row_start + 1]
+                        ):
+                            value += query[row_columns[ind]] * row_weights[ind]
+                        sums[row] = value
+            for term in range(number_of_terms):
+                query[vector_ind[first + term]] = 0
+
+            size = 0
+            for i in range(number_touched):
+                row = touched[i]
+                value = sums[row]
+                sums[row] = 0
+                if not is_touched[row]:
+                    continue
+                is_touched[row] = False
+                if (value <= 0) or ((size == top_n) and (value <= heap_val[0])):
+                    continue
+                row = row + row_start
+                if size < top_n:
+                    heap_val[size] = value
+                    heap_ind[size] = row
+                    pos = size
+                    size += 1
+                    while pos > 0:
+                        parent = (pos - 1) // 2
+                        if heap_val[parent] <= heap_val[pos]:
+                            break
+                        heap_val[pos], heap_val[parent] = heap_val[parent], heap_val[pos]
+                        heap_ind[pos], heap_ind[parent] = heap_ind[parent], heap_ind[pos]
+                        pos = parent
+                else:
+                    heap_val[0] = value
+                    heap_ind[0] = row
+                    _sift_down(heap_val, heap_ind, size, 0)
+
+            order = np.argsort(heap_ind[:size])
+            order = order[np.argsort(-heap_val[:size][order], kind="mergesort")]
+            for i in range(size):
+                results_arg[vector, i] = heap_ind[order[i]]
+                results_val[vector, i] = heap_val[order[i]]
+
+
+class InvertedIndex:
+    """
+    An inverted index of the n-grams of the matching data for the search of the rows
+    with the top n products with a set of vectors, as sparse_cosine_top_n. The posting
+    list of an n-gram holds the rows in which it occurs with their weight, ordered from
+    the highest to the lowest weight. If numba is installed the posting lists are only
+    scanned as far as a row which is not found yet could still enter the top n, after
+    which the rest of the lists is only used to complete the rows which can still
+    enter the top n. Without numba all the postings are visited. Both give the exact
+    top n. For character n-grams a name has many n-grams, which keeps the bound on the
+    rows which are not found yet high, such that a large part of the postings is still
+    visited. The index takes about twice the memory of a float64 n-grams matrix, as
+    the rows are stored as well.
+    """
+
+    def fit(
+        self, matrix: spmatrix, row_scales: Union[np.array, None] = None
+    ) -> "InvertedIndex":
+        """
+        Builds the index of the n-grams matrix of the matching data.
+
+        Parameters
+        ----------
+        matrix : spmatrix
+            The n-grams matrix of the matching data, with a row for each name
+        row_scales : Union[np.array, None]
+            The scale of each of the rows if the values of the matrix are quantised
+            default=None
+
+        Returns
+        -------
+        InvertedIndex
+            The fitted index
+        """
+        weights = csc_matrix(matrix, dtype=np.float64, copy=True)
+        if row_scales is not None:
+            weights.data *= row_scales[weights.indices]
+        weights.eliminate_zeros()
+        self._rows = weights.tocsr()
+        self._rows.sort_indices()
+        columns = np.repeat(np.arange(weights.shape[1]), np.diff(weights.indptr))
+        order = np.lexsort((-weights.data, columns))
+        self._index = csc_matrix(
+            (weights.data[order], weights.indices[order], weights.indptr),
+            shape=weights.shape,
+        )
+        self._query = np.zeros(weights.shape[1])
+
+        return self
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """The number of rows and n-grams of the index"""
+        return self._index.shape
+
+    def search(
+        self,
+        vectors: spmatrix,
+        top_n: int,
+        row_range: Union[Tuple[int, int], None] = None,
+        candidate_mask: Union[np.array, None] = None,
+        mask_groups: Union[np.array, None] = None,
+    ) -> Tuple[np.array, np.array]:
+        """
+        Searches the top n rows of the index with the highest product with each of the
+        vectors.
+
+        Parameters
+        ----------
+        vectors : spmatrix
+            The n-grams of the names which should be matched, with a row for each name
+        top_n : int
+            The number of rows which should be found for each vector
+        row_range : Union[Tuple[int, int], None]
+            The first row and the row after the last row of the index which can be
+            found, if None all the rows can be found
+            default=None
+        candidate_mask : Union[np.array, None]
+            A 2-D boolean array indicating for each group which rows can be found, see
+            sparse_cosine_top_n
+            default=None
+        mask_groups : Union[np.array, None]
+            The row of candidate_mask which is used for each of the vectors
+            default=None
+
+        Returns
+        -------
+        Tuple[np.array, np.array]
+            The rows of the top n matches of each of the vectors and their products,
+            ordered from the best to the worst match. Rows without a match are padded
+            with the first row of the row range and a product of 0
+        """
+        vectors = vectors.tocsr().astype(np.float64)
+        vectors.sum_duplicates()
+        row_start, row_end = (0, self.shape[0]) if row_range is None else row_range
+        results_arg = np.full((vectors.shape[0], top_n), row_start, dtype=np.int64)
+        results_val = np.zeros((vectors.shape[0], top_n))
+        if vectors.shape[0] == 0:
+            return results_arg, results_val
+
+        if sparse_cosine._numba_available:
+            if candidate_mask is None:
+                candidate_mask = sparse_cosine._NO_CANDIDATE_MASK
+                mask_groups = sparse_cosine._NO_MASK_GROUPS
+            _max_score_top_n_numba(
+                self._index.indptr,
+                self._index.indices,
+                self._index.data,
+                self._rows.indptr,
+                self._rows.indices,
+                self._rows.data,
+                self._query,
+                vectors.indptr,
+                vectors.indices,
+                vectors.data,
+                top_n,
+                row_start,
+                row_end,
+                candidate_mask,
+                mask_groups,
+                results_arg,
+                results_val,
+            )
+        else:
+            sparse_cosine._sparse_cosine_top_n_block(
+                self._index,
+                vectors,
+                top_n,
+                0,
+                results_arg,
+                results_val,
+                row_range,
+                candidate_mask,
+                mask_groups,
+            )
+
+        return results_arg, results_val
@@ -0,0 +1,369 @@
+import numpy as np
+from scipy.sparse import csr_matrix, spmatrix
+from typing import Tuple, Union
+import name_matching.sparse_cosine as sparse_cosine
+
+# The hash of an n-gram is given by the highest 32 bits of a * ngram + b modulo 2**64,
+# the multipliers with which the minimum hashes of a band are combined into a single
+# key and the hash of a row without n-grams
+_HASH_SHIFT = np.uint64(32)
+_KEY_MULTIPLIER = np.uint64(0x100000001B3)
+_MIX_MULTIPLIER = np.uint64(0xFF51AFD7ED558CCD)
+_EMPTY_HASH = np.iinfo(np.uint32).max
+
+# The number of minimum hashes which are calculated at once when the signatures of a
+# matrix are determined
+_CHUNK_SIZE = 2**24
+
+if sparse_cosine._numba_available:
+    from numba import njit
+
+    @njit(cache=True, nogil=True)
+    def _pair_products_numba(
+        a_ptr, a_ind, a_data, b_ptr, b_ind, b_data, rows_a, rows_b, products
+    ):
+        """
+        Compiled calculation of the products of pairs of rows of two csr matrices with
+        sorted indices, by merging the indices of the two rows of each pair.
+        """
+        for pair in range(len(rows_a)):
+            i, i_end = a_ptr[rows_a[pair]], a_ptr[rows_a[pair] + 1]
+            j, j_end = b_ptr[rows_b[pair]], b_ptr[rows_b[pair] + 1]
+            value = 0.0
+            while (i < i_end) and (j < j_end):
+                if a_ind[i] == b_ind[j]:
+                    value += a_data[i] * b_data[j]
+                    i += 1
+                    j += 1
+                elif a_ind[i] < b_ind[j]:
+                    i += 1
+                else:
+                    j += 1
+            products[pair] = value
+
+    @njit(cache=True, nogil=True)
+    def _signatures_numba(indptr, indices, a, b, signatures):
+        """
+        Compiled calculation of the MinHash signatures of the rows of a csr matrix.
+        """
+        for row in range(len(indptr) - 1):
+            for ind in range(indptr[row], indptr[row + 1]):
+                column = np.uint64(indices[ind])
+                for function in range(len(a)):
+                    value = (a[function] * column + b[function]) >> _HASH_SHIFT
+                    value = np.uint32(value)
+                    if value < signatures[row, function]:
+                        signatures[row, function] = value
+
+
+def _pair_products(
+    matrix_a: csr_matrix, matrix_b: csr_matrix, rows_a: np.array, rows_b: np.array
+) -> np.array:
+    """
+    Calculates the products of pairs of rows of two csr matrices with sorted indices.
+    If numba is installed a compiled kernel is used, otherwise the rows of the pairs
+    are multiplied with scipy.
+
+    Parameters
+    ----------
+    matrix_a : csr_matrix
+        The matrix of the first rows of the pairs
+    matrix_b : csr_matrix
+        The matrix of the second rows of the pairs
+    rows_a : np.array
+        The row of matrix_a of each of the pairs
+    rows_b : np.array
+        The row of matrix_b of each of the pairs
+
+    Returns
+    -------
+    np.array
+        The product of each of the pairs
+    """
+    if sparse_cosine._numba_available:
+        products = np.zeros(len(rows_a))
+        _pair_products_numba(
+            matrix_a.indptr,
+            matrix_a.indices,
+            matrix_a.data,
+            matrix_b.indptr,
+            matrix_b.indices,
+            matrix_b.data,
+            rows_a,
+            rows_b,
+            products,
+        )
+        return products
+
+    return np.asarray(
+        matrix_a[rows_a].multiply(matrix_b[rows_b]).sum(axis=1), dtype=np.float64
+    ).ravel()
+
+
+class MinHashLSH:
+    """
+    Generates the possible matches of names with locality sensitive hashing of the
+    MinHash signatures of their sets of n-grams. The signature of a name consists of
+    bands * rows minimum hashes, two names whose signatures are equal in all the rows
+    of at least one of the bands are a candidate pair. The probability of this is
+    1 - (1 - j ** rows) ** bands for names with a Jaccard similarity j of their
+    n-grams, more bands give a higher recall and more rows fewer candidates. The
+    candidates of a name are scored exactly with the n-grams of the matching data,
+    after which the top n are returned, such that the possible matches are a subset
+    of those of sparse_cosine_top_n. The cost of a search depends on the number of
+    candidates instead of on the size of the matching data. The index holds the
+    signatures, a sorted key for each band of each row and a csr copy of the n-grams
+    matrix.
+
+    Parameters
+    ----------
+    bands : int
+        The number of bands of the signatures
+        default=32
+    rows : int
+        The number of minimum hashes in each band
+        default=4
+    seed : int
+        The seed of the random hash functions
+        default=0
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 4, seed: int = 0):
+        if (bands < 1) | (rows < 1):
+            raise ValueError("The number of bands and rows should be at least 1")
+        self.bands = bands
+        self.rows = rows
+        self.seed = seed
+        random = np.random.default_rng(seed)
+        # the multipliers should be odd for universal multiply shift hashing
+        self._a = random.integers(0, 2**64 - 1, bands * rows, dtype=np.uint64)
+        self._a |= np.uint64(1)
+        self._b = random.integers(0, 2**64 - 1, bands * rows, dtype=np.uint64)
+        self.signatures_ = None
+
+    def get_params(self) -> dict:
+        """
+        Gives the settings of the hash functions, two MinHashLSH objects with the same
+        settings give the same signatures.
+
+        Returns
+        -------
+        dict
+            The bands, rows and seed
+        """
+        return {"bands": self.bands, "rows": self.rows, "seed": self.seed}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """The number of rows and n-grams of the index"""
+        return self._matrix.shape
+
+    def signatures(self, matrix: spmatrix) -> np.array:
+        """
+        Calculates the MinHash signatures of the sets of n-grams of the rows of a
+        matrix, the signature of a row without n-grams consists of the largest
+        possible hash.
+
+        Parameters
+        ----------
+        matrix : spmatrix
+            The n-grams of the names, with a row for each name
+
+        Returns
+        -------
+        np.array
+            A uint32 array with a row for each of the names and a column for each of
+            the bands * rows minimum hashes
+        """
+        matrix = csr_matrix(matrix, copy=True)
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        lengths = np.diff(matrix.indptr)
+        signatures = np.full(
+            (matrix.shape[0], len(self._a)), _EMPTY_HASH, dtype=np.uint32
+        )
+        if sparse_cosine._numba_available:
+            _signatures_numba(
+                matrix.indptr, matrix.indices, self._a, self._b, signatures
+            )
+            return signatures
+
+        ngrams_per_chunk = max(_CHUNK_SIZE // max(len(self._a), 1), 1)
+        start = 0
+        while start < matrix.shape[0]:
+            # a chunk holds the n-grams of as many rows as fit in _CHUNK_SIZE hashes
+            end = np.searchsorted(
+                matrix.indptr, matrix.indptr[start] + ngrams_per_chunk, side="right"
+            )
+            end = min(max(end - 1, start + 1), matrix.shape[0])
+            filled = np.flatnonzero(lengths[start:end] > 0)
+            if len(filled) > 0:
+                columns = matrix.indices[
+                    matrix.indptr[start] : matrix.indptr[end]
+                ].astype(np.uint64)
+                hashes = (
+                    (self._a[:, None] * columns + self._b[:, None]) >> _HASH_SHIFT
+                ).astype(np.uint32)
+                offsets = matrix.indptr[start + filled] - matrix.indptr[start]
+                signatures[start + filled] = np.minimum.reduceat(
+                    hashes, offsets, axis=1
+                ).T
+            start = end
+
+        return signatures
+
+    def fit(
+        self,
+        matrix: spmatrix,
+        row_scales: Union[np.array, None] = None,
+        signatures: Union[np.array, None] = None,
+    ) -> "MinHashLSH":
+        """
+        Builds the index of the n-grams matrix of the matching data.
+
+        Parameters
+        ----------
+        matrix : spmatrix
+            The n-grams matrix of the matching data, with a row for each name
+        row_scales : Union[np.array, None]
+            The scale of each of the rows if the values of the matrix are quantised
+            default=None
+        signatures : Union[np.array, None]
+            The signatures of the rows of the matrix if they are already calculated,
+            for instance by an earlier fit with the same bands, rows and seed
+            default=None
+
+        Returns
+        -------
+        MinHashLSH
+            The fitted index
+        """
+        self._matrix = csr_matrix(matrix, copy=True)
+        self._matrix.sum_duplicates()
+        self._matrix.eliminate_zeros()
+        self._matrix.sort_indices()
+        self._row_scales = row_scales
+        if signatures is None:
+            signatures = self.signatures(self._matrix)
+        elif signatures.shape != (self._matrix.shape[0], len(self._a)):
+            raise ValueError(
+                "The signatures should have a row for each of the rows of the matrix "
+                + "and bands * rows columns"
+            )
+        self.signatures_ = signatures
+
+        # rows without n-grams are not placed in the buckets
+        filled = np.flatnonzero(np.diff(self._matrix.indptr) > 0)
+        row_type = np.uint32 if self._matrix.shape[0] < 2**32 else np.int64
+        keys = self._band_keys(signatures[filled]).ravel()
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._buckets = np.tile(filled.astype(row_type), self.bands)[order]
+
+        return self
+
+    def search(
+        self,
+        vectors: spmatrix,
+        top_n: int,
+        row_range: Union[Tuple[int, int], None] = None,
+        candidate_mask: Union[np.array, None] = None,
+        mask_groups: Union[np.array, None] = None,
+    ) -> Tuple[np.array, np.array]:
+        """
+        Searches the candidates of each of the vectors in the buckets of the bands and
+        gives the top n candidates with the highest product with the vector.
+
+        Parameters
+        ----------
+        vectors : spmatrix
+            The n-grams of the names which should be matched, with a row for each name
+        top_n : int
+            The number of rows which should be found for each vector
+        row_range : Union[Tuple[int, int], None]
+            The first row and the row after the last row of the index which can be
+            found, if None all the rows can be found
+            default=None
+        candidate_mask : Union[np.array, None]
+            A 2-D boolean array indicating for each group which rows can be found, see
+            sparse_cosine_top_n
+            default=None
+        mask_groups : Union[np.array, None]
+            The row of candidate_mask which is used for each of the vectors
+            default=None
+
+        Returns
+        -------
+        Tuple[np.array, np.array]
+            The rows of the top n candidates of each of the vectors and their products,
+            ordered from the best to the worst match. If a vector has fewer than top n
+            candidates, the rest is padded with the first row of the row range and a
+            product of 0
+        """
+        if self.signatures_ is None:
+            raise RuntimeError("The MinHashLSH should be fitted before it is searched")
+        vectors = csr_matrix(vectors, dtype=np.float64, copy=True)
+        vectors.sort_indices()
+        row_start, row_end = (0, self.shape[0]) if row_range is None else row_range
+        results_arg = np.full((vectors.shape[0], top_n), row_start, dtype=np.int64)
+        results_val = np.zeros((vectors.shape[0], top_n))
+
+        filled = np.flatnonzero(np.diff(vectors.indptr) > 0)
+        keys = self._band_keys(self.signatures(vectors[filled])).ravel()
+        lower = np.searchsorted(self._keys, keys, side="left")
+        counts = np.searchsorted(self._keys, keys, side="right") - lower
+        positions = np.repeat(lower - np.cumsum(counts) + counts, counts)
+        positions += np.arange(len(positions))
+        queries = np.repeat(np.tile(filled, self.bands), counts)
+        rows = self._buckets[positions].astype(np.int64)
+
+        keep = (rows >= row_start) & (rows < row_end)
+        if candidate_mask is not None:
+            keep[keep] = candidate_mask[mask_groups[queries[keep]], rows[keep]]
+        pairs = np.unique(queries[keep] * self.shape[0] + rows[keep])
+        queries, rows = pairs // self.shape[0], pairs % self.shape[0]
+
+        scores = _pair_products(vectors, self._matrix, queries, rows)
+        if self._row_scales is not None:
+            scores *= self._row_scales[rows]
+        order = np.lexsort((rows, -scores, queries))
+        queries, rows, scores = queries[order], rows[order], scores[order]
+        ranks = np.arange(len(queries)) - np.searchsorted(queries, queries)
+        keep = (ranks < top_n) & (scores > 0)
+        results_arg[queries[keep], ranks[keep]] = rows[keep]
+        results_val[queries[keep], ranks[keep]] = scores[keep]
+
+        return results_arg, results_val
+
+    def _band_keys(self, signatures: np.array) -> np.array:
+        """
+        Combines the minimum hashes of each of the bands of the signatures into a
+        single key. The highest bits of a key hold the band, such that the keys of all
+        the bands can be stored in one sorted array.
+
+        Parameters
+        ----------
+        signatures : np.array
+            The signatures of the names
+
+        Returns
+        -------
+        np.array
+            A uint64 array with a row for each of the bands and a column for each of
+            the names
+        """
+        bands = signatures.reshape(len(signatures), self.bands, self.rows)
+        keys = np.zeros((self.bands, len(signatures)), dtype=np.uint64)
+        for row in range(self.rows):
+            keys = keys * _KEY_MULTIPLIER + bands[:, :, row].T.astype(np.uint64)
+        keys ^= keys >> np.uint64(33)
+        keys *= _MIX_MULTIPLIER
+        keys ^= keys >> np.uint64(33)
+        band_bits = int(np.ceil(np.log2(self.bands)))
+        if band_bits > 0:
+            keys >>= np.uint64(band_bits)
+            keys |= np.arange(self.bands, dtype=np.uint64)[:, None] << np.uint64(
+                64 - band_bits
+            )
+
+        return keys
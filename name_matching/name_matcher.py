@@ -1,16 +1,57 @@
+import os
+import copy
+import json
+import pickle
+import time
+from contextlib import contextmanager
 import numpy as np
 import pandas as pd
+from collections import namedtuple
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
 from operator import iconcat
 from functools import reduce
-from unicodedata import normalize
 from re import escape, sub
-from typing import Union, Tuple
+from typing import Union, Tuple, Iterable, Iterator
 from itertools import compress
+from scipy.sparse import csr_matrix, spmatrix, vstack
+from scipy.sparse.csgraph import connected_components
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
 from name_matching.distance_metrics import make_distance_metrics
 from cleanco.termdata import terms_by_type, terms_by_country
-from name_matching.sparse_cosine import sparse_cosine_top_n
+from name_matching.sparse_cosine import (
+    sparse_cosine_top_n,
+    _sparse_cosine_top_n_block,
+)
+from name_matching.similarity_join import similarity_join
+from name_matching.score_cache import PairScoreCache, CacheInfo
+from name_matching.chunked_io import read_chunks, ChunkWriter
+from name_matching.preprocessing import NameNormaliser
+from name_matching.ngram_encoder import HashingNgramEncoder, make_ngram_encoder
+from name_matching.candidate_generator import make_candidate_generator
+from name_matching.minhash_lsh import MinHashLSH
+from name_matching.parallel import (
+    share_sparse_matrix,
+    load_sparse_matrix,
+    _share_array,
+    _init_worker,
+    _match_chunk,
+)
+
+# The version of the on-disk format written by NameMatcher.save_index
+_INDEX_FORMAT_VERSION = 1
+
+# The types in which the values of the n-grams matrix of the matching data can be
+# stored, the integer types store the values quantised with a scale for each row
+_INDEX_DTYPES = ("float64", "float32", "uint16", "uint8")
+
+# The number of values of the n-grams matrix of which the squares are summed at once
+# when the norms of its rows are calculated
+_NORMS_BLOCK_SIZE = 2**22
+
+# A single match of a name as returned by NameMatcher.match_one
+Match = namedtuple("Match", ["match_name", "score", "match_index", "cosine_score"])
 
 #this is the base of name_matching_for_company
 class NameMatcher:
@@ -32,7 +73,8 @@ class NameMatcher:
         default=50
     low_memory : bool
         Bool indicating if the a low memory approach should be taken in the sparse 
-        cosine similarity step.
+        cosine similarity step. If numba is installed a compiled kernel is used for 
+        the low memory approach.
         default=False
     number_of_rows : integer
         Determines how many rows should be calculated at once with the sparse cosine 
@@ -95,6 +137,104 @@ class NameMatcher:
         Bool indicating whether the scores of all the algorithms should be returned instead
         of a combined score
         default=False
+    n_jobs : int
+        The number of processes used for the search for possible matches and the fuzzy
+        matching. The data to be matched is split up in chunks of at most number_of_rows
+        rows which are divided over the processes. The n-grams of the matching data are
+        shared with the processes via shared memory. If -1 is given all the available
+        cores are used.
+        default=1
+    min_cosine : float
+        The minimal cosine similarity between the n-grams of a name and a possible match.
+        Possible matches with a lower cosine similarity are discarded before the fuzzy
+        matching and names without any possible match left are not fuzzy matched at
+        all, these are returned with a score of 0 and without a match name and index.
+        default=0
+    return_cosine_score : bool
+        Bool indicating whether the cosine similarity of the n-grams of the matches
+        should be returned as well
+        default=False
+    exact_match : bool
+        Bool indicating whether names which are equal to a name in the matching data
+        after the preprocessing should directly be matched to that name with a score of
+        100, without the cosine similarity and fuzzy matching steps. Only used if
+        number_of_matches is 1 and return_algorithms_score is False.
+        default=True
+    score_cache_size : int
+        The maximum number of pairs of names of which the scores of the distance metrics
+        are kept in a least recently used cache, such that names which are matched
+        repeatedly are not scored again. The cache is cleared when the distance metrics
+        are changed. With n_jobs larger than 1 each process uses its own cache. If 0 no
+        scores are cached.
+        default=0
+    refit_fraction : Union[float, None]
+        The fraction of the number of rows of the matching data at the last fit of the
+        vectoriser after which the rows added with add_master_rows and removed with
+        remove_master_rows trigger a compaction of the matching data and a refit of the
+        vectoriser. If None the matching data is only compacted and refitted by calling
+        compact_master_data.
+        default=None
+    ngram_encoder : Union[str, object]
+        The encoder which generates the weighted n-grams of the names. Either tfidf for
+        a TfidfVectorizer with the char analyzer, hashing for a HashingNgramEncoder,
+        which hashes the n-grams into a fixed number of features without a vocabulary
+        and is faster to fit on large matching data, or an object with a fit and a
+        transform method which returns a sparse matrix with a row for each name.
+        default="tfidf"
+    index_dtype : Union[str, None]
+        The type in which the values of the n-grams matrix of the matching data are
+        stored, either float64, float32, uint16 or uint8. If None the type of the
+        n-grams generated by the ngram_encoder is kept. With uint16 and uint8 the
+        values of each row are quantised to the range of the type with a float32 scale
+        for each row, which reduces the memory of a value from 8 bytes to 2 or 1 bytes,
+        next to the 4 bytes of its row index. The relative error of a quantised cosine
+        similarity is at most about 1 / 65535 for uint16 and 1 / 255 for uint8, n-grams
+        smaller than half a step of their row are dropped. On the names of the test
+        data all (uint16) and 99.9% (uint8) of the top 50 possible matches are equal to
+        those of float64, the differences are possible matches with near equal cosine
+        similarities at the end of the top n, and the final matches are equal.
+        default=None
+    ngram_max_df : Union[float, int, None]
+        The n-grams which occur in more than this fraction (float) or number (int) of
+        the names of the matching data are removed from the n-grams matrix of the
+        matching data. These frequent n-grams have the longest lists of names in the
+        sparse cosine step, while they add little to the distinction between names.
+        Names of which all the n-grams would be removed keep their n-grams. The cosine
+        similarities are those with the remaining n-grams of the matching data. If
+        None no n-grams are removed, see candidate_recall_report for the effect on the
+        possible matches.
+        default=None
+    ngram_top_k : Union[int, None]
+        The number of n-grams with the highest weight which are kept for each of the
+        names of the matching data, after the removal of the frequent n-grams. If None
+        all the n-grams are kept.
+        default=None
+    candidate_generator : Union[str, object]
+        The method with which the top_n possible matches are searched. Either
+        sparse_cosine, which multiplies the n-grams of the names with the n-grams
+        matrix of the matching data, inverted_index, minhash_lsh or a candidate
+        generator object, see make_candidate_generator. The inverted index gives the
+        same possible matches as sparse_cosine, it only scans the n-grams of the
+        matching data as far as a name which is not found yet could still enter the
+        top_n, see InvertedIndex. As names have many character n-grams about 60% of
+        the postings are still visited, which makes the speed of both methods similar
+        for single names. minhash_lsh only scores the names of the matching data which
+        share a band of their MinHash signatures with the name, see MinHashLSH, which
+        trades some recall for a cost which depends on the number of names in these
+        bands rather than on the size of the matching data. Use a MinHashLSH object to
+        set the number of bands and rows. The generators are fitted the first time they
+        are used, the signatures of a MinHashLSH are stored by save_index.
+        default="sparse_cosine"
+    cascade : Union[list, None]
+        The stages with which the top_n possible matches are reduced before they are
+        scored with the distance_metrics, each stage a tuple of a list of distance
+        metrics and the number of possible matches with the highest mean score of these
+        metrics which is kept, see set_cascade. For instance top_n=200 with
+        cascade=[(["overlap", "weighted_jaccard"], 20)] scores 200 possible matches
+        with the cheap multiset metrics and only 20 with the distance_metrics. Possible
+        matches which are not kept get a score of 0. If None all the possible matches
+        are scored with the distance_metrics.
+        default=None
     """
 
     def __init__(
@@ -121,9 +261,22 @@ class NameMatcher:
         ],
         row_numbers: bool = False,
         return_algorithms_score: bool = False,
+        n_jobs: int = 1,
+        min_cosine: float = 0,
+        return_cosine_score: bool = False,
+        exact_match: bool = True,
+        score_cache_size: int = 0,
+        refit_fraction: Union[float, None] = None,
+        ngram_encoder: Union[str, object] = "tfidf",
+        index_dtype: Union[str, None] = None,
+        ngram_max_df: Union[float, int, None] = None,
+        ngram_top_k: Union[int, None] = None,
+        candidate_generator: Union[str, object] = "sparse_cosine",
+        cascade: Union[list, None] = None,
     ):
 
         self._possible_matches = None
+        self._cosine_scores = None
         self._preprocessed = False
         self._df_matching_data = pd.DataFrame()
 
@@ -137,6 +290,10 @@ class NameMatcher:
         self._number_of_matches = number_of_matches
         self._top_n = top_n
         self._return_algorithms_score = return_algorithms_score
+        self._n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self._min_cosine = min_cosine
+        self._return_cosine_score = return_cosine_score
+        self._exact_match = exact_match
 
         self._preprocess_lowercase = lowercase
         self._preprocess_punctuations = punctuations
@@ -163,12 +320,47 @@ class NameMatcher:
         self._original_indexes = not row_numbers
         self._original_index = None
 
+        self._score_cache_size = score_cache_size
         self.set_distance_metrics(distance_metrics)
+        self.set_cascade(cascade)
 
-        self._vec = TfidfVectorizer(
-            lowercase=False, analyzer="char", ngram_range=(ngrams)
+        if (index_dtype is not None) and (index_dtype not in _INDEX_DTYPES):
+            raise ValueError(
+                f"The index_dtype {index_dtype} is not supported, please use one of "
+                + ", ".join(_INDEX_DTYPES)
+            )
+        self._index_dtype = None if index_dtype is None else np.dtype(index_dtype)
+        if isinstance(ngram_max_df, float) and not (0 < ngram_max_df <= 1):
+            raise ValueError("A ngram_max_df fraction should be between 0 and 1")
+        if isinstance(ngram_max_df, int) and (ngram_max_df < 1):
+            raise ValueError("A ngram_max_df number of names should be at least 1")
+        if (ngram_top_k is not None) and (ngram_top_k < 1):
+            raise ValueError("The ngram_top_k should be at least 1")
+        self._ngram_max_df = ngram_max_df
+        self._ngram_top_k = ngram_top_k
+        self._pruned_ngrams = None
+        self._candidate_generator = (
+            None
+            if make_candidate_generator(candidate_generator) is None
+            else candidate_generator
         )
+        self._candidate_index = None
+        self._lsh_signatures = None
+
+        self._vec = make_ngram_encoder(ngram_encoder, ngrams, self._n_jobs)
         self._n_grams_matching = None
+        self._n_grams_norms = None
+        self._n_grams_scales = None
+        self._master_rows = None
+        self._candidate_mask = None
+        self._mmap_index_path = None
+        self._exact_names = None
+        self._exact_rows = None
+        self._executor = None
+        self._refit_fraction = refit_fraction
+        self._removed = None
+        self._rows_fitted = 0
+        self._rows_changed = 0
 
     def set_distance_metrics(self, metrics: list) -> None:
         """
@@ -221,6 +413,69 @@ class NameMatcher:
         self._num_distance_metrics = sum(
             [len(x) for x in self._distance_metrics.values()]
         )
+        self._score_cache = PairScoreCache(self._score_cache_size)
+
+    def set_cascade(self, cascade: Union[list, None]) -> None:
+        """
+        A method to set the stages with which the possible matches are reduced before
+        they are scored with the distance metrics. In each stage the remaining possible
+        matches are scored with the distance metrics of the stage and only the possible
+        matches with the highest mean score are kept. Cheap metrics can thereby select
+        the possible matches which are scored with the expensive metrics, which allows
+        a larger top_n for the same cost of the fuzzy matching.
+
+        Parameters
+        ----------
+        cascade: Union[list, None]
+            A list of stages, each stage a tuple of the list of distance metrics of the
+            stage, see set_distance_metrics, and the number of possible matches which
+            is kept. For instance [(["overlap", "weighted_jaccard"], 20)] with a top_n
+            of 200. If None all the possible matches are scored with the distance
+            metrics.
+        """
+        if cascade is None:
+            self._cascade = None
+            return
+
+        stages = []
+        for metrics, number_kept in cascade:
+            if (not isinstance(number_kept, (int, np.integer))) or (
+                number_kept < self._number_of_matches
+            ):
+                raise ValueError(
+                    "The number of possible matches kept by a stage of the cascade "
+                    + "should be an integer of at least the number_of_matches"
+                )
+            try:
+                distance_metrics = make_distance_metrics(
+                    **{str(metric).lower(): True for metric in metrics}
+                )
+            except TypeError:
+                raise TypeError(
+                    "Not all of the distance metrics of the cascade are available. "
+                    + "Please check the list of options in the make_distance_metrics "
+                    + "function and adjust your list accordingly"
+                )
+            methods = [
+                method
+                for method_list in distance_metrics.values()
+                for method in method_list
+            ]
+            if len(methods) == 0:
+                raise ValueError("Each stage of the cascade should have a metric")
+            stages.append((methods, int(number_kept)))
+        self._cascade = stages
+
+    def score_cache_info(self) -> CacheInfo:
+        """Gives the statistics of the cache of the scores of pairs of names.
+
+        Returns
+        -------
+        CacheInfo
+            A named tuple with the number of hits and misses, the maxsize and the
+            current number of pairs in the cache
+        """
+        return self._score_cache.info()
 
     def _select_top_words(
         self, word: str, word_counts: pd.Series, occurrence_count: int
@@ -310,6 +565,7 @@ class NameMatcher:
         self._column = column
         self._df_matching_data = df_matching_data
         self._original_index = df_matching_data.index
+        self._removed = None
         if start_processing:
             self._process_matching_data(transform)
 
@@ -334,7 +590,11 @@ class NameMatcher:
         self._preprocessed = True
 
     def match_names(
-        self, to_be_matched: Union[pd.Series, pd.DataFrame], column_matching: str
+        self,
+        to_be_matched: Union[pd.Series, pd.DataFrame],
+        column_matching: str,
+        candidate_mask: Union[np.array, dict, None] = None,
+        candidate_group_column: Union[str, None] = None,
     ) -> Union[pd.Series, pd.DataFrame]:
         """Performs the name matching operation on the to_be_matched data. First it does 
         the preprocessing of the data to be matched as well as the matching data if this 
@@ -343,12 +603,29 @@ class NameMatcher:
         matches fuzzy matching algorithms are performed to determine the best match and
         the quality of the match.
 
+        The possible matches can be restricted with a candidate mask, for instance to
+        only match with active companies or with companies in the same country. The
+        mask is applied within the sparse cosine step, before the top n is selected, so
+        the top n consists of the best possible matches within the mask and the
+        matching data does not have to be loaded again for each subset.
+
         Parameters
         ----------
         to_be_matched: Union[pd.Series, pd.DataFrame]
             The data which should be matched
         column_matching: str
             string indicating the column which will be matched
+        candidate_mask: Union[np.array, dict, None]
+            A boolean array with a value for each of the rows of the matching data, in
+            the order of the matching data, indicating the rows which can be matched.
+            Alternatively a dictionary with a boolean array for each of the values of
+            the candidate_group_column, names with a value which is not in the
+            dictionary are not matched. If None all the rows can be matched
+            default=None
+        candidate_group_column: Union[str, None]
+            The column of to_be_matched which selects the mask from the candidate_mask
+            dictionary for each of the names
+            default=None
 
         Returns
         -------
@@ -364,7 +641,6 @@ class NameMatcher:
                 + "load_and_process_master_data"
             )
         if self._verbose:
-            tqdm.pandas()
             tqdm.write("preprocessing...\n")
         self._column_matching = column_matching
 
@@ -376,38 +652,41 @@ class NameMatcher:
             )
         if not self._preprocessed:
             self._process_matching_data()
+        self._candidate_mask, mask_groups = self._candidate_masks(
+            candidate_mask, to_be_matched, candidate_group_column
+        )
         to_be_matched = self.preprocess(to_be_matched, self._column_matching)
 
         if self._verbose:
             tqdm.write("preprocessing complete \n searching for matches...\n")
 
-        self._possible_matches = self._search_for_possible_matches(to_be_matched)
-
-        if self._preprocess_split:
-            self._possible_matches = np.hstack(
-                (
-                    self._search_for_possible_matches(
-                        self._preprocess_reduce(to_be_matched)
+        exact_rows = self._search_for_exact_matches(to_be_matched)
+        if mask_groups is not None:
+            # exact matches outside of the candidate mask are matched fuzzily
+            exact = np.flatnonzero(exact_rows >= 0)
+            allowed = self._candidate_mask[mask_groups[exact], exact_rows[exact]]
+            exact_rows[exact[~allowed]] = -1
+        exact = exact_rows >= 0
+        if exact.all():
+            data_matches = self._exact_matches(to_be_matched, exact_rows)
+        elif exact.any():
+            data_matches = pd.concat(
+                [
+                    self._exact_matches(to_be_matched[exact], exact_rows[exact]),
+                    self._fuzzy_match_names(
+                        to_be_matched[~exact],
+                        None if mask_groups is None else mask_groups[~exact],
                     ),
-                    self._possible_matches,
-                )
-            )
-
-        if self._verbose:
-            tqdm.write("possible matches found   \n fuzzy matching...\n")
-            data_matches = to_be_matched.progress_apply(
-                lambda x: self.fuzzy_matches(
-                    self._possible_matches[to_be_matched.index.get_loc(x.name), :], x
-                ),
-                axis=1,
+                ]
             )
+            data_matches = data_matches.iloc[
+                np.argsort(
+                    np.concatenate([np.flatnonzero(exact), np.flatnonzero(~exact)]),
+                    kind="stable",
+                )
+            ]
         else:
-            data_matches = to_be_matched.apply(
-                lambda x: self.fuzzy_matches(
-                    self._possible_matches[to_be_matched.index.get_loc(x.name), :], x
-                ),
-                axis=1,
-            )
+            data_matches = self._fuzzy_match_names(to_be_matched, mask_groups)
         if self._return_algorithms_score:
             return data_matches
 
@@ -417,240 +696,1533 @@ class NameMatcher:
                     "match_name_0": "match_name",
                     "score_0": "score",
                     "match_index_0": "match_index",
+                    "cosine_score_0": "cosine_score",
                 }
             )
         if is_dataframe and self._original_indexes:
             for col in data_matches.columns[
                 data_matches.columns.str.contains("match_index")
             ]:
+                unmatched = data_matches[col].isna()
                 data_matches[col] = self._original_index[
-                    data_matches[col].astype(int).fillna(0)
+                    data_matches[col].fillna(0).astype(int)
                 ]
+                if unmatched.any():
+                    data_matches[col] = data_matches[col].where(~unmatched)
 
         if self._verbose:
             tqdm.write("done")
 
         return data_matches
 
-    def fuzzy_matches(
-        self, possible_matches: np.array, to_be_matched: pd.Series
-    ) -> pd.Series:
-        """A method which performs the fuzzy matching between the data in the 
-        to_be_matched series as well as the indicated indexes of the matching_data points
-        which are possible matching candidates.
+    def match_names_iter(
+        self,
+        to_be_matched: Iterable[Union[pd.Series, pd.DataFrame]],
+        column_matching: str,
+        candidate_mask: Union[np.array, dict, None] = None,
+        candidate_group_column: Union[str, None] = None,
+    ) -> Iterator[Union[pd.Series, pd.DataFrame]]:
+        """Performs the name matching operation of match_names on each of the chunks of
+        to_be_matched and yields the results per chunk, such that only a single chunk
+        has to be held in memory. If n_jobs is larger than 1, the worker processes are
+        started once and used for all the chunks.
 
         Parameters
         ----------
-        possible_matches : np.array
-            An array containing the indexes of the matching data with potential matches
-        to_be_matched : pd.Series
-            The data which should be matched
+        to_be_matched: Iterable[Union[pd.Series, pd.DataFrame]]
+            An iterable with the chunks of the data which should be matched
+        column_matching: str
+            string indicating the column which will be matched
+        candidate_mask: Union[np.array, dict, None]
+            The candidate mask used for all the chunks, see match_names
+            default=None
+        candidate_group_column: Union[str, None]
+            The column which selects the candidate mask, see match_names
+            default=None
 
         Returns
         -------
-        pd.Series
-            A series containing the match index from the matching_data dataframe. the name 
-            in the to_be_matched data, the name to which the datapoint was matched and a 
-            score between 0 (no match) and 100(perfect match) to indicate the quality of 
-            the matches.
+        Iterator[Union[pd.Series, pd.DataFrame]]
+            The matching results of each of the chunks, as returned by match_names
         """
-        if len(possible_matches.shape) > 1:
-            possible_matches = possible_matches[0]
-
-        indexes = np.array(
-            [
-                [f"match_name_{num}", f"score_{num}", f"match_index_{num}"]
-                for num in range(self._number_of_matches)
-            ]
-        ).flatten()
-        match = pd.Series(index=np.append("original_name", indexes), dtype=object)
-        match["original_name"] = to_be_matched[self._column_matching]
-        list_possible_matches = self._df_matching_data.iloc[
-            possible_matches.flatten(), :
-        ][self._column].values
-
-        match_score = self._score_matches(
-            to_be_matched[self._column_matching], list_possible_matches
-        )
-        if self._return_algorithms_score:
-            return match_score
-        ind = self._rate_matches(match_score)
-
-        for num, col_num in enumerate(ind):
-            match[f"match_name_{num}"] = list_possible_matches[col_num]
-            match[f"match_index_{num}"] = possible_matches[col_num]
-
-        match = self._adjust_scores(match_score[ind, :], match)
-
-        if len(self._word_set):
-            match = self.postprocess(match)
-
-        return match
+        if self._column == "":
+            raise ValueError(
+                "Please first load the master data via the method: "
+                + "load_and_process_master_data"
+            )
+        if (self._n_jobs > 1) & (self._executor is None):
+            if not self._preprocessed:
+                self._process_matching_data()
+            with self._worker_pool():
+                for chunk in to_be_matched:
+                    yield self.match_names(
+                        chunk, column_matching, candidate_mask, candidate_group_column
+                    )
+        else:
+            for chunk in to_be_matched:
+                yield self.match_names(
+                    chunk, column_matching, candidate_mask, candidate_group_column
+                )
 
-    def _score_matches(
-        self, to_be_matched_instance: str, possible_matches: list
-    ) -> np.array:
-        """A method to score a name to_be_matched_instance to a list of possible matches. 
-        The scoring is done based on all the metrics which are enabled.
+    def match_file(
+        self,
+        path_in: str,
+        path_out: str,
+        column_matching: str,
+        chunksize: int = 100000,
+        input_format: Union[str, None] = None,
+        output_format: Union[str, None] = None,
+    ) -> int:
+        """Matches the names in a csv, jsonl or parquet file and writes the results to
+        a csv, jsonl or parquet file. The file is read, matched and written in chunks of
+        chunksize rows, such that the memory usage does not depend on the size of the
+        file. The index of the results is the row number in the input file. Reading and
+        writing parquet files requires pyarrow.
 
         Parameters
         ----------
-        to_be_matched_instance : str
-            The name which should match one of the possible matches
-        possible_matches : list
-            list of the names of the possible matches
+        path_in: str
+            The path of the file with the data which should be matched
+        path_out: str
+            The path of the file to which the matching results are written
+        column_matching: str
+            string indicating the column which will be matched
+        chunksize: int
+            The number of rows which are read and matched at once
+            default=100000
+        input_format: Union[str, None]
+            The format of the input file, either csv, jsonl or parquet. If None the
+            format is determined from the extension of the file
+            default=None
+        output_format: Union[str, None]
+            The format of the output file, either csv, jsonl or parquet. If None the
+            format is determined from the extension of the file
+            default=None
 
         Returns
         -------
-        np.array
-            The score of each of the matches with respect to the different metrics which 
-            are assessed.
+        int
+            The number of rows which are matched
         """
-        match_score = np.zeros((len(possible_matches), self._num_distance_metrics))
-        idx = 0
-        for method_list in self._distance_metrics.values():
-            for method in method_list:
-                match_score[:, idx] = np.array(
-                    [method.sim(to_be_matched_instance, s) for s in possible_matches]
-                )
-                idx = idx + 1
-
-        return match_score
-
-    def _rate_matches(self, match_score: np.array) -> np.array:
-        """Converts the match scores from the score_matches method to a list of indexes of 
-        the best scoring matches limited to the _number_of_matches.
+        if self._return_algorithms_score:
+            raise ValueError(
+                "The scores of all the algorithms can not be written to a file, please "
+                + "set return_algorithms_score to False"
+            )
+        number_of_rows = 0
+        chunks = read_chunks(path_in, chunksize, input_format, [column_matching])
+        with ChunkWriter(path_out, output_format) as writer:
+            for data_matches in self.match_names_iter(chunks, column_matching):
+                if self._min_cosine > 0:
+                    # names without a match give missing match indexes in some chunks
+                    for col in data_matches.columns[
+                        data_matches.columns.str.contains("match_index")
+                    ]:
+                        if pd.api.types.is_integer_dtype(data_matches[col]):
+                            data_matches[col] = data_matches[col].astype(float)
+                writer.write(data_matches)
+                number_of_rows = number_of_rows + len(data_matches)
+
+        return number_of_rows
+
+    def match_one(self, name: str) -> Union[Tuple[Match, ...], np.array]:
+        """Matches a single name to the matching data. This gives the same matches as
+        match_names, but the name is processed as a plain string and the possible
+        matches are found with a single sparse product of the n-grams of the name with
+        the n-grams of the matching data. No dataframes are created and no progress is
+        printed, such that the latency of a single lookup is as low as possible.
 
         Parameters
         ----------
-        match_score : np.array
-            An array containing the scores of each of the possible alternatives for each
-            of the different methods used
+        name: str
+            The name which should be matched
 
         Returns
         -------
-        np.array
-            The indexes of the best rated matches
+        Union[Tuple[Match, ...], np.array]
+            A tuple with the number_of_matches best matches, each with the match name,
+            the score between 0 (no match) and 100 (perfect match), the match index and
+            the cosine similarity of the n-grams. If no possible match has a cosine
+            similarity of at least min_cosine an empty tuple is returned. If the scores
+            of all the algorithms should be returned, the 2-D array with the scores of
+            all the possible matches is returned instead.
         """
-        if self._number_of_matches == 1:
-            ind = [np.argmax(np.mean(match_score, axis=1))]
-        elif self._number_of_matches == len(self._distance_metrics):
-            ind = np.zeros(len(self._distance_metrics))
-            idx = 0
-            for num, method_list in enumerate(self._distance_metrics.values()):
-                method_grouped_results = np.reshape(
-                    match_score[:, idx : idx + len(method_list)], (-1, len(method_list))
+        if self._column == "":
+            raise ValueError(
+                "Please first load the master data via the method: "
+                + "load_and_process_master_data"
+            )
+        if not self._preprocessed:
+            self._process_matching_data()
+        if self._n_grams_matching is None:
+            raise RuntimeError(
+                """First the data needs to be transformed to be able to use the sparse """
+                + """cosine simularity. To transform the data, run transform_data"""
+                + """ or run load_and_process_master_data with transform=True"""
+            )
+        name = self._normaliser()(name)
+        master_names = self._df_matching_data[self._column].values
+
+        if (
+            self._exact_match
+            & (self._number_of_matches == 1)
+            & (not self._return_algorithms_score)
+            & (self._exact_names is not None)
+        ):
+            position = self._exact_names.get_indexer([name])[0]
+            if position >= 0:
+                row = self._exact_rows[position]
+                return (Match(master_names[row], 100.0, self._match_label(row), 1.0),)
+
+        possible_matches, cosine_scores = self._search_for_possible_name_matches(name)
+        if self._preprocess_split:
+            words = name.split()
+            reduced_name = self._select_top_words(
+                words, pd.Series(words, dtype=object).value_counts(), 3
+            )
+            if reduced_name == name:
+                reduced_matches, reduced_scores = possible_matches, cosine_scores
+            else:
+                reduced_matches, reduced_scores = self._search_for_possible_name_matches(
+                    reduced_name
                 )
-                ind[num] = np.argmax(np.mean(method_grouped_results, axis=1))
-                idx = idx + len(method_list)
-        elif self._number_of_matches == self._num_distance_metrics:
-            ind = np.argmax(match_score, axis=0).reshape(-1)
+            possible_matches = np.concatenate((reduced_matches, possible_matches))
+            cosine_scores = np.concatenate((reduced_scores, cosine_scores))
+
+        possible_names = master_names[possible_matches]
+        candidates = self._possible_match_mask(
+            possible_matches[np.newaxis], cosine_scores[np.newaxis]
+        )
+        if self._cascade is not None:
+            names = np.array([name], dtype=object)
+            candidates = self._cascade_candidates(
+                names, possible_names[np.newaxis], candidates
+            )
+            if not candidates.any():
+                return ()
+            match_score = self._score_candidates(
+                names, possible_names[np.newaxis], candidates, False
+            )[0]
         else:
-            ind = np.argsort(np.mean(match_score, axis=1))[-self._number_of_matches :][
-                ::-1
-            ]
+            match_score = self._score_matches(name, possible_names)
+            if candidates is not None:
+                if not candidates.any():
+                    return ()
+                match_score[~candidates[0]] = 0
+        if self._return_algorithms_score:
+            return match_score
 
-        return np.array(ind, dtype=int)
+        ind = self._rate_matches_batch(match_score[np.newaxis])
+        scores = self._adjust_scores_batch(match_score[np.newaxis], ind)[0]
+        ind = ind[0]
+        if len(self._word_set):
+            org_name, alt_names = self._process_words(
+                name, [str(possible_names[num]) for num in ind]
+            )
+            processed_score = self._score_matches(org_name, alt_names)[np.newaxis]
+            scores = self._adjust_scores_batch(
+                processed_score, self._rate_matches_batch(processed_score)
+            )[0]
+
+        return tuple(
+            Match(
+                possible_names[num],
+                scores[rank],
+                self._match_label(possible_matches[num]),
+                cosine_scores[num],
+            )
+            for rank, num in enumerate(ind)
+        )
 
-    def _get_alternative_names(self, match: pd.Series) -> list:
-        """Gets all the possible match names from the match.
+    def match_batch(self, names: Iterable[str]) -> list:
+        """Matches a batch of names to the matching data with a single call of
+        match_names and gives the results per name in the same form as match_one,
+        including the cosine similarity and the match index of exact matches.
 
         Parameters
         ----------
-        match : pd.Series
-            The series with the possible matches and original scores
+        names: Iterable[str]
+            The names which should be matched
 
         Returns
         -------
         list
-            A list with the alternative names for this match
+            For each of the names a tuple with the number_of_matches best matches, as
+            returned by match_one. Names without a possible match with a cosine
+            similarity of at least min_cosine get an empty tuple. If the scores of all
+            the algorithms should be returned, the 2-D arrays with these scores are
+            given instead.
         """
-        alt_names = []
+        names = list(names)
+        if len(names) == 0:
+            return []
+        # the matches are found as row numbers with their cosine similarities, which
+        # are converted to the matches of match_one below
+        batch_matcher = copy.copy(self)
+        batch_matcher._return_cosine_score = True
+        batch_matcher._original_indexes = False
+        data_matches = batch_matcher.match_names(
+            pd.DataFrame({"name": names}, dtype=object), "name"
+        )
+        if self._return_algorithms_score:
+            return list(data_matches.values)
 
-        for num in range(self._number_of_matches):
-            alt_names.append(str(match[f"match_name_{num}"]))
+        if self._number_of_matches == 1:
+            suffixes = [""]
+        else:
+            suffixes = [f"_{num}" for num in range(self._number_of_matches)]
+        columns = [
+            (
+                data_matches[f"match_name{suffix}"].values,
+                data_matches[f"score{suffix}"].values,
+                data_matches[f"match_index{suffix}"].values,
+                data_matches[f"cosine_score{suffix}"].values,
+            )
+            for suffix in suffixes
+        ]
+
+        results = []
+        for row in range(len(names)):
+            if pd.isna(columns[0][2][row]):
+                results.append(())
+            else:
+                results.append(
+                    tuple(
+                        Match(
+                            match_name[row],
+                            score[row],
+                            self._match_label(int(index[row])),
+                            cosine[row],
+                        )
+                        for match_name, score, index, cosine in columns
+                    )
+                )
 
-        return alt_names
+        return results
 
-    def _process_words(self, org_name: str, alt_names: list) -> Tuple[str, list]:
-        """Removes the words from the word list from the org_name and all the names in 
-        alt_names .
+    def similarity_join(
+        self,
+        to_be_matched: pd.DataFrame,
+        column_matching: str,
+        min_cosine: float = 0.6,
+        output: str = "table",
+    ) -> Union[pd.DataFrame, csr_matrix]:
+        """Finds all the pairs of a name of the to_be_matched data and a name of the
+        matching data with a cosine similarity of the ngrams of at least min_cosine,
+        instead of a fixed top n for each name. The pairs are not scored with the
+        fuzzy matching algorithms. If numba is installed the pairs are found with the
+        prefix and length filtering of the AllPairs algorithm, the frequent ngrams of
+        the matching data are left out of the index as long as they can not give a
+        cosine similarity of min_cosine, such that most of the pairs are never compared.
 
         Parameters
         ----------
-        org_name : str
-            The original name for the matching data
-        alt_names : list
-            A list of names from which the words should be removed
+        to_be_matched : pd.DataFrame
+            The data which should be matched
+        column_matching : str
+            The column of to_be_matched with the names
+        min_cosine : float
+            The minimal cosine similarity of the pairs, should be larger than 0
+            default=0.6
+        output : str
+            Either table for a dataframe with a row for each pair or csr for a sparse
+            matrix with the cosine similarities
+            default=table
 
         Returns
         -------
-        Tuple[str, list]
-            The processed version of the org_name and the alt_names, with the words
-            removed
+        Union[pd.DataFrame, csr_matrix]
+            For table a dataframe with the original_index, the index of the name in
+            to_be_matched, the original_name, the match_name, the match_index and the
+            cosine_score of each pair, ordered on the original name and from the most
+            to the least similar match. For csr a matrix with a row for each name of
+            to_be_matched and a column for each row of the matching data
         """
-        len_atl_names = len(alt_names)
-        for word in self._word_set:
-            org_name = " ".join(sub(rf"\b{escape(word)}\b", "", org_name).split())
-            for num in range(len_atl_names):
-                alt_names[num] = " ".join(
-                    sub(rf"\b{escape(word)}\b", "", alt_names[num]).split()
-                )
+        if output not in ["table", "csr"]:
+            raise ValueError(
+                f"The output {output} is not known, please use table or csr"
+            )
+        if self._column == "":
+            raise ValueError(
+                "Please first load the master data via the method: "
+                + "load_and_process_master_data"
+            )
+        if not self._preprocessed:
+            self._process_matching_data()
+        if self._n_grams_matching is None:
+            raise RuntimeError(
+                """First the data needs to be transformed to be able to use the sparse """
+                + """cosine simularity. To transform the data, run transform_data"""
+                + """ or run load_and_process_master_data with transform=True"""
+            )
 
-        return org_name, alt_names
+        self._column_matching = column_matching
+        to_be_matched = self.preprocess(to_be_matched.copy(), column_matching)
+        pairs = similarity_join(
+            self._n_grams_matching,
+            self._vec.transform(to_be_matched[column_matching].tolist()),
+            min_cosine,
+            row_scales=self._n_grams_scales,
+            row_range=self._master_rows,
+        )
+        if output == "csr":
+            return pairs
+
+        rows = np.repeat(np.arange(pairs.shape[0]), np.diff(pairs.indptr))
+        order = np.lexsort((pairs.indices, -pairs.data, rows))
+        rows, matches = rows[order], pairs.indices[order]
+
+        return pd.DataFrame(
+            {
+                "original_index": to_be_matched.index.values[rows],
+                "original_name": to_be_matched[column_matching].values[rows],
+                "match_name": self._df_matching_data[self._column].values[matches],
+                "match_index": self._original_index[matches]
+                if self._original_indexes
+                else matches,
+                "cosine_score": pairs.data[order],
+            }
+        )
 
-    def _adjust_scores(self, match_score: np.array, match: pd.Series) -> pd.Series:
-        """Adjust the scores to be between 0 and 100
+    def deduplicate(
+        self, df: pd.DataFrame, column: str, threshold: float = 0.8
+    ) -> pd.DataFrame:
+        """Finds the groups of names within a dataframe which refer to the same entity.
+        The n-grams of the names are generated with a separate copy of the n-gram
+        encoder, such that df and the matching data loaded in the NameMatcher are left
+        unchanged, after which the names are joined with each other as in
+        similarity_join. Each pair is only scored once and a name is not paired with
+        itself. The names are clustered into the connected
+        components of the pairs with a cosine similarity of at least threshold, such
+        that names which are linked through other names end up in the same cluster.
 
         Parameters
         ----------
-        match_score : np.array
-            An array with the scores for each of the options
-        match : pd.Series
-            The series with the possible matches and original scores
+        df : pd.DataFrame
+            The data which should be deduplicated
+        column : str
+            The column of df with the names
+        threshold : float
+            The minimal cosine similarity of two names to be placed in the same
+            cluster, should be larger than 0
+            default=0.8
 
         Returns
         -------
-        pd.Series
-            The series with the possible matches and adjusted scores
+        pd.DataFrame
+            A copy of df with a cluster_id column, names with the same cluster_id are
+            duplicates of each other. The clusters are numbered in the order of their
+            first name in df
         """
-        for num in range(self._number_of_matches):
-            match[f"score_{num}"] = 100 * np.mean(match_score[num, :])
+        deduplicator = copy.copy(self)
+        try:
+            deduplicator._vec = clone(self._vec)
+        except TypeError:
+            deduplicator._vec = copy.deepcopy(self._vec)
+        deduplicator._executor = None
+        deduplicator.load_and_process_master_data(column, df.copy(), transform=True)
+        pairs = similarity_join(
+            deduplicator._n_grams_matching,
+            None,
+            threshold,
+            row_scales=deduplicator._n_grams_scales,
+        )
+        _, cluster_ids = connected_components(pairs, directed=False)
+        df = df.copy()
+        df["cluster_id"] = cluster_ids
 
-        return match
+        return df
 
-    def postprocess(self, match: pd.Series) -> pd.Series:
-        """Postprocesses the scores to exclude certain specific company words or the 
-        most common words. In this method only the scores are adjusted, the matches 
-        still stand.
+    def candidate_recall_report(
+        self,
+        to_be_matched: pd.DataFrame,
+        column_matching: str,
+        label_column: Union[str, None] = None,
+    ) -> pd.DataFrame:
+        """Measures the effect of the removal of n-grams with ngram_max_df and
+        ngram_top_k on the search for possible matches, using a sample of names of
+        which the correct match in the matching data is known. The possible matches of
+        the sample are searched both with the n-grams matrix of the matching data in
+        use and with a matrix in which no n-grams are removed.
 
         Parameters
         ----------
-        match : pd.Series
-            The series with the possible matches and original scores
+        to_be_matched : pd.DataFrame
+            The sample of names which should be matched
+        column_matching : str
+            The column of to_be_matched with the names
+        label_column : Union[str, None]
+            The column of to_be_matched with the label of the correct match in the index
+            of the matching data. If None the index of to_be_matched is used.
+            default=None
 
         Returns
         -------
-        pd.Series
-            A new version of the input series with updated scores
+        pd.DataFrame
+            For the full and the pruned n-grams matrix the number of stored n-grams,
+            the seconds needed to search the possible matches, the recall, which is the
+            fraction of the names for which the correct match is among the top_n
+            possible matches, and the loss of recall compared to the full matrix
         """
-        alt_names = self._get_alternative_names(match)
-        org_name = str(match["original_name"])
+        if self._column == "":
+            raise ValueError(
+                "Please first load the master data via the method: "
+                + "load_and_process_master_data"
+            )
+        if not self._preprocessed:
+            self._process_matching_data()
+        if self._n_grams_matching is None:
+            raise RuntimeError(
+                """First the data needs to be transformed to be able to use the sparse """
+                + """cosine simularity. To transform the data, run transform_data"""
+                + """ or run load_and_process_master_data with transform=True"""
+            )
 
-        org_name, alt_names = self._process_words(org_name, alt_names)
+        if label_column is None:
+            labels = to_be_matched.index.values
+        else:
+            labels = to_be_matched[label_column].values
+        self._column_matching = column_matching
+        to_be_matched = self.preprocess(to_be_matched.copy(), column_matching)
+
+        pruned = copy.copy(self)
+        pruned._verbose = False
+        full = copy.copy(pruned)
+        full._ngram_max_df = None
+        full._ngram_top_k = None
+        full._set_matching_ngrams(
+            self._vec.transform(self._df_matching_data[self._column].astype(str))
+        )
 
-        match_score = self._score_matches(org_name, alt_names)
-        ind = self._rate_matches(match_score)
+        master_labels = self._df_matching_data.index.values
+        report = {}
+        for name, matcher in [("full", full), ("pruned", pruned)]:
+            # the first search loads the compiled kernels, which is not timed
+            matcher._search_for_possible_matches(to_be_matched.iloc[:1])
+            start = time.perf_counter()
+            possible_matches, cosine_scores = matcher._search_for_possible_matches(
+                to_be_matched
+            )
+            seconds = time.perf_counter() - start
+            found = (master_labels[possible_matches] == labels[:, None]) & (
+                cosine_scores > 0
+            )
+            report[name] = {
+                "ngrams": matcher._n_grams_matching.nnz,
+                "seconds": seconds,
+                "recall": found.any(axis=1).mean(),
+            }
+        report = pd.DataFrame.from_dict(report, orient="index")
+        report["recall_loss"] = report.loc["full", "recall"] - report["recall"]
 
-        match = self._adjust_scores(match_score[ind, :], match)
+        return report
 
-        return match
+    def _normaliser(self) -> NameNormaliser:
+        """Creates the normaliser for the preprocessing settings of the NameMatcher.
 
-    def _vectorise_data(self, transform: bool = True):
-        """Initialises the TfidfVectorizer, which generates ngrams and weights them 
-        based on the occurrance. Subsequently the matching data will be used to fit 
-        the vectoriser and the matching data might also be send to the transform_data 
-        function depending on the transform boolean.
+        Returns
+        -------
+        NameNormaliser
+            The normaliser which applies the preprocessing to names
+        """
+        return NameNormaliser(
+            self._preprocess_lowercase,
+            self._preprocess_punctuations,
+            self._preprocess_ascii,
+        )
+
+    def _match_label(self, row: int):
+        """Gives the match index of a row of the matching data, which is either the
+        original index or the row number itself.
+
+        Parameters
+        ----------
+        row: int
+            The row number in the matching data
+
+        Returns
+        -------
+        The original index of the row or the row number if row_numbers is used
+        """
+        if self._original_indexes:
+            return self._original_index[row]
+
+        return int(row)
+
+    def _search_for_possible_name_matches(
+        self, name: str
+    ) -> Tuple[np.array, np.array]:
+        """Searches the top n possible matches of a single preprocessed name. The
+        n-grams of the name are multiplied with the n-grams matrix of the matching data
+        in a single pass of the fused top n kernel, without the splitting in blocks and
+        the progress printing of sparse_cosine_top_n. The possible matches are identical
+        to the ones found by _search_for_possible_matches.
+
+        Parameters
+        ----------
+        name: str
+            The preprocessed name which should be matched
+
+        Returns
+        -------
+        Tuple[np.array, np.array]
+            An array of the top n possible matches, ordered from the most to the least
+            similar, and an array with their cosine similarities
+        """
+        match_ngrams = self._vec.transform([name])
+        if self._candidate_generator is not None:
+            possible_matches, scores = self._master_candidate_index().search(
+                match_ngrams, self._top_n, row_range=self._master_rows
+            )
+        elif self._low_memory:
+            possible_matches, scores = sparse_cosine_top_n(
+                matrix_a=self._n_grams_matching,
+                matrix_b=match_ngrams.tocsr(),
+                top_n=self._top_n,
+                low_memory=True,
+                number_of_rows=self._number_of_rows,
+                verbose=False,
+                row_range=self._master_rows,
+                row_scales=self._n_grams_scales,
+            )
+        else:
+            possible_matches = np.full(
+                (1, self._top_n), self._first_master_row(), dtype=np.int64
+            )
+            scores = np.zeros((1, self._top_n))
+            _sparse_cosine_top_n_block(
+                self._n_grams_matching,
+                match_ngrams.tocsr(),
+                self._top_n,
+                0,
+                possible_matches,
+                scores,
+                self._master_rows,
+                row_scales=self._n_grams_scales,
+            )
+
+        possible_matches, cosine_scores = self._to_cosine_similarity(
+            possible_matches, scores
+        )
+
+        return possible_matches[0], cosine_scores[0]
+
+    def _candidate_masks(
+        self,
+        candidate_mask: Union[np.array, dict, None],
+        to_be_matched: pd.DataFrame,
+        candidate_group_column: Union[str, None],
+    ) -> Tuple[Union[np.array, None], Union[np.array, None]]:
+        """Converts the candidate_mask of match_names to a 2-D boolean array with a row
+        for each of the masks and a column for each of the rows of the matching data,
+        together with the row of this array which is used for each of the names. Of a
+        dictionary of masks only the masks of the groups which occur in to_be_matched
+        are included, with a row of False values for the names of the other groups.
+
+        Parameters
+        ----------
+        candidate_mask: Union[np.array, dict, None]
+            A boolean array with a value for each of the rows of the matching data or a
+            dictionary with such an array for each of the groups
+        to_be_matched: pd.DataFrame
+            The data which should be matched
+        candidate_group_column: Union[str, None]
+            The column of to_be_matched with the group of each of the names
+
+        Returns
+        -------
+        Tuple[Union[np.array, None], Union[np.array, None]]
+            The 2-D mask and the row of the mask for each of the names, or twice None
+            if no candidate mask is given
+        """
+        if candidate_mask is None:
+            return None, None
+
+        number_of_rows = len(self._df_matching_data)
+        if isinstance(candidate_mask, dict):
+            if candidate_group_column not in to_be_matched.columns:
+                raise ValueError(
+                    "A candidate_group_column of the data to be matched is needed to "
+                    + "select the masks from a dictionary of candidate masks"
+                )
+            groups = pd.Index(list(candidate_mask)).get_indexer(
+                to_be_matched[candidate_group_column]
+            )
+            used_groups, mask_groups = np.unique(groups, return_inverse=True)
+            group_masks = list(candidate_mask.values())
+            masks = [
+                np.asarray(group_masks[group], dtype=bool)
+                if group >= 0
+                else np.zeros(number_of_rows, dtype=bool)
+                for group in used_groups
+            ]
+            if len(masks) == 0:
+                masks = [np.zeros(number_of_rows, dtype=bool)]
+        else:
+            masks = [np.asarray(candidate_mask, dtype=bool)]
+            mask_groups = np.zeros(len(to_be_matched), dtype=np.int64)
+        if any(mask.shape != (number_of_rows,) for mask in masks):
+            raise ValueError(
+                "A candidate mask should have a boolean value for each of the "
+                + f"{number_of_rows} rows of the matching data"
+            )
+
+        return np.vstack(masks), mask_groups.reshape(-1).astype(np.int64)
+
+    def _fuzzy_match_names(
+        self, to_be_matched: pd.DataFrame, mask_groups: Union[np.array, None] = None
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """Performs the search for possible matches and the fuzzy matching of the
+        preprocessed to_be_matched data, over n_jobs processes if more than one process
+        should be used.
+
+        Parameters
+        ----------
+        to_be_matched: pd.DataFrame
+            The preprocessed data which should be matched
+        mask_groups: Union[np.array, None]
+            The row of the candidate mask which is used for each of the rows of
+            to_be_matched, or None if no candidate mask is used
+            default=None
+
+        Returns
+        -------
+        Union[pd.Series, pd.DataFrame]
+            The fuzzy matching results for all the rows of to_be_matched
+        """
+        if (self._n_jobs > 1) & (len(to_be_matched) > 1):
+            return self._match_names_parallel(to_be_matched, mask_groups)
+
+        (
+            self._possible_matches,
+            self._cosine_scores,
+        ) = self._search_for_possible_matches(to_be_matched, mask_groups)
+
+        if self._preprocess_split:
+            reduced_matches, reduced_scores = self._search_for_possible_matches(
+                self._preprocess_reduce(to_be_matched), mask_groups
+            )
+            self._possible_matches = np.hstack((reduced_matches, self._possible_matches))
+            self._cosine_scores = np.hstack((reduced_scores, self._cosine_scores))
+
+        if self._verbose:
+            tqdm.write("possible matches found   \n fuzzy matching...\n")
+
+        return self._fuzzy_matches_batch(
+            self._possible_matches, to_be_matched, self._cosine_scores, mask_groups
+        )
+
+    def _search_for_exact_matches(self, to_be_matched: pd.DataFrame) -> np.array:
+        """Looks up the preprocessed names of the to_be_matched data in the hash index
+        of the names in the matching data.
+
+        Parameters
+        ----------
+        to_be_matched: pd.DataFrame
+            The preprocessed data which should be matched
+
+        Returns
+        -------
+        np.array
+            For each of the rows the row number of the first equal name in the matching
+            data, or -1 if there is no equal name or exact matching is not used
+        """
+        if (
+            (not self._exact_match)
+            | (self._number_of_matches != 1)
+            | self._return_algorithms_score
+            | (self._exact_names is None)
+        ):
+            return np.full(len(to_be_matched), -1)
+
+        positions = self._exact_names.get_indexer(
+            to_be_matched[self._column_matching].values
+        )
+
+        return np.where(positions >= 0, self._exact_rows[positions], -1)
+
+    def _exact_matches(
+        self, to_be_matched: pd.DataFrame, exact_rows: np.array
+    ) -> pd.DataFrame:
+        """Creates the matching results for names with an exact match in the matching
+        data, these all have a score of 100.
+
+        Parameters
+        ----------
+        to_be_matched: pd.DataFrame
+            The preprocessed data which is matched exactly
+        exact_rows: np.array
+            The row numbers of the exact matches in the matching data
+
+        Returns
+        -------
+        pd.DataFrame
+            A dataframe with the same columns as the results of the fuzzy matching
+        """
+        data_matches = {
+            "original_name": to_be_matched[self._column_matching].values,
+            "match_name_0": self._df_matching_data[self._column].values[exact_rows],
+            "score_0": np.full(len(exact_rows), 100.0),
+            "match_index_0": exact_rows,
+        }
+        if self._return_cosine_score:
+            data_matches["cosine_score_0"] = np.ones(len(exact_rows))
+
+        return pd.DataFrame(data_matches, index=to_be_matched.index)
+
+    def _build_exact_index(self) -> None:
+        """Builds a hash index from the names in the matching data to the row number of
+        their first occurrence, which is used to resolve exact matches without the
+        cosine similarity and fuzzy matching steps. Empty names, rows removed by
+        remove_master_rows and rows outside of the row range of a view created with
+        _master_slice are not included.
+        """
+        start, end = (
+            (0, len(self._df_matching_data))
+            if self._master_rows is None
+            else self._master_rows
+        )
+        names = self._df_matching_data[self._column].iloc[start:end].astype(str)
+        included = (names != "").values
+        if self._removed is not None:
+            included = included & ~self._removed[start:end]
+        included[included] = ~names[included].duplicated().values
+        self._exact_names = pd.Index(names.values[included])
+        self._exact_rows = np.flatnonzero(included) + start
+
+    @contextmanager
+    def _worker_pool(self):
+        """Starts n_jobs worker processes which are used by _match_names_parallel until
+        the context is left. The n-grams of the matching data are placed in shared
+        memory, or memory mapped from the index if it was loaded with a mmap_mode, and
+        the workers are started with a copy of the NameMatcher without these n-grams.
+        """
+        if self._n_grams_matching is None:
+            raise RuntimeError(
+                """First the data needs to be transformed to be able to use the sparse """
+                + """cosine simularity. To transform the data, run transform_data"""
+                + """ or run load_and_process_master_data with transform=True"""
+            )
+
+        worker_matcher = copy.copy(self)
+        worker_matcher._verbose = False
+        worker_matcher._n_jobs = 1
+        worker_matcher._vec = None
+        worker_matcher._n_grams_matching = None
+        worker_matcher._n_grams_norms = None
+        worker_matcher._candidate_index = None
+        worker_matcher._candidate_mask = None
+        worker_matcher._score_cache = PairScoreCache(self._score_cache_size)
+        worker_matcher._executor = None
+        worker_matcher._df_matching_data = self._df_matching_data[[self._column]]
+
+        if self._mmap_index_path is None:
+            shared_memory_blocks, matrix_spec = share_sparse_matrix(
+                self._n_grams_matching
+            )
+        else:
+            shared_memory_blocks = []
+            matrix_spec = {
+                "format": self._n_grams_matching.format,
+                "shape": self._n_grams_matching.shape,
+                "path": self._mmap_index_path,
+            }
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self._n_jobs,
+                initializer=_init_worker,
+                initargs=(worker_matcher, matrix_spec),
+            ) as executor:
+                self._executor = executor
+                yield
+        finally:
+            self._executor = None
+            for shared_memory in shared_memory_blocks:
+                shared_memory.close()
+                shared_memory.unlink()
+
+    def _match_names_parallel(
+        self, to_be_matched: pd.DataFrame, mask_groups: Union[np.array, None] = None
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """Performs the search for possible matches and the fuzzy matching of the
+        preprocessed to_be_matched data over n_jobs processes. The n-grams of the data
+        to be matched are generated in this process, such that the vectoriser is not
+        needed by the workers. The n-grams of the matching data are placed in shared
+        memory and the workers are started with a copy of the NameMatcher without these
+        n-grams. The candidate mask is placed in shared memory once for all the chunks.
+        The results of the chunks are merged in their original order. If the workers
+        are already started by _worker_pool they are reused.
+
+        Parameters
+        ----------
+        to_be_matched: pd.DataFrame
+            The preprocessed data which should be matched
+        mask_groups: Union[np.array, None]
+            The row of the candidate mask which is used for each of the rows of
+            to_be_matched, or None if no candidate mask is used
+            default=None
+
+        Returns
+        -------
+        Union[pd.Series, pd.DataFrame]
+            The fuzzy matching results for all the rows of to_be_matched
+        """
+        if self._executor is None:
+            with self._worker_pool():
+                return self._match_names_parallel(to_be_matched, mask_groups)
+
+        match_ngrams = self._vec.transform(
+            to_be_matched[self._column_matching].tolist()
+        ).tocsr()
+        reduced_ngrams = None
+        if self._preprocess_split:
+            reduced_ngrams = self._vec.transform(
+                self._preprocess_reduce(to_be_matched)[self._column_matching].tolist()
+            ).tocsr()
+
+        chunk_size = max(
+            1, min(self._number_of_rows, -(-len(to_be_matched) // self._n_jobs))
+        )
+        shared_mask, mask_spec = None, None
+        if mask_groups is not None:
+            shared_mask, mask_spec = _share_array(self._candidate_mask)
+        chunks = [
+            (
+                to_be_matched.iloc[start : start + chunk_size][[self._column_matching]],
+                match_ngrams[start : start + chunk_size],
+                None
+                if reduced_ngrams is None
+                else reduced_ngrams[start : start + chunk_size],
+                self._master_rows,
+                mask_spec,
+                None
+                if mask_groups is None
+                else mask_groups[start : start + chunk_size],
+            )
+            for start in range(0, len(to_be_matched), chunk_size)
+        ]
+
+        try:
+            results = list(
+                tqdm(
+                    self._executor.map(_match_chunk, *zip(*chunks)),
+                    total=len(chunks),
+                    disable=not self._verbose,
+                )
+            )
+        finally:
+            if shared_mask is not None:
+                shared_mask.close()
+                shared_mask.unlink()
+
+        if self._verbose:
+            tqdm.write("possible matches found   \n fuzzy matching done\n")
+
+        self._possible_matches = np.vstack([result[0] for result in results])
+        self._cosine_scores = np.vstack([result[1] for result in results])
+
+        return pd.concat([result[2] for result in results])
+
+    def fuzzy_matches(
+        self, possible_matches: np.array, to_be_matched: pd.Series
+    ) -> pd.Series:
+        """A method which performs the fuzzy matching between the data in the 
+        to_be_matched series as well as the indicated indexes of the matching_data points
+        which are possible matching candidates.
+
+        Parameters
+        ----------
+        possible_matches : np.array
+            An array containing the indexes of the matching data with potential matches
+        to_be_matched : pd.Series
+            The data which should be matched
+
+        Returns
+        -------
+        pd.Series
+            A series containing the match index from the matching_data dataframe. the name 
+            in the to_be_matched data, the name to which the datapoint was matched and a 
+            score between 0 (no match) and 100(perfect match) to indicate the quality of 
+            the matches.
+        """
+        if len(possible_matches.shape) > 1:
+            possible_matches = possible_matches[0]
+
+        data_matches = self._fuzzy_matches_batch(
+            possible_matches.reshape(1, -1), to_be_matched.to_frame().T
+        )
+
+        return data_matches.iloc[0]
+
+    def _fuzzy_matches_batch(
+        self,
+        possible_matches: np.array,
+        to_be_matched: pd.DataFrame,
+        cosine_scores: Union[np.array, None] = None,
+        mask_groups: Union[np.array, None] = None,
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """A method which performs the fuzzy matching for all the rows of the
+        to_be_matched dataframe at once. All the pairs of names and possible matches
+        are scored per metric, after which the output is assembled column-wise. If
+        cosine scores are given, possible matches below min_cosine are discarded, as
+        are the rows removed by remove_master_rows and the rows outside of the
+        candidate mask. Rows without any possible match left are not scored.
+
+        Parameters
+        ----------
+        possible_matches : np.array
+            A 2-D array containing for each row of to_be_matched the indexes of the
+            matching data with potential matches
+        to_be_matched : pd.DataFrame
+            The data which should be matched
+        cosine_scores : Union[np.array, None]
+            A 2-D array containing the cosine similarities of the possible matches
+            default=None
+        mask_groups : Union[np.array, None]
+            The row of the candidate mask which is used for each of the rows of
+            to_be_matched, or None if no candidate mask is used
+            default=None
+
+        Returns
+        -------
+        Union[pd.Series, pd.DataFrame]
+            A dataframe containing the match index from the matching_data dataframe. the
+            name in the to_be_matched data, the name to which the datapoint was matched
+            and a score between 0 (no match) and 100(perfect match) to indicate the
+            quality of the matches. If the scores of all the algorithms should be
+            returned a series containing the score arrays for each row is returned.
+        """
+        possible_matches = possible_matches.astype(int)
+        original_names = to_be_matched[self._column_matching].values
+        list_possible_matches = self._df_matching_data[self._column].values[
+            possible_matches
+        ]
+
+        candidates = self._possible_match_mask(
+            possible_matches, cosine_scores, mask_groups
+        )
+        if self._cascade is not None:
+            candidates = self._cascade_candidates(
+                original_names, list_possible_matches, candidates
+            )
+            matched = candidates.any(axis=1)
+            match_score = self._score_candidates(
+                original_names, list_possible_matches, candidates, self._verbose
+            )
+        elif candidates is not None:
+            matched = candidates.any(axis=1)
+            match_score = np.zeros(
+                possible_matches.shape + (self._num_distance_metrics,)
+            )
+            match_score[matched] = self._score_matches_batch(
+                original_names[matched], list_possible_matches[matched]
+            )
+            match_score[~candidates] = 0
+        else:
+            matched = np.ones(len(original_names), dtype=bool)
+            match_score = self._score_matches_batch(
+                original_names, list_possible_matches
+            )
+        if self._return_algorithms_score:
+            return pd.Series(list(match_score), index=to_be_matched.index, dtype=object)
+        ind = self._rate_matches_batch(match_score)
+
+        match_names = np.take_along_axis(list_possible_matches, ind, axis=1)
+        match_indexes = np.take_along_axis(possible_matches, ind, axis=1)
+        scores = self._adjust_scores_batch(match_score, ind)
+
+        if len(self._word_set):
+            scores[matched] = self._postprocess_batch(
+                original_names[matched], match_names[matched]
+            )
+
+        if not matched.all():
+            match_names[~matched] = None
+            match_indexes = match_indexes.astype(float)
+            match_indexes[~matched] = np.nan
+            scores[~matched] = 0
+
+        data_matches = {"original_name": original_names}
+        for num in range(self._number_of_matches):
+            data_matches[f"match_name_{num}"] = match_names[:, num]
+            data_matches[f"score_{num}"] = scores[:, num]
+            data_matches[f"match_index_{num}"] = match_indexes[:, num]
+            if self._return_cosine_score & (cosine_scores is not None):
+                data_matches[f"cosine_score_{num}"] = np.take_along_axis(
+                    cosine_scores, ind, axis=1
+                )[:, num]
+
+        return pd.DataFrame(data_matches, index=to_be_matched.index)
+
+    def _possible_match_mask(
+        self,
+        possible_matches: np.array,
+        cosine_scores: Union[np.array, None],
+        mask_groups: Union[np.array, None] = None,
+    ) -> Union[np.array, None]:
+        """Determines which of the possible matches should be taken into account in the
+        fuzzy matching. Possible matches with a cosine similarity below min_cosine, rows
+        removed by remove_master_rows and rows outside of the candidate mask are
+        discarded.
+
+        Parameters
+        ----------
+        possible_matches : np.array
+            A 2-D array containing for each name the indexes of the possible matches
+        cosine_scores : Union[np.array, None]
+            A 2-D array containing the cosine similarities of the possible matches
+        mask_groups : Union[np.array, None]
+            The row of the candidate mask which is used for each of the names, or None
+            if no candidate mask is used
+            default=None
+
+        Returns
+        -------
+        Union[np.array, None]
+            A 2-D boolean array indicating the possible matches which are kept, or None
+            if all the possible matches are kept
+        """
+        candidates = None
+        if (cosine_scores is not None) & (self._min_cosine > 0):
+            candidates = cosine_scores >= self._min_cosine
+        if self._removed is not None:
+            live = ~self._removed[possible_matches]
+            candidates = live if candidates is None else candidates & live
+        if mask_groups is not None:
+            allowed = self._candidate_mask[mask_groups[:, np.newaxis], possible_matches]
+            candidates = allowed if candidates is None else candidates & allowed
+
+        return candidates
+
+    def _cascade_candidates(
+        self,
+        names: np.array,
+        possible_names: np.array,
+        candidates: Union[np.array, None],
+    ) -> np.array:
+        """Reduces the possible matches with the stages of the cascade. In each stage
+        the remaining possible matches are scored with the metrics of the stage and
+        the possible matches with the highest mean score are kept, on equal scores the
+        possible match with the higher cosine similarity is kept.
+
+        Parameters
+        ----------
+        names : np.array
+            The names which should be matched
+        possible_names : np.array
+            A 2-D array with for each of the names the names of the possible matches
+        candidates : Union[np.array, None]
+            A 2-D boolean array indicating the possible matches which can be matched,
+            or None if all the possible matches can be matched
+
+        Returns
+        -------
+        np.array
+            A 2-D boolean array indicating the possible matches which are kept
+        """
+        if candidates is None:
+            candidates = np.ones(possible_names.shape, dtype=bool)
+        for methods, number_kept in self._cascade:
+            if number_kept >= possible_names.shape[1]:
+                continue
+            rows, columns = np.nonzero(candidates)
+            stage_score = np.full(possible_names.shape, -np.inf)
+            stage_score[rows, columns] = self._score_pairs(
+                names[rows], possible_names[rows, columns], False, methods
+            ).mean(axis=1)
+            kept = np.argsort(-stage_score, axis=1, kind="stable")[:, :number_kept]
+            selected = np.zeros(possible_names.shape, dtype=bool)
+            np.put_along_axis(selected, kept, True, axis=1)
+            candidates = candidates & selected
+
+        return candidates
+
+    def _score_candidates(
+        self,
+        names: np.array,
+        possible_names: np.array,
+        candidates: np.array,
+        verbose: bool,
+    ) -> np.array:
+        """Scores only the possible matches which are candidates with each of the
+        enabled metrics, the other possible matches get a score of 0.
+
+        Parameters
+        ----------
+        names : np.array
+            The names which should be matched
+        possible_names : np.array
+            A 2-D array with for each of the names the names of the possible matches
+        candidates : np.array
+            A 2-D boolean array indicating the possible matches which are scored
+        verbose : bool
+            A boolean indicating whether the progress over the metrics should be printed
+
+        Returns
+        -------
+        np.array
+            A 3-D array with the score of each of the names (first axis) with respect to
+            each of its possible matches (second axis) for each of the different metrics
+            which are assessed (third axis).
+        """
+        match_score = np.zeros(possible_names.shape + (self._num_distance_metrics,))
+        rows, columns = np.nonzero(candidates)
+        match_score[rows, columns] = self._score_pairs(
+            names[rows], possible_names[rows, columns], verbose
+        )
+
+        return match_score
+
+    def _score_matches(
+        self, to_be_matched_instance: str, possible_matches: list
+    ) -> np.array:
+        """A method to score a name to_be_matched_instance to a list of possible matches. 
+        The scoring is done based on all the metrics which are enabled.
+
+        Parameters
+        ----------
+        to_be_matched_instance : str
+            The name which should match one of the possible matches
+        possible_matches : list
+            list of the names of the possible matches
+
+        Returns
+        -------
+        np.array
+            The score of each of the matches with respect to the different metrics which 
+            are assessed.
+        """
+        possible_names = np.array(possible_matches, dtype=object)
+
+        return self._score_pairs(
+            np.full(len(possible_names), to_be_matched_instance, dtype=object),
+            possible_names,
+            False,
+        )
+
+    def _score_matches_batch(
+        self, to_be_matched_names: np.array, possible_matches: np.array
+    ) -> np.array:
+        """A method to score a set of names to their possible matches. All the pairs
+        are scored by each of the enabled metrics in one go and stored in a single
+        preallocated array.
+
+        Parameters
+        ----------
+        to_be_matched_names : np.array
+            The names which should match one of their possible matches
+        possible_matches : np.array
+            A 2-D array with for each of the to_be_matched_names the names of the
+            possible matches
+
+        Returns
+        -------
+        np.array
+            A 3-D array with the score of each of the names (first axis) with respect to
+            each of its possible matches (second axis) for each of the different metrics
+            which are assessed (third axis).
+        """
+        num_rows, num_possible_matches = possible_matches.shape
+        match_score = self._score_pairs(
+            np.repeat(to_be_matched_names, num_possible_matches),
+            possible_matches.ravel(),
+            self._verbose,
+        )
+
+        return match_score.reshape(
+            num_rows, num_possible_matches, self._num_distance_metrics
+        )
+
+    def _score_pairs(
+        self,
+        names: np.array,
+        possible_names: np.array,
+        verbose: bool,
+        methods: Union[list, None] = None,
+    ) -> np.array:
+        """Scores pairs of names by each of the enabled metrics. Every distinct pair is
+        scored only once and pairs which are in the score cache are not scored at all.
+
+        Parameters
+        ----------
+        names : np.array
+            The first names of the pairs
+        possible_names : np.array
+            The second names of the pairs
+        verbose : bool
+            A boolean indicating whether the progress over the metrics should be printed
+        methods : Union[list, None]
+            The metrics with which the pairs are scored instead of the enabled metrics,
+            the score cache is only used for the enabled metrics
+            default=None
+
+        Returns
+        -------
+        np.array
+            A 2-D array with the score of each of the pairs (first axis) for each of the
+            different metrics which are assessed (second axis)
+        """
+        name_codes, unique_names = pd.factorize(names)
+        possible_codes, unique_possible_names = pd.factorize(possible_names)
+        _, pair_index, pair_inverse = np.unique(
+            name_codes.astype(np.int64) * len(unique_possible_names) + possible_codes,
+            return_index=True,
+            return_inverse=True,
+        )
+        pair_names = names[pair_index]
+        pair_possible_names = possible_names[pair_index]
+
+        use_cache = (methods is None) & (self._score_cache.maxsize > 0)
+        if methods is None:
+            methods = [
+                method
+                for method_list in self._distance_metrics.values()
+                for method in method_list
+            ]
+        pair_score = np.zeros((len(pair_index), len(methods)))
+        missing = np.ones(len(pair_index), dtype=bool)
+        if use_cache:
+            cached = self._score_cache.get_many(zip(pair_names, pair_possible_names))
+            for num, scores in enumerate(cached):
+                if scores is not None:
+                    pair_score[num] = scores
+                    missing[num] = False
+            pair_names = pair_names[missing]
+            pair_possible_names = pair_possible_names[missing]
+
+        for idx, method in enumerate(tqdm(methods, disable=not verbose)):
+            pair_score[missing, idx] = np.fromiter(
+                map(method.sim, pair_names, pair_possible_names),
+                dtype=float,
+                count=len(pair_names),
+            )
+
+        if use_cache:
+            self._score_cache.put_many(
+                zip(pair_names, pair_possible_names), pair_score[missing].tolist()
+            )
+
+        return pair_score[pair_inverse.ravel()]
+
+    def _rate_matches(self, match_score: np.array) -> np.array:
+        """Converts the match scores from the score_matches method to a list of indexes of 
+        the best scoring matches limited to the _number_of_matches.
+
+        Parameters
+        ----------
+        match_score : np.array
+            An array containing the scores of each of the possible alternatives for each
+            of the different methods used
+
+        Returns
+        -------
+        np.array
+            The indexes of the best rated matches
+        """
+        if self._number_of_matches == 1:
+            ind = [np.argmax(np.mean(match_score, axis=1))]
+        elif self._number_of_matches == len(self._distance_metrics):
+            ind = np.zeros(len(self._distance_metrics))
+            idx = 0
+            for num, method_list in enumerate(self._distance_metrics.values()):
+                method_grouped_results = np.reshape(
+                    match_score[:, idx : idx + len(method_list)], (-1, len(method_list))
+                )
+                ind[num] = np.argmax(np.mean(method_grouped_results, axis=1))
+                idx = idx + len(method_list)
+        elif self._number_of_matches == self._num_distance_metrics:
+            ind = np.argmax(match_score, axis=0).reshape(-1)
+        else:
+            ind = np.argsort(np.mean(match_score, axis=1))[-self._number_of_matches :][
+                ::-1
+            ]
+
+        return np.array(ind, dtype=int)
+
+    def _rate_matches_batch(self, match_score: np.array) -> np.array:
+        """Converts the match scores from the _score_matches_batch method to an array
+        with for each name the indexes of the best scoring matches limited to the
+        _number_of_matches.
+
+        Parameters
+        ----------
+        match_score : np.array
+            A 3-D array containing the scores of each of the possible alternatives for
+            each of the different methods used for all of the names
+
+        Returns
+        -------
+        np.array
+            A 2-D array with for each name the indexes of the best rated matches
+        """
+        if self._number_of_matches == 1:
+            ind = np.argmax(np.mean(match_score, axis=2), axis=1).reshape(-1, 1)
+        elif self._number_of_matches == len(self._distance_metrics):
+            ind = np.zeros((len(match_score), len(self._distance_metrics)))
+            idx = 0
+            for num, method_list in enumerate(self._distance_metrics.values()):
+                method_grouped_results = match_score[:, :, idx : idx + len(method_list)]
+                ind[:, num] = np.argmax(np.mean(method_grouped_results, axis=2), axis=1)
+                idx = idx + len(method_list)
+        elif self._number_of_matches == self._num_distance_metrics:
+            ind = np.argmax(match_score, axis=1)
+        else:
+            ind = np.argsort(np.mean(match_score, axis=2), axis=1)[
+                :, -self._number_of_matches :
+            ][:, ::-1]
+
+        return np.array(ind, dtype=int)
+
+    def _get_alternative_names(self, match: pd.Series) -> list:
+        """Gets all the possible match names from the match.
+
+        Parameters
+        ----------
+        match : pd.Series
+            The series with the possible matches and original scores
+
+        Returns
+        -------
+        list
+            A list with the alternative names for this match
+        """
+        alt_names = []
+
+        for num in range(self._number_of_matches):
+            alt_names.append(str(match[f"match_name_{num}"]))
+
+        return alt_names
+
+    def _process_words(self, org_name: str, alt_names: list) -> Tuple[str, list]:
+        """Removes the words from the word list from the org_name and all the names in 
+        alt_names .
+
+        Parameters
+        ----------
+        org_name : str
+            The original name for the matching data
+        alt_names : list
+            A list of names from which the words should be removed
+
+        Returns
+        -------
+        Tuple[str, list]
+            The processed version of the org_name and the alt_names, with the words
+            removed
+        """
+        len_atl_names = len(alt_names)
+        for word in self._word_set:
+            org_name = " ".join(sub(rf"\b{escape(word)}\b", "", org_name).split())
+            for num in range(len_atl_names):
+                alt_names[num] = " ".join(
+                    sub(rf"\b{escape(word)}\b", "", alt_names[num]).split()
+                )
+
+        return org_name, alt_names
+
+    def _adjust_scores(self, match_score: np.array, match: pd.Series) -> pd.Series:
+        """Adjust the scores to be between 0 and 100
+
+        Parameters
+        ----------
+        match_score : np.array
+            An array with the scores for each of the options
+        match : pd.Series
+            The series with the possible matches and original scores
+
+        Returns
+        -------
+        pd.Series
+            The series with the possible matches and adjusted scores
+        """
+        for num in range(self._number_of_matches):
+            match[f"score_{num}"] = 100 * np.mean(match_score[num, :])
+
+        return match
+
+    def _adjust_scores_batch(self, match_score: np.array, ind: np.array) -> np.array:
+        """Selects the scores of the best rated matches and adjusts them to be between
+        0 and 100
+
+        Parameters
+        ----------
+        match_score : np.array
+            A 3-D array with the scores for each of the options of all the names
+        ind : np.array
+            A 2-D array with for each name the indexes of the best rated matches
+
+        Returns
+        -------
+        np.array
+            A 2-D array with for each name the adjusted scores of the best rated matches
+        """
+        return 100 * np.mean(
+            np.take_along_axis(match_score, ind[:, :, np.newaxis], axis=1), axis=2
+        )
+
+    def postprocess(self, match: pd.Series) -> pd.Series:
+        """Postprocesses the scores to exclude certain specific company words or the 
+        most common words. In this method only the scores are adjusted, the matches 
+        still stand.
+
+        Parameters
+        ----------
+        match : pd.Series
+            The series with the possible matches and original scores
+
+        Returns
+        -------
+        pd.Series
+            A new version of the input series with updated scores
+        """
+        alt_names = self._get_alternative_names(match)
+        org_name = str(match["original_name"])
+
+        org_name, alt_names = self._process_words(org_name, alt_names)
+
+        match_score = self._score_matches(org_name, alt_names)
+        ind = self._rate_matches(match_score)
+
+        match = self._adjust_scores(match_score[ind, :], match)
+
+        return match
+
+    def _postprocess_batch(
+        self, original_names: np.array, match_names: np.array
+    ) -> np.array:
+        """Postprocesses the scores of all the names at once to exclude certain specific
+        company words or the most common words. In this method only the scores are
+        adjusted, the matches still stand.
+
+        Parameters
+        ----------
+        original_names : np.array
+            The names of the data which should be matched
+        match_names : np.array
+            A 2-D array with for each of the original_names the names of the matches
+
+        Returns
+        -------
+        np.array
+            A 2-D array with for each name the updated scores
+        """
+        org_names = np.empty(len(original_names), dtype=object)
+        alt_names = np.empty(match_names.shape, dtype=object)
+        for num, (org_name, match_name) in enumerate(zip(original_names, match_names)):
+            org_names[num], alt_names[num, :] = self._process_words(
+                str(org_name), [str(name) for name in match_name]
+            )
+
+        match_score = self._score_matches_batch(org_names, alt_names)
+        ind = self._rate_matches_batch(match_score)
+
+        return self._adjust_scores_batch(match_score, ind)
+
+    def _vectorise_data(self, transform: bool = True):
+        """Fits the n-gram encoder, which generates ngrams and weights them based on the
+        occurrance, on the matching data. If the data should also be transformed and
+        the encoder has a fit_transform method, the n-grams of the matching data are
+        generated only once for the fit and the transform.
 
         Parameters
         ----------
@@ -659,38 +2231,575 @@ class NameMatcher:
             vectoriser is initialised
             default: True
         """
-        self._vec.fit(self._df_matching_data[self._column].values.flatten())
-        if transform:
-            self.transform_data()
+        names = self._df_matching_data[self._column].astype(str)
+        if transform and hasattr(self._vec, "fit_transform"):
+            ngrams = self._vec.fit_transform(names)
+        else:
+            self._vec.fit(names)
+            ngrams = self._vec.transform(names) if transform else None
+        self._rows_fitted = len(self._df_matching_data)
+        self._rows_changed = 0
+        if ngrams is not None:
+            self._set_matching_ngrams(ngrams)
 
     def transform_data(self):
         """A method which transforms the matching data based on the ngrams transformer.
         After the transformation (the generation of the ngrams), the data is normalised 
         by dividing each row by the sum of the row. Subsequently the data is changed to 
-        a coo sparse matrix format with the column indices in ascending order.
+        a coo sparse matrix format with the column indices in ascending order. Finally
+        the hash index used for the exact matches is built.
+        """
+        self._set_matching_ngrams(
+            self._vec.transform(self._df_matching_data[self._column].astype(str))
+        )
+
+    def _set_matching_ngrams(self, ngrams: spmatrix) -> None:
+        """Stores the n-grams of the matching data, without the n-grams removed by
+        ngram_max_df and ngram_top_k, normalised by dividing each row by the sum of the
+        row and converted to the index_dtype, in the csc format or the coo format for
+        the low memory approach, and builds the hash index used for the exact matches.
+
+        Parameters
+        ----------
+        ngrams : spmatrix
+            The csr matrix with the n-grams of the matching data
         """
-        ngrams = self._vec.transform(self._df_matching_data[self._column].astype(str))
-        for i, j in zip(ngrams.indptr[:-1], ngrams.indptr[1:]):
-            ngrams.data[i:j] = ngrams.data[i:j] / np.sum(ngrams.data[i:j])
+        self._pruned_ngrams = self._frequent_ngrams(ngrams)
+        ngrams, self._n_grams_scales = self._index_ngram_rows(ngrams)
         self._n_grams_matching = ngrams.tocsc()
+        self._n_grams_norms = None
+        self._candidate_index = None
+        self._lsh_signatures = None
+        self._mmap_index_path = None
+        if self._low_memory:
+            self._n_grams_matching = self._n_grams_matching.tocoo()
+        if self._removed is not None:
+            self._zero_master_rows(self._removed)
+        self._build_exact_index()
+
+    def _index_ngram_rows(
+        self, ngrams: spmatrix
+    ) -> Tuple[csr_matrix, Union[np.array, None]]:
+        """Converts the n-grams of names of the matching data to rows of the n-grams
+        matrix of the matching data, by removing the pruned n-grams, normalising the
+        rows and converting them to the index_dtype.
+
+        Parameters
+        ----------
+        ngrams : spmatrix
+            The n-grams of the names generated by the n-gram encoder
+
+        Returns
+        -------
+        Tuple[csr_matrix, Union[np.array, None]]
+            The csr matrix with the rows and the scales of the rows, or None if the
+            values are not quantised
+        """
+        return self._quantise_ngram_rows(
+            self._normalise_ngram_rows(self._prune_ngram_rows(ngrams))
+        )
+
+    def _frequent_ngrams(self, ngrams: spmatrix) -> Union[np.array, None]:
+        """Determines the n-grams which occur in more names of the matching data than
+        allowed by ngram_max_df.
+
+        Parameters
+        ----------
+        ngrams : spmatrix
+            The n-grams of the names of the matching data
+
+        Returns
+        -------
+        Union[np.array, None]
+            A boolean array indicating for each n-gram whether it should be removed, or
+            None if ngram_max_df is not used
+        """
+        if self._ngram_max_df is None:
+            return None
+
+        ngrams = csr_matrix(ngrams)
+        document_frequency = np.bincount(ngrams.indices, minlength=ngrams.shape[1])
+        if isinstance(self._ngram_max_df, float):
+            return document_frequency > self._ngram_max_df * ngrams.shape[0]
+
+        return document_frequency > self._ngram_max_df
+
+    def _prune_ngram_rows(self, ngrams: spmatrix) -> csr_matrix:
+        """Removes the n-grams that occur too frequently in the matching data and the
+        n-grams outside of the ngram_top_k highest weights of each row. Rows of which
+        all the n-grams would be removed are kept as they are.
+
+        Parameters
+        ----------
+        ngrams : spmatrix
+            The n-grams of the names of the matching data
+
+        Returns
+        -------
+        csr_matrix
+            The csr matrix without the pruned n-grams
+        """
+        ngrams = csr_matrix(ngrams)
+        if (self._pruned_ngrams is None) and (self._ngram_top_k is None):
+            return ngrams
+
+        rows = np.repeat(np.arange(ngrams.shape[0]), np.diff(ngrams.indptr))
+        keep = np.ones(ngrams.nnz, dtype=bool)
+        if self._pruned_ngrams is not None:
+            keep &= ~self._pruned_ngrams[ngrams.indices]
+        if self._ngram_top_k is not None:
+            weights = np.where(keep, ngrams.data, -np.inf)
+            rank = np.empty(ngrams.nnz, dtype=np.int64)
+            rank[np.lexsort((-weights, rows))] = (
+                np.arange(ngrams.nnz) - ngrams.indptr[rows]
+            )
+            keep &= rank < self._ngram_top_k
+        keep |= (np.bincount(rows[keep], minlength=ngrams.shape[0]) == 0)[rows]
+        lengths = np.bincount(rows[keep], minlength=ngrams.shape[0])
+
+        return csr_matrix(
+            (
+                ngrams.data[keep],
+                ngrams.indices[keep],
+                np.concatenate(([0], np.cumsum(lengths))),
+            ),
+            shape=ngrams.shape,
+        )
+
+    def _normalise_ngram_rows(self, ngrams: spmatrix) -> spmatrix:
+        """Normalises the n-grams of the matching data by dividing each row by the sum
+        of the row.
+
+        Parameters
+        ----------
+        ngrams : spmatrix
+            The csr matrix with the n-grams of the matching data
+
+        Returns
+        -------
+        spmatrix
+            The normalised csr matrix
+        """
+        ngrams = csr_matrix(ngrams)
+        sums = np.asarray(ngrams.sum(axis=1)).ravel()
+        sums[sums == 0] = 1
+        ngrams.data /= np.repeat(sums, np.diff(ngrams.indptr)).astype(ngrams.dtype)
+
+        return ngrams
+
+    def _quantise_ngram_rows(
+        self, ngrams: csr_matrix
+    ) -> Tuple[csr_matrix, Union[np.array, None]]:
+        """Converts the normalised n-grams of the matching data to the index_dtype. For
+        the integer types the values of each row are divided by a scale for the row,
+        such that the largest value of the row is the maximum of the type, and rounded.
+        Values which are rounded to zero are removed.
+
+        Parameters
+        ----------
+        ngrams : csr_matrix
+            The normalised csr matrix with the n-grams of the matching data
+
+        Returns
+        -------
+        Tuple[csr_matrix, Union[np.array, None]]
+            The csr matrix in the index_dtype and the float32 scale of each of the
+            rows, or None if the values are not quantised
+        """
+        if self._index_dtype is None:
+            return ngrams, None
+        if self._index_dtype.kind == "f":
+            return ngrams.astype(self._index_dtype), None
+
+        maximum = np.asarray(ngrams.max(axis=1).todense()).ravel()
+        scales = (maximum / np.iinfo(self._index_dtype).max).astype(np.float32)
+        scales[scales == 0] = 1
+        data = np.rint(ngrams.data / np.repeat(scales, np.diff(ngrams.indptr)))
+        quantised = csr_matrix(
+            (data.astype(self._index_dtype), ngrams.indices, ngrams.indptr),
+            shape=ngrams.shape,
+        )
+        quantised.eliminate_zeros()
+
+        return quantised, scales
+
+    def save_index(self, path: str) -> None:
+        """Saves the fitted matching data to the directory path, such that it can be
+        loaded by load_index without preprocessing the matching data and refitting the
+        vectoriser. The vocabulary and idf weights of a TfidfVectorizer or the settings
+        and idf weights of a HashingNgramEncoder, the normalised n-grams of the matching
+        data with the scales of its rows if it is quantised, the n-grams removed by
+        ngram_max_df, the preprocessed matching data, the rows removed by
+        remove_master_rows, the MinHash signatures of a MinHashLSH candidate generator
+        and the set of no scoring words are stored. Other n-gram encoders are pickled.
+
+        Parameters
+        ----------
+        path : str
+            The directory in which the index should be stored, the directory is created
+            if it does not exist
+        """
+        if self._n_grams_matching is None:
+            raise RuntimeError(
+                "Only a transformed matching data index can be saved. To transform the "
+                + "data, run transform_data or run load_and_process_master_data with "
+                + "transform=True"
+            )
+        os.makedirs(path, exist_ok=True)
+
+        n_grams_matching = self._n_grams_matching.tocsc()
+        for name in ("data", "indices", "indptr"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(n_grams_matching, name))
+
+        encoder = {"ngrams": list(getattr(self._vec, "ngram_range", ()))}
+        if isinstance(self._vec, TfidfVectorizer) and (
+            self._vec.get_params()
+            == make_ngram_encoder("tfidf", self._vec.ngram_range).get_params()
+        ):
+            encoder["ngram_encoder"] = "tfidf"
+            terms = np.empty(len(self._vec.vocabulary_), dtype=object)
+            for term, idx in self._vec.vocabulary_.items():
+                terms[idx] = term
+            np.save(os.path.join(path, "vocabulary.npy"), terms.astype(str))
+            np.save(os.path.join(path, "idf.npy"), self._vec.idf_)
+        elif isinstance(self._vec, HashingNgramEncoder):
+            encoder["ngram_encoder"] = "hashing"
+            encoder["n_features"] = self._vec.n_features
+            encoder["dtype"] = self._vec.dtype.str
+            np.save(os.path.join(path, "idf.npy"), self._vec.idf_)
+        else:
+            encoder["ngram_encoder"] = "custom"
+            with open(os.path.join(path, "encoder.pkl"), "wb") as file:
+                pickle.dump(self._vec, file)
+
+        self._df_matching_data.to_pickle(os.path.join(path, "matching_data.pkl"))
+        removed_path = os.path.join(path, "removed.npy")
+        if self._removed is not None:
+            np.save(removed_path, self._removed)
+        elif os.path.exists(removed_path):
+            os.remove(removed_path)
+        lsh = None
+        if self._unfitted_minhash_lsh() is not None:
+            lsh = self._master_candidate_index().get_params()
+        for name, array in [
+            ("scales", self._n_grams_scales),
+            ("pruned_ngrams", self._pruned_ngrams),
+            ("lsh_signatures", self._lsh_signatures if lsh else None),
+        ]:
+            array_path = os.path.join(path, f"{name}.npy")
+            if array is not None:
+                np.save(array_path, array)
+            elif os.path.exists(array_path):
+                os.remove(array_path)
+
+        meta = {
+            "format_version": _INDEX_FORMAT_VERSION,
+            "column": self._column,
+            "shape": list(n_grams_matching.shape),
+            "index_dtype": (
+                None if self._index_dtype is None else self._index_dtype.name
+            ),
+            "ngram_max_df": self._ngram_max_df,
+            "ngram_top_k": self._ngram_top_k,
+            "minhash_lsh": lsh,
+            **encoder,
+            "lowercase": self._preprocess_lowercase,
+            "punctuations": self._preprocess_punctuations,
+            "remove_ascii": self._preprocess_ascii,
+            "word_set": sorted(self._word_set),
+        }
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+
+    def load_index(self, path: str, mmap_mode: Union[str, None] = None) -> None:
+        """Loads an index which was stored with save_index. The matching data, the
+        vectoriser, the n-grams of the matching data and the set of no scoring words
+        are restored, together with the preprocessing settings that were used to build
+        the index, as well as the index_dtype, ngram_max_df and ngram_top_k with which
+        the n-grams are stored. The settings for the fuzzy matching and the candidate
+        generator are taken from this NameMatcher, stored MinHash signatures are used
+        if its MinHashLSH has the same bands, rows and seed.
+        Note that the matching data and custom n-gram encoders are stored as a pickle,
+        so only indexes from a trusted source should be loaded.
+
+        Parameters
+        ----------
+        path : str
+            The directory in which the index is stored
+        mmap_mode : str
+            If given, the arrays of the n-grams matrix are memory mapped with this mode
+            (see np.load) instead of being read into memory. With mmap_mode="r" all the
+            processes on a host which load the same index share one physical copy of the
+            n-grams matrix via the page cache. The processes started for n_jobs > 1
+            also memory map the index instead of copying it to shared memory.
+            default=None
+        """
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta["format_version"] != _INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"The index in {path} has format version {meta['format_version']}, "
+                + f"only version {_INDEX_FORMAT_VERSION} is supported"
+            )
+
+        self._preprocess_lowercase = meta["lowercase"]
+        self._preprocess_punctuations = meta["punctuations"]
+        self._preprocess_ascii = meta["remove_ascii"]
+        self._word_set = set(meta["word_set"])
+
+        ngram_encoder = meta.get("ngram_encoder", "tfidf")
+        if ngram_encoder == "custom":
+            with open(os.path.join(path, "encoder.pkl"), "rb") as file:
+                self._vec = pickle.load(file)
+        else:
+            self._vec = make_ngram_encoder(
+                ngram_encoder, tuple(meta["ngrams"]), self._n_jobs
+            )
+            self._vec.idf_ = np.load(os.path.join(path, "idf.npy"))
+        if ngram_encoder == "tfidf":
+            terms = np.load(os.path.join(path, "vocabulary.npy"))
+            self._vec.vocabulary_ = {
+                term: idx for idx, term in enumerate(terms.tolist())
+            }
+        elif ngram_encoder == "hashing":
+            self._vec.n_features = meta["n_features"]
+            self._vec.dtype = np.dtype(meta["dtype"])
+
+        index_dtype = meta.get("index_dtype")
+        self._index_dtype = None if index_dtype is None else np.dtype(index_dtype)
+        self._ngram_max_df = meta.get("ngram_max_df")
+        self._ngram_top_k = meta.get("ngram_top_k")
+        scales_path = os.path.join(path, "scales.npy")
+        self._n_grams_scales = (
+            np.load(scales_path) if os.path.exists(scales_path) else None
+        )
+        pruned_path = os.path.join(path, "pruned_ngrams.npy")
+        self._pruned_ngrams = (
+            np.load(pruned_path) if os.path.exists(pruned_path) else None
+        )
+        self._n_grams_norms = None
+        self._candidate_index = None
+        self._lsh_signatures = None
+        generator = self._unfitted_minhash_lsh()
+        if (generator is not None) and (
+            meta.get("minhash_lsh") == generator.get_params()
+        ):
+            self._lsh_signatures = np.load(os.path.join(path, "lsh_signatures.npy"))
+        self._n_grams_matching = load_sparse_matrix(
+            path,
+            tuple(meta["shape"]),
+            "coo" if self._low_memory else "csc",
+            mmap_mode=mmap_mode,
+        )
+        self._mmap_index_path = None if mmap_mode is None else path
+
+        self._column = meta["column"]
+        self._df_matching_data = pd.read_pickle(
+            os.path.join(path, "matching_data.pkl")
+        )
+        self._original_index = self._df_matching_data.index
+        removed_path = os.path.join(path, "removed.npy")
+        self._removed = np.load(removed_path) if os.path.exists(removed_path) else None
+        self._rows_fitted = len(self._df_matching_data)
+        self._rows_changed = 0
+        self._build_exact_index()
+        self._preprocessed = True
+
+    def add_master_rows(self, df: pd.DataFrame) -> None:
+        """Adds rows to the matching data without refitting the vectoriser. The names
+        of the new rows are preprocessed and transformed with the existing vocabulary
+        and idf weights, after which their n-grams are appended to the n-grams of the
+        matching data. N-grams which do not occur in the vocabulary are ignored until
+        the vectoriser is refitted, see compact_master_data.
+
+        The labels of the index of df are kept as the labels of the new rows, these
+        should be unique and should not occur in the matching data yet, including the
+        rows which are removed but not yet compacted. A dataframe with a default index
+        should therefore be given labels after those of the matching data first, for
+        instance with df.set_axis(range(start, start + len(df))).
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The rows which should be added, containing the column of the matching data
+        """
+        self._check_master_update()
+        if self._column not in df.columns:
+            raise ValueError(f"The column {self._column} is not in the new rows")
+
+        if (not df.index.is_unique) or df.index.isin(self._original_index).any():
+            raise ValueError(
+                "The index of the new rows should be unique and should not contain "
+                + "labels of the matching data"
+            )
+        df = self.preprocess(df.copy(), self._column)
+        ngrams = self._vec.transform(df[self._column].astype(str))
+        ngrams, scales = self._index_ngram_rows(ngrams)
+
+        number_of_rows = len(self._df_matching_data)
+        self._df_matching_data = pd.concat([self._df_matching_data, df])
+        self._original_index = self._df_matching_data.index
+        self._n_grams_matching = vstack([self._n_grams_matching, ngrams], format="csc")
+        self._candidate_index = None
+        if self._lsh_signatures is not None:
+            self._lsh_signatures = np.concatenate(
+                (
+                    self._lsh_signatures,
+                    self._unfitted_minhash_lsh().signatures(ngrams),
+                )
+            )
         if self._low_memory:
             self._n_grams_matching = self._n_grams_matching.tocoo()
+        self._mmap_index_path = None
+        if self._n_grams_scales is not None:
+            self._n_grams_scales = np.concatenate((self._n_grams_scales, scales))
+        if self._n_grams_norms is not None:
+            self._n_grams_norms = np.concatenate(
+                (self._n_grams_norms, self._row_norms(ngrams, scales))
+            )
+        if self._removed is not None:
+            self._removed = np.concatenate(
+                (self._removed, np.zeros(len(df), dtype=bool))
+            )
+
+        names = df[self._column].astype(str)
+        new_names = (~names.duplicated()).values & (names != "").values
+        new_names = new_names & (self._exact_names.get_indexer(names.values) < 0)
+        self._exact_names = self._exact_names.append(
+            pd.Index(names.values[new_names])
+        )
+        self._exact_rows = np.concatenate(
+            (self._exact_rows, number_of_rows + np.flatnonzero(new_names))
+        )
+
+        self._rows_changed = self._rows_changed + len(df)
+        self._check_refit()
+
+    def remove_master_rows(self, index: Iterable) -> None:
+        """Removes rows from the matching data. The rows are marked as removed and are
+        no longer returned as a match, they are only deleted from the matching data by
+        compact_master_data.
+
+        Parameters
+        ----------
+        index : Iterable
+            The labels of the rows in the index of the matching data which should be
+            removed
+        """
+        self._check_master_update()
+        labels = pd.Index(index)
+        rows = self._original_index.isin(labels)
+        missing = labels[~labels.isin(self._original_index)]
+        if len(missing) > 0:
+            raise KeyError(f"{list(missing)} not found in the matching data")
+
+        if self._removed is None:
+            self._removed = np.zeros(len(self._df_matching_data), dtype=bool)
+        rows = rows & ~self._removed
+        self._removed = self._removed | rows
+        self._zero_master_rows(rows)
+        self._build_exact_index()
+
+        self._rows_changed = self._rows_changed + int(rows.sum())
+        self._check_refit()
+
+    def compact_master_data(self, refit: bool = True) -> None:
+        """Deletes the rows removed by remove_master_rows from the matching data and
+        optionally refits the vectoriser, such that the vocabulary and idf weights
+        include the rows added by add_master_rows. After the deletion the row numbers
+        of the remaining rows are changed.
+
+        Parameters
+        ----------
+        refit : bool
+            A boolean indicating whether the vectoriser should be refitted on the
+            matching data, if False only the removed rows are deleted
+            default=True
+        """
+        self._check_master_update()
+        if self._removed is not None:
+            live = ~self._removed
+            self._df_matching_data = self._df_matching_data[live]
+            self._original_index = self._df_matching_data.index
+            self._removed = None
+            if not refit:
+                self._n_grams_matching = self._n_grams_matching.tocsr()[live].tocsc()
+                self._candidate_index = None
+                if self._lsh_signatures is not None:
+                    self._lsh_signatures = self._lsh_signatures[live]
+                if self._low_memory:
+                    self._n_grams_matching = self._n_grams_matching.tocoo()
+                self._mmap_index_path = None
+                if self._n_grams_scales is not None:
+                    self._n_grams_scales = self._n_grams_scales[live]
+                if self._n_grams_norms is not None:
+                    self._n_grams_norms = self._n_grams_norms[live]
+                self._build_exact_index()
+        if refit:
+            self._vectorise_data(transform=True)
+
+    def _check_master_update(self) -> None:
+        """Checks whether the matching data can be updated."""
+        if self._n_grams_matching is None:
+            raise RuntimeError(
+                "Only transformed matching data can be updated. To transform the "
+                + "data, run transform_data or run load_and_process_master_data with "
+                + "transform=True"
+            )
+        if self._executor is not None:
+            raise RuntimeError(
+                "The matching data can not be updated while the worker processes use it"
+            )
 
-    def _search_for_possible_matches(self, to_be_matched: pd.DataFrame) -> np.array:
+    def _check_refit(self) -> None:
+        """Compacts the matching data and refits the vectoriser if the number of rows
+        which are added or removed since the last fit exceeds the refit_fraction."""
+        if (self._refit_fraction is not None) and (
+            self._rows_changed > self._refit_fraction * self._rows_fitted
+        ):
+            self.compact_master_data(refit=True)
+
+    def _zero_master_rows(self, rows: np.array) -> None:
+        """Sets the n-grams of rows of the matching data to zero, such that these rows
+        are not found as possible matches.
+
+        Parameters
+        ----------
+        rows : np.array
+            A boolean array indicating the rows which should be set to zero
+        """
+        matrix = self._n_grams_matching
+        entries = rows[matrix.indices if matrix.format == "csc" else matrix.row]
+        if entries.any():
+            if not matrix.data.flags.writeable:
+                matrix.data = np.array(matrix.data)
+                self._mmap_index_path = None
+            matrix.data[entries] = 0
+        if self._n_grams_norms is not None:
+            self._n_grams_norms[rows] = 0
+        self._candidate_index = None
+
+    def _search_for_possible_matches(
+        self, to_be_matched: pd.DataFrame, mask_groups: Union[np.array, None] = None
+    ) -> Tuple[np.array, np.array]:
         """Generates ngrams from the data which should be matched, calculate the cosine 
         simularity between these data and the matching data. Hereafter a top n of the 
         matches is selected and returned.
 
         Parameters
         ----------
-        to_be_matched : pd.Series
-            A series containing a single instance of the data to be matched
+        to_be_matched : pd.DataFrame
+            A dataframe containing the data to be matched
+        mask_groups : Union[np.array, None]
+            The row of the candidate mask which is used for each of the rows of
+            to_be_matched, or None if no candidate mask is used
+            default=None
 
         Returns
         -------
-        np.array
+        Tuple[np.array, np.array]
             An array of top n values which are most closely matched to the to be matched 
-            data based on the ngrams
+            data based on the ngrams and an array with their cosine similarities
         """
         if self._n_grams_matching is None:
             raise RuntimeError(
@@ -699,38 +2808,256 @@ class NameMatcher:
                 + """ or run load_and_process_master_data with transform=True"""
             )
 
-        if self._low_memory:
-            results = np.zeros((len(to_be_matched), self._top_n))
-            input_data = to_be_matched[self._column_matching]
-            for idx, row_name in enumerate(tqdm(input_data, disable=not self._verbose)):
-                match_ngrams = self._vec.transform([row_name])
-                results[idx, :] = sparse_cosine_top_n(
-                    matrix_a=self._n_grams_matching,
-                    matrix_b=match_ngrams,
-                    top_n=self._top_n,
-                    low_memory=self._low_memory,
-                    number_of_rows=self._number_of_rows,
-                    verbose=self._verbose,
+        match_ngrams = self._vec.transform(to_be_matched[self._column_matching].tolist())
+
+        return self._search_for_possible_ngram_matches(match_ngrams, mask_groups)
+
+    def _search_for_possible_ngram_matches(
+        self, match_ngrams: spmatrix, mask_groups: Union[np.array, None] = None
+    ) -> Tuple[np.array, np.array]:
+        """Calculates the cosine simularity between the ngrams of the data which should
+        be matched and the ngrams of the matching data. Hereafter a top n of the matches
+        is selected and returned, ordered from the most to the least similar.
+
+        Parameters
+        ----------
+        match_ngrams : spmatrix
+            A sparse matrix containing the ngrams of the data to be matched
+        mask_groups : Union[np.array, None]
+            The row of the candidate mask which is used for each of the rows of
+            match_ngrams, if None the candidate mask is not used
+            default=None
+
+        Returns
+        -------
+        Tuple[np.array, np.array]
+            An array of top n values which are most closely matched to the to be matched 
+            data based on the ngrams and an array with their cosine similarities
+        """
+        if self._candidate_generator is not None:
+            return self._to_cosine_similarity(
+                *self._master_candidate_index().search(
+                    match_ngrams,
+                    self._top_n,
+                    row_range=self._master_rows,
+                    candidate_mask=None if mask_groups is None else self._candidate_mask,
+                    mask_groups=mask_groups,
                 )
+            )
+        if self._low_memory:
+            match_ngrams = match_ngrams.tocsr()
         else:
-            match_ngrams = self._vec.transform(
-                to_be_matched[self._column_matching].tolist()
-            ).tocsc()
-            results = sparse_cosine_top_n(
-                matrix_a=self._n_grams_matching,
-                matrix_b=match_ngrams,
-                top_n=self._top_n,
-                low_memory=self._low_memory,
-                number_of_rows=self._number_of_rows,
-                verbose=self._verbose,
+            match_ngrams = match_ngrams.tocsc()
+
+        results = sparse_cosine_top_n(
+            matrix_a=self._n_grams_matching,
+            matrix_b=match_ngrams,
+            top_n=self._top_n,
+            low_memory=self._low_memory,
+            number_of_rows=self._number_of_rows,
+            verbose=self._verbose,
+            row_range=self._master_rows,
+            candidate_mask=None if mask_groups is None else self._candidate_mask,
+            mask_groups=mask_groups,
+            row_scales=self._n_grams_scales,
+        )
+
+        return self._to_cosine_similarity(*results)
+
+    def _to_cosine_similarity(
+        self, possible_matches: np.array, scores: np.array
+    ) -> Tuple[np.array, np.array]:
+        """Converts the scores of the sparse cosine step into cosine similarities. As the
+        rows of the ngrams matrix of the matching data are normalised by their sum, the
+        scores are divided by the L2 norm of these rows, after which the possible matches
+        are ordered on their cosine similarity. Possible matches with a cosine
+        similarity below min_cosine are replaced by the first row of the matching data
+        that is used, with a similarity of 0.
+
+        Parameters
+        ----------
+        possible_matches : np.array
+            The indexes of the possible matches
+        scores : np.array
+            The scores of the possible matches from the sparse cosine step
+
+        Returns
+        -------
+        Tuple[np.array, np.array]
+            The indexes of the possible matches and their cosine similarities
+        """
+        norms = self._master_norms()[possible_matches]
+        cosine_scores = np.minimum(
+            np.divide(scores, norms, out=np.zeros_like(scores), where=norms > 0), 1
+        )
+        if self._min_cosine > 0:
+            discarded = cosine_scores < self._min_cosine
+            possible_matches[discarded] = self._first_master_row()
+            cosine_scores[discarded] = 0
+        order = np.argsort(-cosine_scores, axis=1, kind="stable")
+
+        return (
+            np.take_along_axis(possible_matches, order, axis=1),
+            np.take_along_axis(cosine_scores, order, axis=1),
+        )
+
+    def _master_norms(self) -> np.array:
+        """Gives the L2 norms of the rows of the ngrams matrix of the matching data,
+        which are calculated the first time they are needed.
+
+        Returns
+        -------
+        np.array
+            The L2 norm of each of the rows of the ngrams matrix
+        """
+        if self._n_grams_norms is None:
+            self._n_grams_norms = self._row_norms(
+                self._n_grams_matching, self._n_grams_scales
             )
 
-        return results
+        return self._n_grams_norms
+
+    def _unfitted_minhash_lsh(self) -> Union[MinHashLSH, None]:
+        """Gives an unfitted copy of the candidate generator if it is a MinHashLSH, with
+        which signatures can be calculated.
+
+        Returns
+        -------
+        Union[MinHashLSH, None]
+            The MinHashLSH, or None if another candidate generator is used
+        """
+        if self._candidate_generator is None:
+            return None
+        generator = make_candidate_generator(self._candidate_generator)
+
+        return generator if isinstance(generator, MinHashLSH) else None
+
+    def _master_candidate_index(self) -> object:
+        """Gives the candidate generator fitted on the ngrams matrix of the matching
+        data, which is fitted the first time it is needed. The signatures of a
+        MinHashLSH are kept, such that they are only calculated for new rows.
+
+        Returns
+        -------
+        object
+            The fitted candidate generator
+        """
+        if self._candidate_index is None:
+            generator = make_candidate_generator(self._candidate_generator)
+            if isinstance(generator, MinHashLSH):
+                self._candidate_index = generator.fit(
+                    self._n_grams_matching,
+                    self._n_grams_scales,
+                    signatures=self._lsh_signatures,
+                )
+                self._lsh_signatures = self._candidate_index.signatures_
+            else:
+                self._candidate_index = generator.fit(
+                    self._n_grams_matching, self._n_grams_scales
+                )
+
+        return self._candidate_index
+
+    @staticmethod
+    def _row_norms(ngrams: spmatrix, scales: Union[np.array, None]) -> np.array:
+        """Calculates the L2 norms of the rows of an ngrams matrix, the norms of the
+        rows of a quantised matrix are multiplied by the scales of the rows. The
+        squares are summed over blocks of the values, such that a memory mapped or
+        quantised matrix is not copied as a whole to float64.
+
+        Parameters
+        ----------
+        ngrams : spmatrix
+            The ngrams matrix
+        scales : Union[np.array, None]
+            The scale of each of the rows, or None if the matrix is not quantised
+
+        Returns
+        -------
+        np.array
+            The L2 norm of each of the rows of the ngrams matrix
+        """
+        if ngrams.format not in ("csc", "coo", "csr"):
+            ngrams = ngrams.tocsr()
+        number_of_rows = ngrams.shape[0]
+        squares = np.zeros(number_of_rows)
+        for start in range(0, ngrams.nnz, _NORMS_BLOCK_SIZE):
+            end = min(start + _NORMS_BLOCK_SIZE, ngrams.nnz)
+            if ngrams.format == "csc":
+                rows = ngrams.indices[start:end]
+            elif ngrams.format == "coo":
+                rows = ngrams.row[start:end]
+            else:
+                positions = np.arange(start, end)
+                rows = np.searchsorted(ngrams.indptr, positions, side="right") - 1
+            values = ngrams.data[start:end].astype(np.float64)
+            squares += np.bincount(rows, weights=values**2, minlength=number_of_rows)
+        norms = np.sqrt(squares)
+        if scales is not None:
+            norms = norms * scales
+
+        return norms
+
+    def _first_master_row(self) -> int:
+        """Gives the first row of the matching data which can be matched, which is used
+        as the index of empty possible matches.
+
+        Returns
+        -------
+        int
+            The first row of the row range of the matching data, or 0 if all the rows
+            of the matching data are used
+        """
+        return 0 if self._master_rows is None else self._master_rows[0]
+
+    def _master_slice(self, start: int, end: int) -> "NameMatcher":
+        """Creates a view of the NameMatcher which only matches with the rows start up
+        to end of the matching data. The view shares the vectoriser, the ngrams matrix
+        and the matching data with the NameMatcher, only the search for possible matches
+        is restricted to the row range and the exact matching uses a hash index of the
+        names in the row range. The indexes of the matches found with the view are rows
+        of the complete matching data.
+
+        Parameters
+        ----------
+        start : int
+            The first row of the matching data which can be matched
+        end : int
+            The row after the last row of the matching data which can be matched
+
+        Returns
+        -------
+        NameMatcher
+            The view on the row range of the matching data
+        """
+        if self._n_grams_matching is None:
+            raise RuntimeError(
+                """First the data needs to be transformed to be able to use the sparse """
+                + """cosine simularity. To transform the data, run transform_data"""
+                + """ or run load_and_process_master_data with transform=True"""
+            )
+        if (start < 0) | (end > self._n_grams_matching.shape[0]) | (start >= end):
+            raise ValueError(
+                f"The rows {start} to {end} are not a non-empty range of rows of"
+                + " the matching data"
+            )
+
+        # the norms and the inverted index are built once for the whole matrix, such
+        # that all views share them
+        self._master_norms()
+        if self._candidate_generator is not None:
+            self._master_candidate_index()
+        view = copy.copy(self)
+        view._master_rows = (start, end)
+        view._build_exact_index()
+
+        return view
 
     def preprocess(self, df: pd.DataFrame, column_name: str) -> pd.DataFrame:
         """Preprocess a dataframe before applying a name matching algorithm. The 
         preprocessing consists of removing special characters, spaces, converting all 
-        characters to lower case and removing the words given in the word lists
+        characters to lower case and removing the words given in the word lists. Each
+        distinct name in the column is preprocessed only once.
 
         Parameters
         ----------
@@ -744,20 +3071,9 @@ class NameMatcher:
         pd.DataFrame
             The preprocessed dataframe or series depending on the input
         """
-        df.loc[:, column_name] = df[column_name].astype(str)
-        if self._preprocess_lowercase:
-            df.loc[:, column_name] = df[column_name].str.lower()
-        if self._preprocess_punctuations:
-            df.loc[:, column_name] = df[column_name].str.replace(
-                r"[^\w\s]", "", regex=True
-            )
-            df.loc[:, column_name] = df[column_name].str.replace("  ", " ").str.strip()
-        if self._preprocess_ascii:
-            df.loc[:, column_name] = df[column_name].apply(
-                lambda string: normalize("NFKD", str(string))
-                .encode("ASCII", "ignore")
-                .decode()
-            )
+        df.loc[:, column_name] = self._normaliser().normalise_array(
+            df[column_name].astype(str).values
+        )
 
         return df
 
@@ -0,0 +1,265 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import Callable, Iterable, Tuple, Union
+
+# The code points of the characters for which str.isspace is True, which are the
+# characters matched by \s in the regular expression with which the char analyzer of
+# the TfidfVectorizer replaces runs of whitespace by a single space
+_WHITE_SPACES = np.array(
+    [9, 10, 11, 12, 13, 28, 29, 30, 31, 32, 133, 160, 5760]
+    + list(range(8192, 8203))
+    + [8232, 8233, 8239, 8287, 12288],
+    dtype=np.uint32,
+)
+
+# The multiplier of the polynomial rolling hash and the multiplier of the final mixing
+# step, which spreads the hashes over all the bits before the feature is selected
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+_MIX_MULTIPLIER = np.uint64(0xFF51AFD7ED558CCD)
+
+
+class HashingNgramEncoder:
+    """
+    Generates tf-idf weighted character n-grams of names without a vocabulary. The
+    n-grams are hashed into a fixed number of features with a polynomial hash that is
+    calculated with NumPy for all the names of a chunk at once. The idf weights are
+    determined in a single streaming pass over the chunks of the names, and both the
+    fit and the transform process the chunks over n_jobs threads. Apart from the
+    collisions of the hashes, the result is equal to that of a TfidfVectorizer with the
+    char analyzer, smooth idf weights and l2 normalised rows.
+
+    Parameters
+    ----------
+    ngram_range : tuple of integers
+        The smallest and largest length of the n-grams
+        default=(2, 3)
+    n_features : int
+        The number of features into which the n-grams are hashed
+        default=2**20
+    dtype : np.dtype
+        The type of the values of the n-grams matrix
+        default=np.float32
+    n_jobs : int
+        The number of threads over which the chunks are processed
+        default=1
+    chunk_size : int
+        The number of names which are processed at once
+        default=100000
+    """
+
+    def __init__(
+        self,
+        ngram_range: Tuple[int, int] = (2, 3),
+        n_features: int = 2**20,
+        dtype: np.dtype = np.float32,
+        n_jobs: int = 1,
+        chunk_size: int = 100000,
+    ):
+        if (ngram_range[0] < 1) | (ngram_range[0] > ngram_range[1]):
+            raise ValueError(f"The ngram_range {ngram_range} is not a valid range")
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = n_features
+        self.dtype = np.dtype(dtype)
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.idf_ = None
+
+    def fit(self, names: Iterable[str]) -> "HashingNgramEncoder":
+        """
+        Determines the idf weights of the hashed n-grams.
+
+        Parameters
+        ----------
+        names : Iterable[str]
+            The names on which the idf weights are based
+
+        Returns
+        -------
+        HashingNgramEncoder
+            The fitted encoder
+        """
+        self._fit_counts(self._map(self._count_ngrams, self._chunks(names)))
+
+        return self
+
+    def fit_transform(self, names: Iterable[str]) -> csr_matrix:
+        """
+        Determines the idf weights of the hashed n-grams and gives the weighted n-grams
+        of the names, the n-grams of each name are generated only once.
+
+        Parameters
+        ----------
+        names : Iterable[str]
+            The names on which the idf weights are based
+
+        Returns
+        -------
+        csr_matrix
+            The l2 normalised tf-idf weighted n-grams of the names
+        """
+        counts = self._map(self._count_ngrams, self._chunks(names))
+        self._fit_counts(counts)
+
+        return self._stack(self._map(self._weight_ngrams, counts))
+
+    def transform(self, names: Iterable[str]) -> csr_matrix:
+        """
+        Gives the tf-idf weighted n-grams of the names.
+
+        Parameters
+        ----------
+        names : Iterable[str]
+            The names which should be transformed
+
+        Returns
+        -------
+        csr_matrix
+            The l2 normalised tf-idf weighted n-grams of the names
+        """
+        if self.idf_ is None:
+            raise RuntimeError(
+                "The HashingNgramEncoder should be fitted before names are transformed"
+            )
+
+        return self._stack(
+            self._map(
+                lambda chunk: self._weight_ngrams(self._count_ngrams(chunk)),
+                self._chunks(names),
+            )
+        )
+
+    def _chunks(self, names: Iterable[str]) -> list:
+        """
+        Divides the names in chunks of chunk_size names.
+        """
+        names = list(names)
+
+        return [
+            names[start : start + self.chunk_size]
+            for start in range(0, max(len(names), 1), self.chunk_size)
+        ]
+
+    def _map(self, function: Callable, chunks: list) -> list:
+        """
+        Applies a function to each of the chunks, over n_jobs threads if more than one
+        thread should be used.
+        """
+        if (self.n_jobs > 1) & (len(chunks) > 1):
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+                return list(executor.map(function, chunks))
+
+        return [function(chunk) for chunk in chunks]
+
+    def _stack(self, chunks: list) -> csr_matrix:
+        """
+        Stacks the n-grams of the chunks.
+        """
+        return chunks[0] if len(chunks) == 1 else vstack(chunks, format="csr")
+
+    def _fit_counts(self, counts: list) -> None:
+        """
+        Determines the smooth idf weights from the counted n-grams of the chunks.
+        """
+        document_frequency = np.zeros(self.n_features, dtype=np.int64)
+        for chunk in counts:
+            document_frequency += np.bincount(chunk.indices, minlength=self.n_features)
+        number_of_names = sum(chunk.shape[0] for chunk in counts)
+        self.idf_ = (
+            np.log((1 + number_of_names) / (1 + document_frequency)) + 1
+        ).astype(self.dtype)
+
+    def _count_ngrams(self, names: list) -> csr_matrix:
+        """
+        Counts the hashed n-grams of each of the names of a chunk.
+        """
+        names = [str(name) for name in names]
+        codes = np.frombuffer("".join(names).encode("utf-32-le"), dtype=np.uint32)
+        lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+        name_ids = np.repeat(np.arange(len(names)), lengths)
+
+        # runs of at least two whitespace characters are replaced by a single space
+        spaces = np.isin(codes, _WHITE_SPACES)
+        repeated = np.zeros(len(codes), dtype=bool)
+        repeated[1:] = spaces[1:] & spaces[:-1] & (name_ids[1:] == name_ids[:-1])
+        codes = codes.copy()
+        codes[np.flatnonzero(repeated) - 1] = 32
+        codes = codes[~repeated].astype(np.uint64)
+        name_ids = name_ids[~repeated]
+        lengths = np.bincount(name_ids, minlength=len(names))
+        ends = np.repeat(np.cumsum(lengths), lengths)
+        positions = np.arange(len(codes))
+
+        rows, features = [], []
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            starts = positions[positions + n <= ends]
+            hashes = np.full(len(starts), n, dtype=np.uint64)
+            for offset in range(n):
+                hashes = hashes * _HASH_MULTIPLIER + codes[starts + offset]
+            hashes ^= hashes >> np.uint64(33)
+            hashes *= _MIX_MULTIPLIER
+            hashes ^= hashes >> np.uint64(33)
+            rows.append(name_ids[starts])
+            features.append((hashes % np.uint64(self.n_features)).astype(np.int64))
+
+        rows = np.concatenate(rows)
+        counts = csr_matrix(
+            (np.ones(len(rows), dtype=self.dtype), (rows, np.concatenate(features))),
+            shape=(len(names), self.n_features),
+        )
+        counts.sum_duplicates()
+
+        return counts
+
+    def _weight_ngrams(self, counts: csr_matrix) -> csr_matrix:
+        """
+        Weights the counted n-grams of a chunk by their idf weights and normalises the
+        rows by their l2 norm.
+        """
+        weighted = counts.copy()
+        weighted.data *= self.idf_[weighted.indices]
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        weighted.data /= np.repeat(norms, np.diff(weighted.indptr)).astype(self.dtype)
+
+        return weighted
+
+
+def make_ngram_encoder(
+    ngram_encoder: Union[str, object], ngrams: Tuple[int, int], n_jobs: int = 1
+) -> object:
+    """
+    Creates the n-gram encoder of a NameMatcher. Besides the TfidfVectorizer and the
+    HashingNgramEncoder any object with a fit and a transform method which returns a
+    sparse matrix with a row for each name can be used.
+
+    Parameters
+    ----------
+    ngram_encoder : Union[str, object]
+        Either tfidf for a TfidfVectorizer, hashing for a HashingNgramEncoder or an
+        n-gram encoder object, which is returned as is
+    ngrams : tuple of integers
+        The smallest and largest length of the n-grams
+    n_jobs : int
+        The number of threads used by the HashingNgramEncoder
+        default=1
+
+    Returns
+    -------
+    object
+        The n-gram encoder
+    """
+    if ngram_encoder == "tfidf":
+        return TfidfVectorizer(lowercase=False, analyzer="char", ngram_range=ngrams)
+    if ngram_encoder == "hashing":
+        return HashingNgramEncoder(ngram_range=ngrams, n_jobs=n_jobs)
+    if isinstance(ngram_encoder, str):
+        raise ValueError(
+            f"The ngram_encoder {ngram_encoder} is not known, please use tfidf, "
+            + "hashing or an object with a fit and a transform method"
+        )
+    if not (hasattr(ngram_encoder, "fit") and hasattr(ngram_encoder, "transform")):
+        raise TypeError("The ngram_encoder should have a fit and a transform method")
+
+    return ngram_encoder
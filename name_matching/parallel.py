@@ -0,0 +1,267 @@
+import os
+import numpy as np
+import pandas as pd
+from multiprocessing.shared_memory import SharedMemory
+from scipy.sparse import csc_matrix, coo_matrix, spmatrix
+from typing import Tuple, Union
+
+_SPARSE_ARRAYS = {"csc": ("data", "indices", "indptr"), "coo": ("data", "row", "col")}
+
+# The state of a worker process, set once by _init_worker
+_worker_matcher = None
+_worker_shared_memory = []
+
+
+def _share_array(array: np.array) -> Tuple[SharedMemory, tuple]:
+    """
+    Copies an array into a newly created block of shared memory.
+
+    Parameters
+    ----------
+    array: np.array
+        The array which should be placed in shared memory
+
+    Returns
+    -------
+    Tuple[SharedMemory, tuple]
+        The shared memory block and a picklable specification (name, shape and dtype)
+        which can be used to attach to the array from another process
+    """
+    shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)
+    shared_array[:] = array
+
+    return shared_memory, (shared_memory.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec: tuple) -> Tuple[SharedMemory, np.array]:
+    """
+    Attaches to an array which was placed in shared memory by _share_array. The
+    returned array is a view on the shared memory, no data is copied.
+
+    Parameters
+    ----------
+    spec: tuple
+        The specification of the shared array as returned by _share_array
+
+    Returns
+    -------
+    Tuple[SharedMemory, np.array]
+        The shared memory block, which should be kept alive as long as the array is
+        used, and the array itself
+    """
+    name, shape, dtype = spec
+    shared_memory = SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_memory.buf)
+
+    return shared_memory, array
+
+
+def share_sparse_matrix(
+    matrix: Union[csc_matrix, coo_matrix]
+) -> Tuple[list, dict]:
+    """
+    Places the arrays of a sparse csc or coo matrix in shared memory.
+
+    Parameters
+    ----------
+    matrix: Union[csc_matrix, coo_matrix]
+        The sparse matrix which should be shared between processes
+
+    Returns
+    -------
+    Tuple[list, dict]
+        The list of shared memory blocks, which should be closed and unlinked by the
+        caller once the workers are done, and a picklable specification of the matrix
+        which can be passed to attach_sparse_matrix
+    """
+    shared_memory_blocks = []
+    spec = {"format": matrix.format, "shape": matrix.shape, "arrays": {}}
+    for name in _SPARSE_ARRAYS[matrix.format]:
+        shared_memory, array_spec = _share_array(getattr(matrix, name))
+        shared_memory_blocks.append(shared_memory)
+        spec["arrays"][name] = array_spec
+
+    return shared_memory_blocks, spec
+
+
+def attach_sparse_matrix(spec: dict) -> Tuple[list, spmatrix]:
+    """
+    Rebuilds a sparse matrix which was placed in shared memory by share_sparse_matrix
+    without copying the underlying arrays. If the specification refers to a memory
+    mapped index instead, the matrix is memory mapped from its files.
+
+    Parameters
+    ----------
+    spec: dict
+        The specification of the matrix as returned by share_sparse_matrix
+
+    Returns
+    -------
+    Tuple[list, spmatrix]
+        The list of shared memory blocks, which should be kept alive as long as the
+        matrix is used, and the sparse matrix itself
+    """
+    if "path" in spec:
+        return [], load_sparse_matrix(
+            spec["path"], spec["shape"], spec["format"], mmap_mode="r"
+        )
+
+    shared_memory_blocks = []
+    arrays = {}
+    for name, array_spec in spec["arrays"].items():
+        shared_memory, arrays[name] = _attach_array(array_spec)
+        shared_memory_blocks.append(shared_memory)
+
+    if spec["format"] == "csc":
+        matrix = csc_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=spec["shape"],
+            copy=False,
+        )
+    else:
+        matrix = coo_matrix(
+            (arrays["data"], (arrays["row"], arrays["col"])),
+            shape=spec["shape"],
+            copy=False,
+        )
+
+    return shared_memory_blocks, matrix
+
+
+def load_sparse_matrix(
+    path: str, shape: tuple, sparse_format: str, mmap_mode: Union[str, None] = None
+) -> spmatrix:
+    """
+    Loads a sparse matrix from the data.npy, indices.npy and indptr.npy files of its csc
+    representation in the directory path. If a mmap_mode is given the arrays are memory
+    mapped, such that all the processes on the same host which load the matrix share a
+    single physical copy via the page cache. When the coo format is requested only the
+    column indices are created in memory, the row indices and the data stay memory
+    mapped.
+
+    Parameters
+    ----------
+    path: str
+        The directory containing the arrays of the csc matrix
+    shape: tuple
+        The shape of the matrix
+    sparse_format: str
+        The format of the returned matrix, either csc or coo
+    mmap_mode: Union[str, None]
+        The mmap_mode passed to np.load, None to load the arrays in memory
+        default=None
+
+    Returns
+    -------
+    spmatrix
+        The sparse matrix in the requested format
+    """
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in _SPARSE_ARRAYS["csc"]
+    }
+    if sparse_format == "coo":
+        col = np.repeat(
+            np.arange(shape[1], dtype=arrays["indices"].dtype), np.diff(arrays["indptr"])
+        )
+        return coo_matrix(
+            (arrays["data"], (arrays["indices"], col)), shape=shape, copy=False
+        )
+
+    return csc_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]), shape=shape, copy=False
+    )
+
+
+def _init_worker(matcher, matrix_spec: dict) -> None:
+    """
+    Initialises a worker process with a NameMatcher which uses the n-grams matrix of
+    the matching data from shared memory.
+
+    Parameters
+    ----------
+    matcher: NameMatcher
+        A copy of the NameMatcher without the n-grams matrix of the matching data
+    matrix_spec: dict
+        The specification of the n-grams matrix as returned by share_sparse_matrix
+    """
+    global _worker_matcher, _worker_shared_memory
+    _worker_shared_memory, matcher._n_grams_matching = attach_sparse_matrix(
+        matrix_spec
+    )
+    _worker_matcher = matcher
+
+
+def _match_chunk(
+    to_be_matched: pd.DataFrame,
+    match_ngrams: spmatrix,
+    reduced_ngrams: Union[spmatrix, None],
+    master_rows: Union[Tuple[int, int], None] = None,
+    candidate_mask_spec: Union[tuple, None] = None,
+    mask_groups: Union[np.array, None] = None,
+) -> Tuple[np.array, np.array, Union[pd.Series, pd.DataFrame]]:
+    """
+    Performs the search for possible matches and the fuzzy matching for a chunk of the
+    data to be matched within a worker process.
+
+    Parameters
+    ----------
+    to_be_matched: pd.DataFrame
+        The preprocessed chunk of the data which should be matched, containing only the
+        column which should be matched
+    match_ngrams: spmatrix
+        The ngrams of the chunk of the data which should be matched
+    reduced_ngrams: Union[spmatrix, None]
+        The ngrams of the reduced strings of the chunk if preprocess_split is used,
+        otherwise None
+    master_rows: Union[Tuple[int, int], None]
+        The range of rows of the matching data which can be matched, if None all the
+        rows can be matched
+        default=None
+    candidate_mask_spec: Union[tuple, None]
+        The specification of the 2-D candidate mask with the rows of the matching data
+        which can be matched as returned by _share_array, if None all the rows can be
+        matched
+        default=None
+    mask_groups: Union[np.array, None]
+        The row of the candidate mask which is used for each of the rows of the chunk
+        default=None
+
+    Returns
+    -------
+    Tuple[np.array, np.array, Union[pd.Series, pd.DataFrame]]
+        The possible matches, their cosine similarities and the fuzzy matching results
+        for the chunk
+    """
+    _worker_matcher._column_matching = to_be_matched.columns[0]
+    _worker_matcher._master_rows = master_rows
+    shared_mask = None
+    if candidate_mask_spec is not None:
+        shared_mask, _worker_matcher._candidate_mask = _attach_array(
+            candidate_mask_spec
+        )
+    try:
+        possible_matches, cosine_scores = (
+            _worker_matcher._search_for_possible_ngram_matches(
+                match_ngrams, mask_groups
+            )
+        )
+        if reduced_ngrams is not None:
+            reduced_matches, reduced_scores = (
+                _worker_matcher._search_for_possible_ngram_matches(
+                    reduced_ngrams, mask_groups
+                )
+            )
+            possible_matches = np.hstack((reduced_matches, possible_matches))
+            cosine_scores = np.hstack((reduced_scores, cosine_scores))
+        data_matches = _worker_matcher._fuzzy_matches_batch(
+            possible_matches, to_be_matched, cosine_scores, mask_groups
+        )
+    finally:
+        # the view on the shared mask is released before the block is closed
+        _worker_matcher._candidate_mask = None
+        if shared_mask is not None:
+            shared_mask.close()
+
+    return possible_matches, cosine_scores, data_matches
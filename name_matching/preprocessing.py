@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+from re import compile
+from unicodedata import normalize
+from typing import Callable, Union
+
+_WORD_OR_SPACE = compile(r"[\w\s]")
+
+
+class _PunctuationTable(dict):
+    """
+    A translation table for str.translate which removes all the characters that are
+    neither a word character nor whitespace, equal to removing the matches of the
+    regular expression [^\\w\\s]. The decision is made once for each character.
+    """
+
+    def __missing__(self, code: int) -> Union[int, None]:
+        value = code if _WORD_OR_SPACE.match(chr(code)) else None
+        self[code] = value
+
+        return value
+
+
+class _AsciiTable(dict):
+    """
+    A translation table for str.translate which replaces each character by the ASCII
+    characters of its NFKD normal form, equal to normalising a string with NFKD and
+    encoding it to ASCII while ignoring the errors. The replacement is determined once
+    for each character.
+    """
+
+    def __missing__(self, code: int) -> Union[int, str, None]:
+        if code < 128:
+            value = code
+        else:
+            value = normalize("NFKD", chr(code)).encode("ASCII", "ignore").decode()
+            value = value if value else None
+        self[code] = value
+
+        return value
+
+
+_PUNCTUATION_TABLE = _PunctuationTable()
+_ASCII_TABLE = _AsciiTable()
+
+
+def remove_punctuation(name: str) -> str:
+    """
+    Removes all the characters which are neither a word character nor whitespace.
+
+    Parameters
+    ----------
+    name: str
+        The name from which the punctuation should be removed
+
+    Returns
+    -------
+    str
+        The name without punctuation
+    """
+    return name.translate(_PUNCTUATION_TABLE)
+
+
+def fold_ascii(name: str) -> str:
+    """
+    Converts a name to ASCII characters by decomposing the characters (NFKD) and
+    removing the characters which can not be represented in ASCII.
+
+    Parameters
+    ----------
+    name: str
+        The name which should be converted
+
+    Returns
+    -------
+    str
+        The ASCII version of the name
+    """
+    if name.isascii():
+        return name
+
+    return name.translate(_ASCII_TABLE)
+
+
+def normalise_unique(names: np.array, function: Callable[[str], str]) -> np.array:
+    """
+    Applies a normalisation function to an array of names, the function is called only
+    once for each distinct name. Missing values are kept as missing values.
+
+    Parameters
+    ----------
+    names: np.array
+        The names which should be normalised
+    function: Callable[[str], str]
+        The function which normalises a single name
+
+    Returns
+    -------
+    np.array
+        An object array with the normalised names
+    """
+    codes, unique_names = pd.factorize(np.asarray(names, dtype=object))
+    normalised = np.empty(len(unique_names) + 1, dtype=object)
+    normalised[:-1] = [function(name) for name in unique_names]
+    normalised[-1] = np.nan
+
+    return normalised[codes]
+
+
+class NameNormaliser:
+    """
+    Normalises names in the way of NameMatcher.preprocess: the names are converted to
+    lowercase, after which the punctuation is removed, double spaces are replaced by a
+    single space and the leading and trailing whitespace is removed, finally the names
+    are converted to ASCII characters. The punctuation removal and the conversion to
+    ASCII use translation tables in which the result for each character is stored once
+    it is determined.
+
+    Parameters
+    ----------
+    lowercase : bool
+        Bool indicating whether the names should be converted to lowercase
+        default=True
+    punctuations : bool
+        Bool indicating whether the punctuation should be removed
+        default=True
+    remove_ascii : bool
+        Bool indicating whether the names should be converted to ASCII characters
+        default=True
+    """
+
+    def __init__(
+        self,
+        lowercase: bool = True,
+        punctuations: bool = True,
+        remove_ascii: bool = True,
+    ):
+        self._lowercase = lowercase
+        self._punctuations = punctuations
+        self._remove_ascii = remove_ascii
+
+    def __call__(self, name: str) -> str:
+        """
+        Normalises a single name.
+
+        Parameters
+        ----------
+        name: str
+            The name which should be normalised
+
+        Returns
+        -------
+        str
+            The normalised name
+        """
+        name = str(name)
+        if self._lowercase:
+            name = name.lower()
+        if self._punctuations:
+            name = remove_punctuation(name).replace("  ", " ").strip()
+        if self._remove_ascii:
+            name = fold_ascii(name)
+
+        return name
+
+    def normalise_array(self, names: np.array) -> np.array:
+        """
+        Normalises an array of names, each distinct name is normalised only once.
+
+        Parameters
+        ----------
+        names: np.array
+            The names which should be normalised
+
+        Returns
+        -------
+        np.array
+            An object array with the normalised names
+        """
+        return normalise_unique(names, self)
@@ -1,7 +1,9 @@
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from name_matching.name_matcher import NameMatcher
+from name_matching.preprocessing import fold_ascii, normalise_unique, remove_punctuation
 from typing import Union, Tuple
-from unicodedata import normalize
 
 
 def _match_names_check_data(
@@ -80,21 +82,20 @@ def _match_names_preprocess_data(
         names which should be matched
     """
 
-    if not case_sensitive:
-        data_first[column] = data_first[column].str.lower().str.strip()
-        data_second[column] = data_second[column].str.lower().str.strip()
-    if not punctuation_sensitive:
-        data_first[column] = data_first[column].str.replace(r"[^\w\s]", "", regex=True)
-        data_second[column] = data_second[column].str.replace(
-            r"[^\w\s]", "", regex=True
-        )
-    if not special_character_sensitive:
-        data_first[column] = data_first[column].apply(
-            lambda string: normalize("NFKD", string).encode("ASCII", "ignore").decode()
-        )
-        data_second[column] = data_second[column].apply(
-            lambda string: normalize("NFKD", string).encode("ASCII", "ignore").decode()
-        )
+    def _normalise(name: str) -> str:
+        if not isinstance(name, str):
+            return np.nan
+        if not case_sensitive:
+            name = name.lower().strip()
+        if not punctuation_sensitive:
+            name = remove_punctuation(name)
+        if not special_character_sensitive:
+            name = fold_ascii(name)
+        return name
+
+    if not (case_sensitive & punctuation_sensitive & special_character_sensitive):
+        data_first[column] = normalise_unique(data_first[column].values, _normalise)
+        data_second[column] = normalise_unique(data_second[column].values, _normalise)
 
     data_second = data_second.rename_axis("index").reset_index(drop=False)
 
@@ -202,6 +203,8 @@ def _match_names_match_group(
     """
     Perform the name matching based on the subgroups as indicated by the group_column strings. First by doing
     a perfect string match with a merge statement, followed by the fuzzy matching approach as done in NameMatcher.
+    If the matcher uses more than one process, the groups are matched at the same time by a single pool
+    of n_jobs worker processes.
     ----------
     matcher: NameMatcher
         The NameMatcher to be used for the name matching part
@@ -232,26 +235,32 @@ def _match_names_match_group(
     )
     unmatched = data_first[~data_first.index.isin(matches.index)]
     if len(unmatched) > 0:
-        matcher.load_and_process_master_data(name_column, data_second, transform=False)
-        for group in data_first[group_column_first].unique():
-            data_second_group = data_second[
-                data_second[group_column_second] == group
-            ].copy()
-            matcher.load_and_process_master_data(
-                name_column, data_second_group, start_processing=False
+        data_second, group_rows = _match_names_group_rows(
+            data_second, group_column_second
+        )
+        matcher.load_and_process_master_data(name_column, data_second)
+        groups = [
+            (matcher._master_slice(*group_rows[group]), to_be_matched.copy())
+            for group, to_be_matched in unmatched.groupby(
+                group_column_first, sort=False
             )
-            matcher.transform_data()
-            matches = pd.concat(
-                [
-                    matches,
-                    matcher.match_names(
-                        to_be_matched=unmatched[
-                            unmatched[group_column_first] == group
-                        ].copy(),
-                        column_matching=name_column,
-                    ),
-                ]
+            if group in group_rows
+        ]
+
+        def match_group(group):
+            view, to_be_matched = group
+            return view.match_names(
+                to_be_matched=to_be_matched, column_matching=name_column
             )
+
+        if matcher._n_jobs > 1:
+            # the groups are submitted from n_jobs threads, such that the chunks of
+            # several groups are matched at the same time by the shared worker pool
+            with matcher._worker_pool(), ThreadPoolExecutor(matcher._n_jobs) as threads:
+                group_matches = list(threads.map(match_group, groups))
+        else:
+            group_matches = [match_group(group) for group in groups]
+        matches = pd.concat([matches] + group_matches)
     else:
         print("All data matched with basic string matching")
         return matches
@@ -259,6 +268,40 @@ def _match_names_match_group(
     return matches
 
 
+def _match_names_group_rows(
+    data: pd.DataFrame, group_column: str
+) -> Tuple[pd.DataFrame, dict]:
+    """
+    Orders the data on the groups in the group column, such that the rows of each group
+    form a single range of rows. The order of the rows within a group is kept. Rows
+    without a group are placed at the end and are not part of any group.
+
+    Parameters
+    ----------
+    data: pd.DataFrame
+        The dataframe which should be ordered
+    group_column: str
+        The name of the column with the groups
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, dict]
+        The ordered dataframe and a dictionary with for each of the groups the first
+        row and the row after the last row of the group in the ordered dataframe
+    """
+    codes, groups = pd.factorize(data[group_column])
+    codes = np.where(codes < 0, len(groups), codes)
+    data = data.iloc[np.argsort(codes, kind="stable")]
+    counts = np.bincount(codes, minlength=len(groups) + 1)[: len(groups)]
+    ends = np.cumsum(counts)
+    group_rows = {
+        group: (int(end - count), int(end))
+        for group, count, end in zip(groups, counts, ends)
+    }
+
+    return data, group_rows
+
+
 def match_names(
     data_first: Union[pd.DataFrame, pd.Series],
     data_second: Union[pd.DataFrame, pd.Series],
@@ -282,7 +325,8 @@ def match_names(
         The first dataframe or series used for the name matching
     data_second: Union[pd.DataFrame, pd.Series]
         The second dataframe or series used for the name matching, for matching the data to
-        itself data_second should be equal to data first
+        itself data_second should be equal to data first. To find the duplicates within
+        a single dataframe NameMatcher.deduplicate is faster, as it scores each pair once
     column_first: str
         If data_first is a dataframe column_first should be the column in which the name
         that should be matched can be found for data_first
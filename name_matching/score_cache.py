@@ -0,0 +1,112 @@
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from typing import Iterable, List, Union
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class PairScoreCache:
+    """
+    A bounded least recently used cache for the scores of pairs of names. For each
+    pair of names the scores of all the distance metrics are stored, such that a cache
+    is only valid for a single set of distance metrics. When the cache is full the
+    least recently used pair is removed.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of pairs which are stored in the cache, if 0 nothing is
+        stored
+        default=0
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self._maxsize = maxsize
+        self._scores = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    def get_many(self, pairs: Iterable[tuple]) -> List[Union[list, None]]:
+        """
+        Looks up the scores of a number of pairs of names.
+
+        Parameters
+        ----------
+        pairs : Iterable[tuple]
+            The pairs of names for which the scores should be looked up
+
+        Returns
+        -------
+        List[Union[list, None]]
+            For each of the pairs the scores of the distance metrics or None if the
+            pair is not in the cache
+        """
+        results = []
+        with self._lock:
+            for pair in pairs:
+                scores = self._scores.get(pair)
+                if scores is None:
+                    self._misses += 1
+                else:
+                    self._hits += 1
+                    self._scores.move_to_end(pair)
+                results.append(scores)
+
+        return results
+
+    def put_many(self, pairs: Iterable[tuple], scores: Iterable[list]) -> None:
+        """
+        Stores the scores of a number of pairs of names, after which the least
+        recently used pairs are removed until the cache is within its maxsize.
+
+        Parameters
+        ----------
+        pairs : Iterable[tuple]
+            The pairs of names for which the scores should be stored
+        scores : Iterable[list]
+            For each of the pairs the scores of the distance metrics
+        """
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            for pair, score in zip(pairs, scores):
+                self._scores[pair] = score
+                self._scores.move_to_end(pair)
+            while len(self._scores) > self._maxsize:
+                self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes all the pairs from the cache and resets the hit and miss counters.
+        """
+        with self._lock:
+            self._scores.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo:
+        """
+        Gives the statistics of the cache.
+
+        Returns
+        -------
+        CacheInfo
+            A named tuple with the number of hits and misses, the maxsize and the
+            current number of pairs in the cache
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._scores))
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = Lock()
@@ -0,0 +1,375 @@
+import json
+import os
+import time
+import numpy as np
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from typing import Union
+from name_matching.name_matcher import NameMatcher
+
+# The number of most recent requests used for the latency percentiles
+_LATENCY_WINDOW = 10000
+# The name which is matched to warm up a newly loaded index before it is served
+_WARM_UP_NAME = "warm up"
+
+
+def _to_json(value):
+    """
+    Converts the NumPy and pandas values in the matching results to values which can
+    be serialised to JSON.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+
+    return str(value)
+
+
+def _reload_path(reload_root: Union[str, None], index_path: str) -> Union[str, None]:
+    """
+    Resolves the index path of a reload request against the reload root. Relative
+    paths are taken from the reload root and symbolic links are followed, such that
+    a request cannot reach a directory outside of the reload root.
+
+    Returns
+    -------
+    Union[str, None]
+        The resolved path, or None if reloading is disabled or the path is outside of
+        the reload root
+    """
+    if reload_root is None:
+        return None
+    root = os.path.realpath(reload_root)
+    resolved = os.path.realpath(os.path.join(root, index_path))
+    if os.path.commonpath([root, resolved]) != root:
+        return None
+
+    return resolved
+
+
+class MatchService:
+    """
+    Serves name matching requests with a NameMatcher which is loaded from an index
+    stored with NameMatcher.save_index. The index can be replaced while requests are
+    being served, the new index is loaded next to the current one after which it is
+    swapped in atomically. Requests which started before the swap are completed with
+    the previous index. The service keeps counters of the number of requests and
+    names and of the latency of the requests.
+
+    Parameters
+    ----------
+    index_path : str
+        The directory of the index which should be served
+    mmap_mode : Union[str, None]
+        The mmap_mode with which the n-grams of the index are loaded, see
+        NameMatcher.load_index
+        default=None
+    **matcher_kwargs
+        The arguments used to initialise the NameMatcher, verbose is False unless
+        given otherwise
+    """
+
+    def __init__(
+        self, index_path: str, mmap_mode: Union[str, None] = None, **matcher_kwargs
+    ):
+        self._mmap_mode = mmap_mode
+        self._matcher_kwargs = {"verbose": False, **matcher_kwargs}
+        self._reload_lock = Lock()
+        self._counter_lock = Lock()
+        self._current = None
+        self._index_path = None
+        self._version = 0
+        self._started = time.time()
+        self._number_of_requests = 0
+        self._number_of_names = 0
+        self._number_of_errors = 0
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self.load(index_path)
+
+    def load(self, index_path: str) -> int:
+        """
+        Loads the index in index_path and replaces the current index by it once it is
+        fully loaded and a first name has been matched with it. If loading fails the
+        current index stays in use.
+
+        Parameters
+        ----------
+        index_path : str
+            The directory of the index which should be served
+
+        Returns
+        -------
+        int
+            The version of the loaded index, which is increased with every load
+        """
+        with self._reload_lock:
+            matcher = NameMatcher(**self._matcher_kwargs)
+            matcher.load_index(index_path, mmap_mode=self._mmap_mode)
+            # the first match compiles the kernels and computes the norms of the index
+            matcher.match_batch([_WARM_UP_NAME])
+            # a NameMatcher is not thread safe, so each index has its own lock
+            self._current = (matcher, Lock())
+            self._index_path = index_path
+            self._version = self._version + 1
+
+            return self._version
+
+    def match(self, names: list) -> list:
+        """
+        Matches a batch of names with the current index.
+
+        Parameters
+        ----------
+        names : list
+            The names which should be matched
+
+        Returns
+        -------
+        list
+            For each of the names a list with the matches, each match is a dictionary
+            with the match_name, score, match_index and cosine_score
+        """
+        start = time.perf_counter()
+        matcher, lock = self._current
+        try:
+            with lock:
+                results = matcher.match_batch(names)
+        except Exception:
+            with self._counter_lock:
+                self._number_of_errors = self._number_of_errors + 1
+            raise
+        latency = time.perf_counter() - start
+        with self._counter_lock:
+            self._number_of_requests = self._number_of_requests + 1
+            self._number_of_names = self._number_of_names + len(names)
+            self._latencies.append(latency)
+
+        return [
+            [
+                {field: _to_json(value) for field, value in match._asdict().items()}
+                for match in matches
+            ]
+            for matches in results
+        ]
+
+    def stats(self) -> dict:
+        """
+        Gives the counters of the service.
+
+        Returns
+        -------
+        dict
+            The served index and its version, the number of requests, names and errors,
+            the number of names per second since the start and the mean, median, 99th
+            percentile and maximum latency in milliseconds of the most recent requests
+        """
+        with self._counter_lock:
+            latencies = 1000 * np.array(self._latencies)
+            stats = {
+                "index": self._index_path,
+                "version": self._version,
+                "uptime": time.time() - self._started,
+                "requests": self._number_of_requests,
+                "names": self._number_of_names,
+                "errors": self._number_of_errors,
+            }
+        stats["names_per_second"] = stats["names"] / max(stats["uptime"], 1e-9)
+        for name, function in [
+            ("mean", np.mean),
+            ("p50", lambda array: np.percentile(array, 50)),
+            ("p99", lambda array: np.percentile(array, 99)),
+            ("max", np.max),
+        ]:
+            stats[f"latency_{name}_ms"] = (
+                float(function(latencies)) if len(latencies) else None
+            )
+
+        return stats
+
+
+class _MatchRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests to the matching service:
+
+    - POST /match with {"names": [...]} or {"name": ...} matches the names
+    - GET /stats gives the counters of the service
+    - POST /reload with {"index": path} replaces the served index, only if the server
+      has a reload root and path lies within it
+    - GET /health gives the version of the served index
+    """
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/stats":
+            self._send(200, service.stats())
+        elif self.path == "/health":
+            self._send(200, {"status": "ok", "version": service.stats()["version"]})
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path not in ("/match", "/reload"):
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("the body should be a JSON object")
+        except ValueError as error:
+            self._send(400, {"error": f"invalid request: {error}"})
+            return
+
+        if self.path == "/reload":
+            if not isinstance(body.get("index"), str):
+                self._send(400, {"error": "the index path should be given as index"})
+                return
+            # loading an index unpickles its files, so only the directories under the
+            # reload root given when the server is created can be loaded
+            index_path = _reload_path(self.server.reload_root, body["index"])
+            if index_path is None:
+                self._send(403, {"error": "reloading this index is not allowed"})
+                return
+            try:
+                version = service.load(index_path)
+            except Exception as error:
+                self._send(500, {"error": f"the index could not be loaded: {error}"})
+                return
+            self._send(200, {"index": index_path, "version": version})
+            return
+
+        if "names" in body:
+            names = body["names"]
+        elif "name" in body:
+            names = [body["name"]]
+        else:
+            names = None
+        if (not isinstance(names, list)) or (
+            not all(isinstance(name, str) for name in names)
+        ):
+            self._send(400, {"error": "the names should be given as a list of strings"})
+            return
+        try:
+            matches = service.match(names)
+        except Exception as error:
+            self._send(500, {"error": str(error)})
+            return
+        if "names" in body:
+            self._send(200, {"matches": matches})
+        else:
+            self._send(200, {"matches": matches[0]})
+
+    def _send(self, status: int, content: dict) -> None:
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.log_requests:
+            super().log_message(format, *args)
+
+
+def make_server(
+    service: MatchService,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    log_requests: bool = False,
+    reload_root: Union[str, None] = None,
+) -> ThreadingHTTPServer:
+    """
+    Creates a threading HTTP server for a MatchService, which can be started with
+    serve_forever. If port 0 is given a free port is chosen, which can be found in
+    the server_address of the server.
+
+    Loading an index unpickles the files in its directory, which can run arbitrary
+    code. The /reload endpoint is therefore disabled unless a reload_root is given,
+    in which case it only loads indexes in directories under the reload_root. The
+    server has no authentication, so the reload_root should only hold trusted
+    indexes.
+
+    Parameters
+    ----------
+    service : MatchService
+        The service which handles the match requests
+    host : str
+        The host on which the server listens
+        default="127.0.0.1"
+    port : int
+        The port on which the server listens
+        default=8000
+    log_requests : bool
+        Bool indicating whether every request should be logged to stderr
+        default=False
+    reload_root : Union[str, None]
+        The directory under which the indexes which can be loaded with /reload are
+        stored, paths in a reload request are relative to this directory. If None
+        /reload is disabled
+        default=None
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        The server
+    """
+    server = ThreadingHTTPServer((host, port), _MatchRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.log_requests = log_requests
+    server.reload_root = reload_root
+
+    return server
+
+
+def serve(
+    index_path: str,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    mmap_mode: Union[str, None] = None,
+    log_requests: bool = False,
+    reload_root: Union[str, None] = None,
+    **matcher_kwargs,
+) -> None:
+    """
+    Loads the index in index_path and serves match requests over HTTP until the
+    process is interrupted.
+
+    Parameters
+    ----------
+    index_path : str
+        The directory of the index which should be served
+    host : str
+        The host on which the server listens
+        default="127.0.0.1"
+    port : int
+        The port on which the server listens
+        default=8000
+    mmap_mode : Union[str, None]
+        The mmap_mode with which the n-grams of the index are loaded
+        default=None
+    log_requests : bool
+        Bool indicating whether every request should be logged to stderr
+        default=False
+    reload_root : Union[str, None]
+        The directory under which the indexes which can be loaded with /reload are
+        stored, see make_server. If None /reload is disabled
+        default=None
+    **matcher_kwargs
+        The arguments used to initialise the NameMatcher
+    """
+    service = MatchService(index_path, mmap_mode=mmap_mode, **matcher_kwargs)
+    server = make_server(service, host, port, log_requests, reload_root)
+    print(f"serving {index_path} on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
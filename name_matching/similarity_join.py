@@ -0,0 +1,449 @@
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, spmatrix, vstack
+from typing import Tuple, Union
+import name_matching.sparse_cosine as sparse_cosine
+
+# The maximum number of intermediate products which are created at once by the NumPy
+# version of the similarity join
+_JOIN_BUFFER_SIZE = 2**24
+
+# The margin with which min_similarity and the bounds of the filters are lowered, such
+# that rounding errors never drop a pair with a similarity of min_similarity
+_BOUND_MARGIN = 1e-9
+
+if sparse_cosine._numba_available:
+    from numba import njit
+
+    @njit(cache=True, nogil=True)
+    def _split_prefixes_numba(row_ptr, row_weights, max_weights, min_similarity):
+        """
+        Compiled split of each of the rows, of which the n-grams are ordered from the
+        most to the least frequent n-gram, in a prefix and the rest of the row. The
+        prefix holds the n-grams up to which the product with any of the vectors,
+        using the largest weight of an n-gram in the vectors, stays below
+        min_similarity.
+        """
+        indexed = np.zeros(len(row_weights), np.bool_)
+        prefix_bounds = np.zeros(len(row_ptr) - 1)
+        for row in range(len(row_ptr) - 1):
+            bound = 0.0
+            for ind in range(row_ptr[row], row_ptr[row + 1]):
+                if bound + row_weights[ind] * max_weights[ind] >= (
+                    min_similarity - _BOUND_MARGIN
+                ):
+                    indexed[ind : row_ptr[row + 1]] = True
+                    break
+                bound += row_weights[ind] * max_weights[ind]
+            prefix_bounds[row] = bound
+
+        return indexed, prefix_bounds
+
+    @njit(cache=True, nogil=True)
+    def _similarity_join_numba(
+        index_ptr,
+        index_rows,
+        index_weights,
+        index_sizes,
+        row_ptr,
+        row_columns,
+        row_weights,
+        prefix_bounds,
+        prefix_norms,
+        boundaries,
+        row_max,
+        column_max,
+        ranks,
+        row_positions,
+        query,
+        vector_ptr,
+        vector_ind,
+        vector_data,
+        min_similarity,
+        self_join,
+    ):
+        """
+        Compiled similarity join of a block of vectors given in the csr format with
+        the rows of an index. The posting lists only hold the n-grams of the rows after
+        their prefix and are ordered on the sum of the weights of the rows, such that
+        the rows which are too short to reach min_similarity with a vector are skipped
+        with a binary search. The n-grams of a vector are probed from the least to the
+        most frequent n-gram, until the n-grams which are left can no longer give a
+        product of min_similarity with a row. The rows found are scored exactly when
+        the bound on the part of the product which is not accumulated can still lift
+        them to min_similarity. In a self join the vectors are the rows themselves and
+        only the rows after the vector in the order of the posting lists are searched,
+        such that each pair is found once and a row is not paired with itself.
+        """
+        number_of_rows = len(row_max)
+        cut_off = min_similarity - _BOUND_MARGIN
+        sums = np.zeros(number_of_rows)
+        touched = np.empty(number_of_rows, np.int64)
+        is_touched = np.zeros(number_of_rows, np.bool_)
+        result_ptr = np.zeros(len(vector_ptr), np.int64)
+        result_ind = np.empty(max(len(vector_ptr) - 1, 16), np.int64)
+        result_val = np.empty(max(len(vector_ptr) - 1, 16))
+        size = 0
+        for vector in range(len(vector_ptr) - 1):
+            first = vector_ptr[vector]
+            last = vector_ptr[vector + 1]
+            terms = vector_ind[first:last]
+            weights = vector_data[first:last]
+            order = np.argsort(-ranks[terms])
+            lowered_ranks = -ranks[terms][order]
+            # the bound on the product of the n-grams from each position in the order
+            # onwards with a row, which is both below their norm and below the sum of
+            # their products with the largest weights of the n-grams in the rows
+            squares = np.zeros(len(terms) + 1)
+            remaining = np.zeros(len(terms) + 1)
+            for term in range(len(terms) - 1, -1, -1):
+                weight = weights[order[term]]
+                squares[term] = squares[term + 1] + weight**2
+                remaining[term] = remaining[term + 1] + (
+                    weight * column_max[terms[order[term]]]
+                )
+                remaining[term] = min(remaining[term], np.sqrt(squares[term]))
+            vector_max = 0.0
+            vector_size = 0.0
+            for term in range(len(terms)):
+                query[terms[term]] = weights[term]
+                vector_max = max(vector_max, weights[term])
+                vector_size += weights[term]
+            number_touched = 0
+            probed = 0
+            if vector_max > 0:
+                # a row with a sum of weights s has a product of at most s times the
+                # largest weight of the vector and the other way around
+                min_size = cut_off / vector_max
+                min_max = cut_off / vector_size
+                while (probed < len(terms)) and (remaining[probed] >= cut_off):
+                    column = terms[order[probed]]
+                    weight = weights[order[probed]]
+                    probed += 1
+                    start = index_ptr[column] + np.searchsorted(
+                        index_sizes[index_ptr[column] : index_ptr[column + 1]], min_size
+                    )
+                    if self_join:
+                        low = index_ptr[column]
+                        high = index_ptr[column + 1]
+                        while low < high:
+                            middle = (low + high) // 2
+                            position = row_positions[index_rows[middle]]
+                            if position <= row_positions[vector]:
+                                low = middle + 1
+                            else:
+                                high = middle
+                        start = max(start, low)
+                    for pos in range(start, index_ptr[column + 1]):
+                        row = index_rows[pos]
+                        if row_max[row] < min_max:
+                            continue
+                        sums[row] += weight * index_weights[pos]
+                        if not is_touched[row]:
+                            is_touched[row] = True
+                            touched[number_touched] = row
+                            number_touched += 1
+
+            found = 0
+            for i in range(number_touched):
+                row = touched[i]
+                value = sums[row]
+                sums[row] = 0
+                is_touched[row] = False
+                # the product which is not accumulated comes from the n-grams of the
+                # vector which are not probed and the n-grams in the prefix of the row,
+                # if the n-grams which are not probed can only occur in the prefix it
+                # is bounded by the norms of the n-grams of the vector and the row
+                # before the first n-gram of the row in the posting lists
+                before = np.searchsorted(lowered_ranks, -boundaries[row], side="right")
+                if probed >= before:
+                    bound = min(
+                        np.sqrt(squares[before]) * prefix_norms[row], prefix_bounds[row]
+                    )
+                else:
+                    bound = min(
+                        remaining[probed] + min(prefix_bounds[row], prefix_norms[row]),
+                        np.sqrt(squares[probed]),
+                    )
+                if value + bound < cut_off:
+                    continue
+                value = 0.0
+                for pos in range(row_ptr[row], row_ptr[row + 1]):
+                    value += query[row_columns[pos]] * row_weights[pos]
+                if value < cut_off:
+                    continue
+                if size == len(result_ind):
+                    result_ind = np.concatenate((result_ind, np.empty_like(result_ind)))
+                    result_val = np.concatenate((result_val, np.empty_like(result_val)))
+                result_ind[size] = row
+                result_val[size] = value
+                size += 1
+                found += 1
+            for term in range(len(terms)):
+                query[terms[term]] = 0
+
+            order = np.argsort(result_ind[size - found : size])
+            result_ind[size - found : size] = result_ind[size - found : size][order]
+            result_val[size - found : size] = result_val[size - found : size][order]
+            result_ptr[vector + 1] = size
+
+        return result_ptr, result_ind[:size], result_val[:size]
+
+
+def _unit_rows(matrix: spmatrix, row_scales: Union[np.array, None]) -> csr_matrix:
+    """
+    Converts a matrix to a float64 csr matrix of which the rows have an L2 norm of 1,
+    without explicit zeros.
+
+    Parameters
+    ----------
+    matrix : spmatrix
+        The matrix with a row for each name
+    row_scales : Union[np.array, None]
+        The scale of each of the rows, or None if the rows are not scaled
+
+    Returns
+    -------
+    csr_matrix
+        The normalised matrix with sorted indices, rows without n-grams stay empty
+    """
+    matrix = csr_matrix(matrix, dtype=np.float64, copy=True)
+    matrix.sum_duplicates()
+    if row_scales is not None:
+        matrix.data *= np.repeat(row_scales, np.diff(matrix.indptr))
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+
+    return matrix
+
+
+def _build_join_index(
+    rows: csr_matrix, max_weights: np.array, min_similarity: float
+) -> Tuple[np.array, ...]:
+    """
+    Builds the index of the rows used by the compiled similarity join. The n-grams of
+    each row are ordered from the most to the least frequent n-gram in the rows, the
+    prefix of a row holds the frequent n-grams which can together not give a product
+    of min_similarity with any of the vectors. Only the rest of the row is placed in
+    the posting lists, which therefore mostly hold the rare n-grams and are short.
+    Every pair with a similarity of at least min_similarity shares an n-gram outside
+    the prefix of the row, and is found in the posting lists.
+
+    Parameters
+    ----------
+    rows : csr_matrix
+        The rows with an L2 norm of 1 and sorted indices
+    max_weights : np.array
+        The largest weight of each of the n-grams in the vectors
+    min_similarity : float
+        The minimal similarity of the pairs which should be found
+
+    Returns
+    -------
+    Tuple[np.array, ...]
+        The arguments of _similarity_join_numba describing the rows
+    """
+    number_of_rows, number_of_columns = rows.shape
+    row_ids = np.repeat(np.arange(number_of_rows), np.diff(rows.indptr))
+    # n-grams which do not occur in the vectors can not add to any product
+    used = max_weights[rows.indices] > 0
+    row_ids, columns, weights = row_ids[used], rows.indices[used], rows.data[used]
+    row_ptr = np.zeros(number_of_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_ids, minlength=number_of_rows), out=row_ptr[1:])
+
+    frequency = np.bincount(columns, minlength=number_of_columns)
+    by_frequency = np.argsort(-frequency, kind="stable")
+    rank = np.empty(number_of_columns, dtype=np.int64)
+    rank[by_frequency] = np.arange(number_of_columns)
+    ranked = csr_matrix((weights, rank[columns], row_ptr), shape=rows.shape)
+    ranked.has_sorted_indices = False
+    ranked.sort_indices()
+    columns, weights = by_frequency[ranked.indices], ranked.data
+    indexed, prefix_bounds = _split_prefixes_numba(
+        row_ptr, weights, max_weights[columns], min_similarity
+    )
+
+    sizes = np.bincount(row_ids, weights, minlength=number_of_rows)
+    row_max = np.zeros(number_of_rows)
+    np.maximum.at(row_max, row_ids, weights)
+    column_max = np.zeros(number_of_columns)
+    np.maximum.at(column_max, columns, weights)
+    # the rows are numbered in the order of their size, such that the posting lists
+    # with the rows in the order of their numbers are ordered on size
+    by_size = np.argsort(sizes, kind="stable")
+    position = np.empty(number_of_rows, dtype=np.int64)
+    position[by_size] = np.arange(number_of_rows)
+    lists = csc_matrix(
+        (weights[indexed], (position[row_ids[indexed]], columns[indexed])),
+        shape=rows.shape,
+    )
+    lists.sort_indices()
+    index_rows = by_size[lists.indices]
+
+    prefix = ~indexed
+    prefix_norms = np.sqrt(
+        np.bincount(row_ids[prefix], weights[prefix] ** 2, minlength=number_of_rows)
+    )
+    boundaries = np.full(number_of_rows, number_of_columns, dtype=np.int64)
+    np.minimum.at(boundaries, row_ids[indexed], rank[columns[indexed]])
+
+    return (
+        lists.indptr.astype(np.int64),
+        index_rows,
+        lists.data,
+        sizes[index_rows],
+        row_ptr,
+        columns.astype(np.int64),
+        weights,
+        prefix_bounds,
+        prefix_norms,
+        boundaries,
+        row_max,
+        column_max,
+        rank,
+        position,
+    )
+
+
+def _similarity_join_numpy(
+    rows: csr_matrix, vectors: csr_matrix, min_similarity: float, self_join: bool
+) -> csr_matrix:
+    """
+    Calculates all the products of the vectors with the rows in blocks of vectors,
+    for which the number of intermediate products stays below _JOIN_BUFFER_SIZE, and
+    keeps the products of at least min_similarity.
+
+    Parameters
+    ----------
+    rows : csr_matrix
+        The rows with an L2 norm of 1
+    vectors : csr_matrix
+        The vectors with an L2 norm of 1
+    min_similarity : float
+        The minimal similarity of the pairs which should be found
+    self_join : bool
+        Whether the vectors are the rows themselves, in which case a vector is only
+        multiplied with the rows after it
+
+    Returns
+    -------
+    csr_matrix
+        The products of at least min_similarity with a row for each vector
+    """
+    column_lengths = np.bincount(rows.indices, minlength=rows.shape[1])
+    costs = np.cumsum(csr_matrix(vectors, dtype=bool).astype(np.int64) @ column_lengths)
+    blocks = []
+    start = 0
+    while start < vectors.shape[0]:
+        offset = costs[start - 1] if start > 0 else 0
+        end = max(
+            np.searchsorted(costs, offset + _JOIN_BUFFER_SIZE, side="right"), start + 1
+        )
+        first = start if self_join else 0
+        products = csr_matrix(vectors[start:end] @ rows[first:].T)
+        if self_join:
+            lengths = np.diff(products.indptr)
+            own = products.indices + first <= np.repeat(np.arange(start, end), lengths)
+            products.data[own] = 0
+        products.data[products.data < min_similarity - _BOUND_MARGIN] = 0
+        products.eliminate_zeros()
+        products.sort_indices()
+        blocks.append(
+            csr_matrix(
+                (products.data, products.indices + first, products.indptr),
+                shape=(end - start, rows.shape[0]),
+            )
+        )
+        start = end
+
+    return csr_matrix(vstack(blocks), shape=(vectors.shape[0], rows.shape[0]))
+
+
+def similarity_join(
+    matrix: spmatrix,
+    vectors: Union[spmatrix, None],
+    min_similarity: float,
+    row_scales: Union[np.array, None] = None,
+    row_range: Union[Tuple[int, int], None] = None,
+) -> csr_matrix:
+    """
+    Finds all the pairs of a vector and a row of a matrix with a cosine similarity of
+    at least min_similarity. If numba is installed the pairs are found with the prefix
+    and length filtering of the AllPairs algorithm, such that most of the pairs are
+    never compared. Without numba all the products are calculated in blocks.
+
+    Parameters
+    ----------
+    matrix : spmatrix
+        The n-grams matrix of the matching data, with a row for each name
+    vectors : Union[spmatrix, None]
+        The n-grams of the names which should be matched, with a row for each name. If
+        None the rows of the matrix are joined with each other, in which case each
+        pair is found once and a row is not paired with itself
+    min_similarity : float
+        The minimal cosine similarity of the pairs, should be larger than 0
+    row_scales : Union[np.array, None]
+        The scale of each of the rows if the values of the matrix are quantised
+        default=None
+    row_range : Union[Tuple[int, int], None]
+        The first row and the row after the last row of the matrix which can be found,
+        if None all the rows can be found
+        default=None
+
+    Returns
+    -------
+    csr_matrix
+        The cosine similarities of the pairs, with a row for each vector and a column
+        for each row of the matrix. For a self join the similarity of a pair is given
+        in the row of the first row of the pair, such that the matrix is upper
+        triangular
+    """
+    if not 0 < min_similarity <= 1:
+        raise ValueError("The min_similarity should be larger than 0 and at most 1")
+
+    if row_range is not None:
+        in_range = np.zeros(matrix.shape[0])
+        in_range[row_range[0] : row_range[1]] = 1
+        row_scales = in_range if row_scales is None else in_range * row_scales
+    rows = _unit_rows(matrix, row_scales)
+    self_join = vectors is None
+    vectors = rows if self_join else _unit_rows(vectors, None)
+    if (vectors.nnz == 0) or (rows.nnz == 0):
+        return csr_matrix((vectors.shape[0], rows.shape[0]))
+
+    if not sparse_cosine._numba_available:
+        return _similarity_join_numpy(rows, vectors, min_similarity, self_join)
+
+    max_weights = np.zeros(vectors.shape[1])
+    np.maximum.at(max_weights, vectors.indices, vectors.data)
+    result_ptr, result_ind, result_val = _similarity_join_numba(
+        *_build_join_index(rows, max_weights, min_similarity),
+        np.zeros(vectors.shape[1]),
+        vectors.indptr.astype(np.int64),
+        vectors.indices.astype(np.int64),
+        vectors.data,
+        min_similarity,
+        self_join,
+    )
+    pairs = csr_matrix(
+        (np.minimum(result_val, 1), result_ind, result_ptr),
+        shape=(vectors.shape[0], rows.shape[0]),
+    )
+    if self_join:
+        # a pair is found from the row with the smaller sum of weights, it is moved to
+        # the first row of the pair
+        pairs = pairs.tocoo()
+        pairs = csr_matrix(
+            (
+                pairs.data,
+                (
+                    np.minimum(pairs.row, pairs.col),
+                    np.maximum(pairs.row, pairs.col),
+                ),
+            ),
+            shape=pairs.shape,
+        )
+        pairs.sort_indices()
+
+    return pairs
@@ -1,7 +1,195 @@
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
-from scipy.sparse import csc_matrix, coo_matrix
-from typing import Union
+from scipy.sparse import csc_matrix, csr_matrix, coo_matrix
+from typing import Tuple, Union
+
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# The maximum number of elements of the dense result buffer which is used when a block
+# of vectors is processed at once in the low memory approach
+_LOW_MEMORY_BUFFER_SIZE = 2**22
+
+# The maximum number of intermediate products which are created at once by the NumPy
+# version of the fused sparse cosine top n calculation
+_TOP_N_BUFFER_SIZE = 2**24
+
+_numba_available = njit is not None
+
+# The empty candidate mask passed to the compiled kernel when all the rows can be
+# matched, a mask without columns disables the masking
+_NO_CANDIDATE_MASK = np.ones((1, 0), dtype=np.bool_)
+_NO_MASK_GROUPS = np.zeros(0, dtype=np.int64)
+# The empty row scales passed to the compiled kernel when the matrix is not quantised
+_NO_ROW_SCALES = np.ones(0, dtype=np.float32)
+
+
+def _column_ranges(
+    matrix_col: np.array, vector_ind: np.array
+) -> Tuple[np.array, np.array]:
+    """
+    Determines for each of the indices of a vector which positions of a matrix sorted on
+    the column indices belong to that column.
+
+    Parameters
+    ----------
+    matrix_col : np.array
+        The column indices of the matrix in ascending order
+    vector_ind : np.array
+        The indices of the vector
+
+    Returns
+    -------
+    Tuple[np.array, np.array]
+        The positions in the matrix belonging to the indices of the vector and for each
+        of these positions the number of the index of the vector it belongs to
+    """
+    starts = np.searchsorted(matrix_col, vector_ind, side="left")
+    lengths = np.searchsorted(matrix_col, vector_ind, side="right") - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    positions = offsets + np.arange(np.sum(lengths))
+
+    return positions, np.repeat(np.arange(len(vector_ind)), lengths)
+
+
+if _numba_available:
+
+    @njit(cache=True, nogil=True)
+    def _sparse_cosine_low_memory_numba(
+        matrix_row,
+        matrix_col,
+        matrix_data,
+        matrix_len,
+        vector_ptr,
+        vector_ind,
+        vector_data,
+        row_start,
+    ):
+        """
+        Compiled version of the low memory sparse cosine simularity calculation between
+        the matrix_len rows of a matrix from row_start onwards and a block of vectors
+        given in the csr format
+        """
+        res = np.zeros((len(vector_ptr) - 1, matrix_len), np.float32)
+        starts = np.searchsorted(matrix_col, vector_ind, side="left")
+        ends = np.searchsorted(matrix_col, vector_ind, side="right")
+        for vector in range(len(vector_ptr) - 1):
+            for ind in range(vector_ptr[vector], vector_ptr[vector + 1]):
+                for mat_ind in range(starts[ind], ends[ind]):
+                    row = matrix_row[mat_ind] - row_start
+                    if (row < 0) or (row >= matrix_len):
+                        continue
+                    res[vector, row] += matrix_data[mat_ind] * vector_data[ind]
+
+        return res
+
+
+def _sparse_cosine_low_memory_numpy(
+    matrix_row: np.array,
+    matrix_col: np.array,
+    matrix_data: np.array,
+    matrix_len: int,
+    vector_ptr: np.array,
+    vector_ind: np.array,
+    vector_data: np.array,
+    row_start: int = 0,
+) -> np.array:
+    """
+    NumPy version of the low memory sparse cosine simularity calculation between the
+    matrix_len rows of a matrix from row_start onwards and a block of vectors given in
+    the csr format
+    """
+    number_of_vectors = len(vector_ptr) - 1
+    positions, ind = _column_ranges(matrix_col, vector_ind)
+    vector = np.repeat(np.arange(number_of_vectors), np.diff(vector_ptr))[ind]
+    rows = matrix_row[positions] - row_start
+    in_range = (rows >= 0) & (rows < matrix_len)
+    positions, ind, vector, rows = (
+        positions[in_range],
+        ind[in_range],
+        vector[in_range],
+        rows[in_range],
+    )
+    res = np.bincount(
+        vector * matrix_len + rows,
+        weights=matrix_data[positions] * vector_data[ind],
+        minlength=number_of_vectors * matrix_len,
+    )
+
+    return res.reshape(number_of_vectors, matrix_len).astype(np.float32)
+
+
+def _sparse_cosine_low_memory_block(
+    matrix_row: np.array,
+    matrix_col: np.array,
+    matrix_data: np.array,
+    matrix_len: int,
+    vector_ptr: np.array,
+    vector_ind: np.array,
+    vector_data: np.array,
+    row_start: int = 0,
+) -> np.array:
+    """
+    A sparse cosine simularity calculation between a matrix and a block of vectors. The
+    sparse matrix should be sorted in ascending order based on the matrix_col values. If
+    numba is installed a compiled kernel is used, otherwise the calculation is done with
+    NumPy.
+
+    Parameters
+    ----------
+    matrix_row : np.array
+        The row indices of the ngrams matrix of the matching data
+    matrix_col : np.array
+        The column indices of the ngrams matrix of the matching data in ascending order
+    matrix_data : np.array
+        The data of the ngrams matrix of the matching data
+    matrix_len : int
+        The number of rows of the ngrams matrix of the matching data from row_start
+        onwards with which the similarity is calculated
+    vector_ptr : np.array
+        The index pointer of the csr matrix containing the ngrams vectors of the to be
+        matched data
+    vector_ind : np.array
+        The indices of the ngrams vectors of the to be matched data
+    vector_data : np.array
+        The data of the ngrams vectors of the to be matched data
+    row_start : int
+        The first row of the ngrams matrix with which the similarity is calculated, the
+        entries of the rows outside of the range are skipped
+        default=0
+
+    Returns
+    -------
+    np.array
+        A 2-D array with for each of the vectors the cosine simularity with each of the
+        matrix_len rows of the matrix from row_start onwards
+    """
+    if _numba_available:
+        return _sparse_cosine_low_memory_numba(
+            matrix_row,
+            matrix_col,
+            matrix_data,
+            matrix_len,
+            vector_ptr,
+            vector_ind,
+            vector_data,
+            row_start,
+        )
+
+    return _sparse_cosine_low_memory_numpy(
+        matrix_row,
+        matrix_col,
+        matrix_data,
+        matrix_len,
+        vector_ptr,
+        vector_ind,
+        vector_data,
+        row_start,
+    )
 
 
 def _sparse_cosine_low_memory(
@@ -14,8 +202,7 @@ def _sparse_cosine_low_memory(
 ) -> np.array:
     """
     A sparse cosine simularity calculation between a matrix and a vector. The sparse matrix should be sorted
-    in ascending order based on the matrix_col values. The vector should be sorted based on the indexes in
-    ascending order.
+    in ascending order based on the matrix_col values.
 
     Parameters
     ----------
@@ -38,20 +225,378 @@ def _sparse_cosine_low_memory(
         The cosine simularity between each of the rows of the matrix and the vector
 
     """
-    ind = 0
-    res = np.zeros(matrix_len, np.float32)
-    for mat_ind in range(len(matrix_col)):
-        col = matrix_col[mat_ind]
-        if col > vector_ind[ind]:
-            ind = ind + 1
-            if ind == len(vector_ind):
+    return _sparse_cosine_low_memory_block(
+        matrix_row,
+        matrix_col,
+        matrix_data,
+        matrix_len,
+        np.array([0, len(vector_ind)]),
+        vector_ind,
+        vector_data,
+    )[0]
+
+
+def _sparse_cosine_top_n_low_memory(
+    matrix_a: coo_matrix,
+    matrix_b: csr_matrix,
+    top_n: int,
+    verbose: bool,
+    min_similarity: float = 0,
+    row_range: Union[Tuple[int, int], None] = None,
+    candidate_mask: Union[np.array, None] = None,
+    mask_groups: Union[np.array, None] = None,
+    row_scales: Union[np.array, None] = None,
+) -> Tuple[np.array, np.array]:
+    """
+    A function for the low memory sparse cosine simularity calculation followed by an
+    argpartition to only take the top_n indexes. The vectors of matrix_b are processed
+    in blocks, such that the dense results of a block stay below _LOW_MEMORY_BUFFER_SIZE
+    elements. If a row range is given the entries of matrix_a outside of the range
+    are skipped, such that the results of a block are as wide as the row range.
+
+    Parameters
+    -------
+    matrix_a: coo_matrix
+        The largest sparse coo matrix, sorted in ascending order on the columns
+    matrix_b: csr_matrix
+        The smallest sparse csr matrix
+    top_n: int
+        The best n matches that should be returned
+    verbose: bool
+        A boolean indicating whether the progress should be printed
+    min_similarity: float
+        The minimal cosine similarity of a match, matches with a lower similarity are
+        not returned
+        default=0
+    row_range: Union[Tuple[int, int], None]
+        The first row and the end (exclusive) of the range of rows of matrix_a which
+        are used, if None all the rows are used
+        default=None
+    candidate_mask: Union[np.array, None]
+        A boolean array with a row for each of the masks and a column for each of
+        the rows of matrix_a, only the rows of matrix_a which are True in the mask of a
+        vector can be matched with the vector. If None all the rows can be matched
+        default=None
+    mask_groups: Union[np.array, None]
+        The row of candidate_mask which is used for each of the rows of matrix_b
+        default=None
+    row_scales: Union[np.array, None]
+        The scale of each of the rows of a quantised matrix_a, the similarity with a
+        row is multiplied by the scale of the row. If None the rows are not scaled
+        default=None
+
+    Returns
+    -------
+    Tuple[np.array, np.array]
+        The indexes for the n best sparse cosine matches between matrix a and b and
+        their cosine similarities, ordered from the best to the worst match. Matches
+        without a positive similarity are returned as index 0, or the first row of the
+        row range if given, with a similarity of 0
+    """
+    matrix_len = matrix_a.shape[0]
+    row_start, row_end = (0, matrix_len) if row_range is None else row_range
+    length = row_end - row_start
+    top_n_adjusted = np.min([top_n, length])
+    block_size = max(1, _LOW_MEMORY_BUFFER_SIZE // max(length, 1))
+    results_arg = np.full((matrix_b.shape[0], top_n), row_start, dtype=np.int64)
+    results_val = np.zeros((matrix_b.shape[0], top_n), dtype=np.float64)
+
+    for j in tqdm(range(0, matrix_b.shape[0], block_size), disable=not verbose):
+        matrix_b_temp = matrix_b[j : j + block_size]
+        matrix_b_temp.sort_indices()
+        res = _sparse_cosine_low_memory_block(
+            matrix_a.row,
+            matrix_a.col,
+            matrix_a.data,
+            length,
+            matrix_b_temp.indptr,
+            matrix_b_temp.indices,
+            matrix_b_temp.data,
+            row_start,
+        )
+        if row_scales is not None:
+            res *= row_scales[row_start:row_end]
+        if candidate_mask is not None:
+            res[~candidate_mask[mask_groups[j : j + block_size], row_start:row_end]] = 0
+        arg = np.argpartition(res, -top_n_adjusted, axis=1)[:, -top_n_adjusted:]
+        arg.sort(axis=1)
+        val = np.take_along_axis(res, arg, axis=1).astype(np.float64)
+        order = np.argsort(-val, axis=1, kind="stable")
+        arg = np.take_along_axis(arg, order, axis=1) + row_start
+        val = np.take_along_axis(val, order, axis=1)
+        selected = (val > 0) & (val >= min_similarity)
+        results_arg[j : j + block_size, :top_n_adjusted] = np.where(
+            selected, arg, row_start
+        )
+        results_val[j : j + block_size, :top_n_adjusted] = np.where(selected, val, 0)
+
+    return results_arg, results_val
+
+
+if _numba_available:
+
+    @njit(cache=True, nogil=True)
+    def _sift_down(heap_val, heap_ind, size, pos):
+        """
+        Restores the min-heap property of the heap with the given size from position
+        pos downwards
+        """
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap_val[child + 1] < heap_val[child]:
+                child += 1
+            if heap_val[child] >= heap_val[pos]:
                 break
-        if col == vector_ind[ind]:
-            res[matrix_row[mat_ind]] = (
-                res[matrix_row[mat_ind]] + matrix_data[mat_ind] * vector_data[ind]
+            heap_val[pos], heap_val[child] = heap_val[child], heap_val[pos]
+            heap_ind[pos], heap_ind[child] = heap_ind[child], heap_ind[pos]
+            pos = child
+
+    @njit(cache=True, nogil=True)
+    def _sparse_cosine_top_n_numba(
+        matrix_ptr,
+        matrix_ind,
+        matrix_data,
+        matrix_len,
+        vector_ptr,
+        vector_ind,
+        vector_data,
+        top_n,
+        min_similarity,
+        row_start,
+        row_end,
+        candidate_mask,
+        mask_groups,
+        row_scales,
+        results_arg,
+        results_val,
+    ):
+        """
+        Compiled version of the fused sparse cosine top n calculation between a csc
+        matrix and a block of vectors given in the csr format. The similarities of a
+        vector are accumulated in a dense buffer of the length of the row range of the
+        matrix, of which only the touched rows are visited, and the best matches are
+        kept in a bounded min-heap. If the row range does not cover the whole matrix,
+        the part of each column within the range is found with a binary search. If the
+        candidate mask has columns, rows which would enter the heap but are not in the
+        mask of the vector are skipped. If row scales are given, the accumulated
+        similarity of a row is multiplied by the scale of the row.
+        """
+        length = row_end - row_start
+        restricted = (row_start > 0) | (row_end < matrix_len)
+        masked = candidate_mask.shape[1] > 0
+        scaled = len(row_scales) > 0
+        sums = np.zeros(length)
+        touched = np.empty(length, np.int64)
+        is_touched = np.zeros(length, np.bool_)
+        heap_val = np.empty(top_n)
+        heap_ind = np.empty(top_n, np.int64)
+        for vector in range(len(vector_ptr) - 1):
+            number_touched = 0
+            for ind in range(vector_ptr[vector], vector_ptr[vector + 1]):
+                column = vector_ind[ind]
+                begin = matrix_ptr[column]
+                end = matrix_ptr[column + 1]
+                if restricted:
+                    rows = matrix_ind[begin:end]
+                    end = begin + np.searchsorted(rows, row_end)
+                    begin = begin + np.searchsorted(rows, row_start)
+                for mat_ind in range(begin, end):
+                    row = matrix_ind[mat_ind] - row_start
+                    sums[row] += matrix_data[mat_ind] * vector_data[ind]
+                    if not is_touched[row]:
+                        is_touched[row] = True
+                        touched[number_touched] = row
+                        number_touched += 1
+
+            size = 0
+            for i in range(number_touched):
+                row = touched[i]
+                value = sums[row]
+                sums[row] = 0
+                is_touched[row] = False
+                row = row + row_start
+                if scaled:
+                    value = value * row_scales[row]
+                if (value <= 0) | (value < min_similarity):
+                    continue
+                if (size == top_n) and (value <= heap_val[0]):
+                    continue
+                if masked:
+                    if not candidate_mask[mask_groups[vector], row]:
+                        continue
+                if size < top_n:
+                    heap_val[size] = value
+                    heap_ind[size] = row
+                    pos = size
+                    size += 1
+                    while pos > 0:
+                        parent = (pos - 1) // 2
+                        if heap_val[parent] <= heap_val[pos]:
+                            break
+                        heap_val[pos], heap_val[parent] = heap_val[parent], heap_val[pos]
+                        heap_ind[pos], heap_ind[parent] = heap_ind[parent], heap_ind[pos]
+                        pos = parent
+                else:
+                    heap_val[0] = value
+                    heap_ind[0] = row
+                    _sift_down(heap_val, heap_ind, size, 0)
+
+            order = np.argsort(heap_ind[:size])
+            order = order[np.argsort(-heap_val[:size][order], kind="mergesort")]
+            for i in range(size):
+                results_arg[vector, i] = heap_ind[order[i]]
+                results_val[vector, i] = heap_val[order[i]]
+
+
+def _sparse_cosine_top_n_numpy(
+    matrix_a: csc_matrix,
+    matrix_b: csr_matrix,
+    top_n: int,
+    min_similarity: float,
+    results_arg: np.array,
+    results_val: np.array,
+    row_start: int = 0,
+    candidate_mask: Union[np.array, None] = None,
+    mask_groups: Union[np.array, None] = None,
+    row_scales: Union[np.array, None] = None,
+) -> None:
+    """
+    NumPy version of the fused sparse cosine top n calculation between a csc matrix and
+    a block of vectors given in the csr format. The product is calculated with scipy for
+    sub-blocks of vectors which create at most _TOP_N_BUFFER_SIZE intermediate products,
+    after which the top_n is selected per vector. The indexes of the matches are offset
+    by row_start. Rows which are not in the candidate mask of a vector are removed
+    before the top_n is selected. The similarities of a quantised matrix are multiplied
+    by the scales of the rows.
+    """
+    lengths = np.diff(matrix_a.indptr)[matrix_b.indices]
+    if (np.sum(lengths) > _TOP_N_BUFFER_SIZE) & (matrix_b.shape[0] > 1):
+        half = matrix_b.shape[0] // 2
+        for begin, end in [(0, half), (half, matrix_b.shape[0])]:
+            _sparse_cosine_top_n_numpy(
+                matrix_a,
+                matrix_b[begin:end],
+                top_n,
+                min_similarity,
+                results_arg[begin:end],
+                results_val[begin:end],
+                row_start,
+                candidate_mask,
+                None if mask_groups is None else mask_groups[begin:end],
+                row_scales,
             )
+        return
+
+    product = csr_matrix(matrix_b * matrix_a.T)
+    for i in range(product.shape[0]):
+        values = product.data[product.indptr[i] : product.indptr[i + 1]]
+        indices = product.indices[product.indptr[i] : product.indptr[i + 1]]
+        if row_scales is not None:
+            values = values * row_scales[indices + row_start]
+        selected = (values > 0) & (values >= min_similarity)
+        if candidate_mask is not None:
+            selected &= candidate_mask[mask_groups[i], indices + row_start]
+        values, indices = values[selected], indices[selected]
+        if len(values) > top_n:
+            best = np.argpartition(values, -top_n)[-top_n:]
+            values, indices = values[best], indices[best]
+        order = np.lexsort((indices, -values))
+        results_arg[i, : len(order)] = indices[order] + row_start
+        results_val[i, : len(order)] = values[order]
+
+
+def _sparse_cosine_top_n_block(
+    matrix_a: csc_matrix,
+    matrix_b: csr_matrix,
+    top_n: int,
+    min_similarity: float,
+    results_arg: np.array,
+    results_val: np.array,
+    row_range: Union[Tuple[int, int], None] = None,
+    candidate_mask: Union[np.array, None] = None,
+    mask_groups: Union[np.array, None] = None,
+    row_scales: Union[np.array, None] = None,
+) -> None:
+    """
+    A fused sparse cosine top n calculation between a csc matrix and a block of vectors.
+    The results are written in place into results_arg and results_val. If numba is
+    installed a compiled kernel is used, otherwise the calculation is done with NumPy.
+    If a row range is given only the rows of the matrix within this range are used,
+    which requires the row indices of each column of the csc matrix to be sorted. If a
+    candidate mask is given only the rows in the mask of a vector can be matched.
 
-    return res
+    Parameters
+    ----------
+    matrix_a : csc_matrix
+        The ngrams matrix of the matching data
+    matrix_b : csr_matrix
+        The ngrams vectors of the block of the to be matched data
+    top_n : int
+        The best n matches that should be returned
+    min_similarity : float
+        The minimal cosine similarity of a match, matches with a lower similarity are
+        not returned
+    results_arg : np.array
+        The array in which the indexes of the top n matches of the block are written
+    results_val : np.array
+        The array in which the similarities of the top n matches of the block are
+        written
+    row_range : Union[Tuple[int, int], None]
+        The first row and the end (exclusive) of the range of rows of the matrix which
+        are used, if None all the rows are used
+        default=None
+    candidate_mask : Union[np.array, None]
+        A boolean array with a row for each of the masks and a column for each of
+        the rows of the matrix, if None all the rows can be matched
+        default=None
+    mask_groups : Union[np.array, None]
+        The row of candidate_mask which is used for each of the vectors of the block
+        default=None
+    row_scales : Union[np.array, None]
+        The scale of each of the rows of a quantised matrix, if None the rows are not
+        scaled
+        default=None
+    """
+    row_start, row_end = (0, matrix_a.shape[0]) if row_range is None else row_range
+    if _numba_available:
+        if candidate_mask is None:
+            candidate_mask = _NO_CANDIDATE_MASK
+            mask_groups = _NO_MASK_GROUPS
+        _sparse_cosine_top_n_numba(
+            matrix_a.indptr,
+            matrix_a.indices,
+            matrix_a.data,
+            matrix_a.shape[0],
+            matrix_b.indptr,
+            matrix_b.indices,
+            matrix_b.data,
+            top_n,
+            min_similarity,
+            row_start,
+            row_end,
+            candidate_mask,
+            mask_groups,
+            _NO_ROW_SCALES if row_scales is None else row_scales,
+            results_arg,
+            results_val,
+        )
+    else:
+        if row_range is not None:
+            matrix_a = matrix_a[row_start:row_end]
+        _sparse_cosine_top_n_numpy(
+            matrix_a,
+            matrix_b,
+            top_n,
+            min_similarity,
+            results_arg,
+            results_val,
+            row_start,
+            candidate_mask,
+            mask_groups,
+            row_scales,
+        )
 
 
 def _sparse_cosine_top_n_standard(
@@ -60,10 +605,18 @@ def _sparse_cosine_top_n_standard(
     number_of_rows_at_once: int,
     top_n: int,
     verbose: bool,
-) -> np.array:
+    min_similarity: float = 0,
+    n_threads: int = 1,
+    row_range: Union[Tuple[int, int], None] = None,
+    candidate_mask: Union[np.array, None] = None,
+    mask_groups: Union[np.array, None] = None,
+    row_scales: Union[np.array, None] = None,
+) -> Tuple[np.array, np.array]:
     """
-    A function for sparse matrix multiplication followed by an argpartition to
-    only take the top_n indexes.
+    A fused sparse matrix multiplication and top_n selection. The product of the two
+    matrices is never materialised, for each of the rows of matrix_b the similarities
+    are accumulated over the columns of matrix_a and only the top_n indexes are kept.
+    The rows of matrix_b are divided over n_threads threads.
 
     Parameters
     -------
@@ -78,49 +631,81 @@ def _sparse_cosine_top_n_standard(
         The best n matches that should be returned
     verbose: bool
         A boolean indicating whether the progress should be printed
+    min_similarity: float
+        The minimal cosine similarity of a match, matches with a lower similarity are
+        not returned
+        default=0
+    n_threads: int
+        The number of threads used to process the rows of matrix_b
+        default=1
+    row_range: Union[Tuple[int, int], None]
+        The first row and the end (exclusive) of the range of rows of matrix_a which
+        are used, if None all the rows are used
+        default=None
+    candidate_mask: Union[np.array, None]
+        A boolean array with a row for each of the masks and a column for each of
+        the rows of matrix_a, only the rows of matrix_a which are True in the mask of a
+        vector can be matched with the vector. If None all the rows can be matched
+        default=None
+    mask_groups: Union[np.array, None]
+        The row of candidate_mask which is used for each of the rows of matrix_b
+        default=None
+    row_scales: Union[np.array, None]
+        The scale of each of the rows of a quantised matrix_a, the similarity with a
+        row is multiplied by the scale of the row. If None the rows are not scaled
+        default=None
 
     Returns
     -------
-    np.array
-        The indexes for the n best sparse cosine matches between matrix a and b
+    Tuple[np.array, np.array]
+        The indexes for the n best sparse cosine matches between matrix a and b and
+        their cosine similarities, ordered from the best to the worst match and padded
+        with zeros, or with the first row of the row range if given
 
     """
+    matrix_a = csc_matrix(matrix_a)
+    matrix_b = csr_matrix(matrix_b)
+    if (row_range is not None) and (not matrix_a.has_sorted_indices):
+        matrix_a.sort_indices()
+    number_of_rows = matrix_b.shape[0]
+    row_start = 0 if row_range is None else row_range[0]
+    results_arg = np.full((number_of_rows, top_n), row_start, dtype=np.int64)
+    results_val = np.zeros((number_of_rows, top_n), dtype=np.float64)
+    if n_threads > 1:
+        number_of_rows_at_once = min(
+            number_of_rows_at_once, int(np.ceil(number_of_rows / n_threads))
+        )
 
-    results_arg = np.zeros((matrix_b.shape[0], top_n), dtype=np.float32)
-
-    # Split up the matrice in a certain number of rows
-    for j in tqdm(
-        range(0, matrix_b.shape[0], number_of_rows_at_once), disable=not verbose
-    ):
-        number_of_rows_at_once_min = min(
-            [number_of_rows_at_once, matrix_b.shape[0] - j]
+    def process_block(j):
+        _sparse_cosine_top_n_block(
+            matrix_a,
+            matrix_b[j : j + number_of_rows_at_once],
+            top_n,
+            min_similarity,
+            results_arg[j : j + number_of_rows_at_once],
+            results_val[j : j + number_of_rows_at_once],
+            row_range,
+            candidate_mask,
+            None
+            if mask_groups is None
+            else mask_groups[j : j + number_of_rows_at_once],
+            row_scales,
         )
-        matrix_b_temp = matrix_b[j : j + number_of_rows_at_once_min, :]
-
-        # Calculate the matrix dot product
-        results_full = (matrix_a * (matrix_b_temp.T)).tocsc()
-
-        # For each of the rows of the original matrix select the argpartition
-        for i in range(number_of_rows_at_once_min):
-            results_full_temp = results_full.data[
-                results_full.indptr[i] : results_full.indptr[i + 1]
-            ]
-
-            # If there are more results then top_n only select the top_n results
-            if len(results_full_temp) > top_n:
-                ind = results_full.indices[
-                    results_full.indptr[i] : results_full.indptr[i + 1]
-                ]
-                results_arg[j + i, :] = ind[
-                    np.argpartition(results_full_temp, -top_n)[-top_n:]
-                ]
-
-            # else just select all the results
-            else:
-                results_arg[j + i, : len(results_full_temp)] = results_full.indices[
-                    results_full.indptr[i] : results_full.indptr[i + 1]
-                ]
-    return results_arg
+
+    blocks = range(0, number_of_rows, max(1, number_of_rows_at_once))
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            for _ in tqdm(
+                executor.map(process_block, blocks),
+                total=len(blocks),
+                disable=not verbose,
+            ):
+                pass
+    else:
+        for j in tqdm(blocks, disable=not verbose):
+            process_block(j)
+
+    return results_arg, results_val
 
 
 def sparse_cosine_top_n(
@@ -130,10 +715,20 @@ def sparse_cosine_top_n(
     low_memory: bool,
     number_of_rows: int,
     verbose: bool,
-):
+    min_similarity: float = 0,
+    n_threads: int = 1,
+    row_range: Union[Tuple[int, int], None] = None,
+    candidate_mask: Union[np.array, None] = None,
+    mask_groups: Union[np.array, None] = None,
+    row_scales: Union[np.array, None] = None,
+) -> Tuple[np.array, np.array]:
     """
     Calculates the top_n cosine matches between matrix_a and matrix_b. Takes into account
-    the amount of  memory that should be used based on the low_memory int
+    the amount of  memory that should be used based on the low_memory int. If a row
+    range is given, only the rows of matrix_a within this range can be matched, without
+    copying matrix_a. If a candidate mask is given, the rows of matrix_a which are not
+    in the mask of a vector are removed before the top_n is selected, such that the
+    top_n consists of the best matches within the mask.
 
     Parameters
     -------
@@ -150,28 +745,102 @@ def sparse_cosine_top_n(
         processed at once when calculating the cosine simalarity
     verbose: bool
         A boolean indicating whether the progress should be printed
+    min_similarity: float
+        The minimal cosine similarity of a match, matches with a lower similarity are
+        not returned
+        default=0
+    n_threads: int
+        The number of threads used, only used if low_memory is False
+        default=1
+    row_range: Union[Tuple[int, int], None]
+        The first row and the end (exclusive) of the range of rows of matrix_a which
+        are used, if None all the rows are used
+        default=None
+    candidate_mask: Union[np.array, None]
+        A boolean array with a value for each of the rows of matrix_a which is used for
+        all the rows of matrix_b, or a boolean array with a row for each of the masks
+        and a column for each of the rows of matrix_a. Only the rows of matrix_a which
+        are True in the mask of a row of matrix_b can be matched with it. If None all
+        the rows can be matched
+        default=None
+    mask_groups: Union[np.array, None]
+        The row of a two-dimensional candidate_mask which is used for each of the rows
+        of matrix_b, if None the first row is used for all the rows of matrix_b
+        default=None
+    row_scales: Union[np.array, None]
+        The scale of each of the rows of matrix_a if its values are quantised, such
+        that the values of a row multiplied by its scale are the original values. If
+        None the values of matrix_a are used as they are
+        default=None
 
     Returns
     -------
-    np.array
-        The indexes for the n best sparse cosine matches between matrix a and b
+    Tuple[np.array, np.array]
+        The indexes for the n best sparse cosine matches between matrix a and b and
+        their cosine similarities, both ordered from the best to the worst match. If
+        less than top_n matches are found the results are padded with zeros, or with
+        the first row of the row range if given
 
     """
+    if candidate_mask is not None:
+        candidate_mask, mask_groups = _candidate_mask_groups(
+            candidate_mask, mask_groups, matrix_a.shape[0], matrix_b.shape[0]
+        )
     if low_memory:
-        matrix_b.sort_indices()
-        res = _sparse_cosine_low_memory(
-            matrix_a.row,
-            matrix_a.col,
-            matrix_a.data,
-            matrix_a.shape[0],
-            matrix_b.indices,
-            matrix_b.data,
+        return _sparse_cosine_top_n_low_memory(
+            matrix_a,
+            csr_matrix(matrix_b),
+            top_n,
+            verbose,
+            min_similarity,
+            row_range=row_range,
+            candidate_mask=candidate_mask,
+            mask_groups=mask_groups,
+            row_scales=row_scales,
         )
-
-        top_n_adjusted = -np.min([top_n, len(res)])
-
-        return np.argpartition(res, top_n_adjusted, axis=0)[top_n_adjusted:]
     else:
         return _sparse_cosine_top_n_standard(
-            matrix_a, matrix_b, number_of_rows, top_n, verbose
+            matrix_a,
+            matrix_b,
+            number_of_rows,
+            top_n,
+            verbose,
+            min_similarity=min_similarity,
+            n_threads=n_threads,
+            row_range=row_range,
+            candidate_mask=candidate_mask,
+            mask_groups=mask_groups,
+            row_scales=row_scales,
         )
+
+
+def _candidate_mask_groups(
+    candidate_mask: np.array,
+    mask_groups: Union[np.array, None],
+    number_of_candidates: int,
+    number_of_vectors: int,
+) -> Tuple[np.array, np.array]:
+    """
+    Converts a candidate mask to a two-dimensional boolean array with a row for each of
+    the masks, together with the row of the mask which is used for each of the vectors.
+    """
+    candidate_mask = np.asarray(candidate_mask, dtype=np.bool_)
+    if candidate_mask.ndim == 1:
+        candidate_mask = candidate_mask[np.newaxis]
+    if (candidate_mask.ndim != 2) | (candidate_mask.shape[1] != number_of_candidates):
+        raise ValueError(
+            "The candidate mask should have a value for each of the rows of the"
+            + f" matrix, expected {number_of_candidates} values per mask but got"
+            + f" shape {candidate_mask.shape}"
+        )
+    if mask_groups is None:
+        mask_groups = np.zeros(number_of_vectors, dtype=np.int64)
+    mask_groups = np.asarray(mask_groups, dtype=np.int64)
+    if len(mask_groups) != number_of_vectors:
+        raise ValueError("The mask groups should have a value for each of the vectors")
+    if (len(mask_groups) > 0) and (
+        (mask_groups.min() < 0) | (mask_groups.max() >= len(candidate_mask))
+    ):
+        raise ValueError("The mask groups should refer to rows of the candidate mask")
+
+    return np.ascontiguousarray(candidate_mask), mask_groups
@@ -0,0 +1,32 @@
+import os.path as path
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse import csr_matrix, random as sparse_random
+
+
+@pytest.fixture
+def original_name():
+    package_dir = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+    return pd.read_csv(path.join(package_dir, "test", "test_names.csv"))
+
+
+@pytest.fixture
+def adjusted_name():
+    package_dir = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+    return pd.read_csv(path.join(package_dir, "test", "adjusted_test_names.csv"))
+
+
+@pytest.fixture
+def matrix():
+    matrix = sparse_random(300, 40, density=0.1, format="csr", random_state=1)
+    # a few rows without n-grams
+    empty = np.isin(np.arange(300), [5, 17])
+    return csr_matrix(matrix.multiply(~empty[:, None]))
+
+
+@pytest.fixture
+def vectors():
+    vectors = sparse_random(25, 40, density=0.15, format="csr", random_state=2)
+    # a vector without n-grams
+    return csr_matrix(vectors.multiply((np.arange(25) != 3)[:, None]))
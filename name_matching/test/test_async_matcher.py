@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+import name_matching.name_matcher as nm
+from name_matching.async_matcher import AsyncNameMatcher
+
+
+async def _match_all(async_matcher, names):
+    async with async_matcher:
+        return await asyncio.gather(*(async_matcher.match(name) for name in names))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"number_of_matches": 2}, {"min_cosine": 0.5, "return_cosine_score": True}],
+)
+def test_match(original_name, adjusted_name, kwargs):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, **kwargs)
+    name_match.load_and_process_master_data("company_name", original_name)
+    names = adjusted_name["company_name"].iloc[:20].tolist()
+    async_matcher = AsyncNameMatcher(name_match, max_batch_size=8, max_wait=1)
+    results = asyncio.run(_match_all(async_matcher, names))
+
+    assert async_matcher.stats()["batches"] == 3
+    assert async_matcher.stats()["requests"] == 20
+    for name, matches in zip(names, results):
+        expected = name_match.match_one(name)
+        assert len(matches) == len(expected)
+        for match, expected_match in zip(matches, expected):
+            assert match.match_name == expected_match.match_name
+            assert match.score == pytest.approx(expected_match.score)
+            assert match.match_index == expected_match.match_index
+            assert match.cosine_score == pytest.approx(expected_match.cosine_score)
+
+
+def test_match_max_wait(original_name):
+    name_match = nm.NameMatcher(top_n=10, verbose=False)
+    name_match.load_and_process_master_data("company_name", original_name)
+    async_matcher = AsyncNameMatcher(name_match, max_batch_size=8, max_wait=0)
+
+    async def match_sequentially():
+        async with async_matcher:
+            return [await async_matcher.match(name) for name in ["abc", "def"]]
+
+    results = asyncio.run(match_sequentially())
+    assert len(results) == 2
+    assert async_matcher.stats()["batches"] == 2
+
+
+def test_match_error():
+    async_matcher = AsyncNameMatcher(nm.NameMatcher(verbose=False))
+    with pytest.raises(ValueError):
+        asyncio.run(_match_all(async_matcher, ["abc", "def"]))
+
+
+def test_max_batch_size():
+    with pytest.raises(ValueError):
+        AsyncNameMatcher(nm.NameMatcher(), max_batch_size=0)
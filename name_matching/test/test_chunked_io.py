@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from name_matching.chunked_io import infer_file_format, read_chunks, ChunkWriter
+
+
+@pytest.mark.parametrize(
+    "path, file_format, result",
+    [
+        ("names.csv", None, "csv"),
+        ("names.CSV.gz", None, "csv"),
+        ("names.jsonl", None, "jsonl"),
+        ("names.json", None, "jsonl"),
+        ("names.parquet", None, "parquet"),
+        ("names.txt", "csv", "csv"),
+    ],
+)
+def test_infer_file_format(path, file_format, result):
+    assert infer_file_format(path, file_format) == result
+
+
+@pytest.mark.parametrize("path, file_format", [("names.txt", None), ("a.csv", "xlsx")])
+def test_infer_file_format_error(path, file_format):
+    with pytest.raises(ValueError):
+        infer_file_format(path, file_format)
+
+
+@pytest.mark.parametrize("extension", ["csv", "jsonl", "parquet"])
+def test_write_and_read_chunks(tmp_path, extension):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    data = pd.DataFrame(
+        {"name": [f"company {num}" for num in range(7)], "score": range(7)}
+    )
+    path = str(tmp_path / f"names.{extension}")
+    with ChunkWriter(path) as writer:
+        for start in range(0, 7, 3):
+            writer.write(data.iloc[start : start + 3])
+
+    chunks = list(read_chunks(path, 2, columns=["name", "score"]))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks), data, check_dtype=False)
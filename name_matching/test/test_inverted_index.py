@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+import name_matching.sparse_cosine as sparse_cosine
+from name_matching.inverted_index import InvertedIndex
+
+
+def _products(matrix, vectors):
+    return (vectors @ matrix.T).toarray()
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+@pytest.mark.parametrize("row_range", [None, (20, 250)])
+@pytest.mark.parametrize("top_n", [1, 5, 400])
+def test_search(numba_available, row_range, top_n, monkeypatch, matrix, vectors):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    similarity = _products(matrix, vectors)
+    start, end = (0, 300) if row_range is None else row_range
+    similarity[:, :start] = 0
+    similarity[:, end:] = 0
+
+    indices, scores = InvertedIndex().fit(matrix).search(
+        vectors, top_n, row_range=row_range
+    )
+    assert indices.shape == (25, top_n)
+    expected = np.zeros((25, top_n))
+    expected[:, : min(top_n, 300)] = -np.sort(-similarity, axis=1)[:, :top_n]
+    np.testing.assert_array_almost_equal(scores, expected)
+    found = scores > 0
+    np.testing.assert_array_almost_equal(
+        np.take_along_axis(similarity, indices, axis=1)[found], scores[found]
+    )
+    assert np.all(indices[~found] == start)
+    assert np.all(scores[3] == 0)
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+def test_search_candidate_mask(numba_available, monkeypatch, matrix, vectors):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    rng = np.random.default_rng(4)
+    candidate_mask = rng.random((3, 300)) > 0.5
+    mask_groups = rng.integers(0, 3, 25)
+    similarity = _products(matrix, vectors)
+    similarity[~candidate_mask[mask_groups]] = 0
+
+    indices, scores = InvertedIndex().fit(matrix).search(
+        vectors, 5, candidate_mask=candidate_mask, mask_groups=mask_groups
+    )
+    np.testing.assert_array_almost_equal(
+        scores, -np.sort(-similarity, axis=1)[:, :5]
+    )
+    found = scores > 0
+    assert np.all(candidate_mask[mask_groups[:, None], indices][found])
+
+
+def test_row_scales(matrix, vectors):
+    row_scales = np.linspace(0.01, 0.02, 300).astype(np.float32)
+    quantised = csr_matrix(matrix)
+    quantised.data = np.rint(quantised.data * 100).astype(np.uint8)
+    scaled = quantised.astype(np.float64).multiply(row_scales[:, None]).tocsr()
+    similarity = _products(scaled, vectors)
+
+    indices, scores = InvertedIndex().fit(quantised, row_scales).search(vectors, 5)
+    np.testing.assert_array_almost_equal(
+        scores, -np.sort(-similarity, axis=1)[:, :5], decimal=5
+    )
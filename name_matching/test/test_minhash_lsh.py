@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from name_matching.minhash_lsh import MinHashLSH
+
+
+@pytest.fixture
+def matrix(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    return csr_matrix(matrix.multiply(1 / np.maximum(norms, 1e-9)))
+
+
+def test_signatures(matrix):
+    lsh = MinHashLSH(bands=64, rows=2)
+    signatures = lsh.signatures(matrix)
+    assert signatures.shape == (300, 128)
+    assert signatures.dtype == np.uint32
+    assert np.all(signatures[[5, 17]] == 2**32 - 1)
+    np.testing.assert_array_equal(
+        lsh.signatures(matrix[[3, 3]] * 2), signatures[[3, 3]]
+    )
+    # the signatures only depend on the chunk of a row through its n-grams
+    np.testing.assert_array_equal(lsh.signatures(matrix[100:]), signatures[100:])
+
+    # the fraction of equal minimum hashes estimates the Jaccard similarity
+    sets = matrix.astype(bool).astype(int)
+    shared = (sets @ sets.T).toarray()
+    sizes = np.diag(shared)
+    jaccard = shared / np.maximum(sizes[:, None] + sizes[None, :] - shared, 1)
+    pairs = np.triu_indices(300, 1)
+    estimate = (signatures[pairs[0]] == signatures[pairs[1]]).mean(axis=1)
+    filled = (sizes[pairs[0]] > 0) & (sizes[pairs[1]] > 0)
+    assert np.abs(estimate - jaccard[pairs])[filled].mean() < 0.05
+
+
+@pytest.mark.parametrize("row_range", [None, (20, 250)])
+def test_search(matrix, row_range):
+    lsh = MinHashLSH(bands=16, rows=2).fit(matrix)
+    vectors = matrix[:40]
+    indices, scores = lsh.search(vectors, 5, row_range=row_range)
+    assert indices.shape == (40, 5)
+    start, end = (0, 300) if row_range is None else row_range
+
+    products = (vectors @ matrix.T).toarray()
+    found = scores > 0
+    np.testing.assert_array_almost_equal(
+        np.take_along_axis(products, indices, axis=1)[found], scores[found]
+    )
+    assert np.all(indices[~found] == start)
+    assert np.all((indices[found] >= start) & (indices[found] < end))
+    assert np.all(np.diff(scores, axis=1) <= 0)
+    # a name is always a candidate of itself
+    own = (np.arange(40) >= start) & (np.arange(40) < end)
+    own = own & ~np.isin(np.arange(40), [5, 17])
+    assert np.all(indices[own, 0] == np.arange(40)[own])
+    assert np.all(scores[[5, 17]] == 0)
+
+
+def test_search_candidate_mask(matrix):
+    rng = np.random.default_rng(4)
+    candidate_mask = rng.random((3, 300)) > 0.5
+    mask_groups = rng.integers(0, 3, 40)
+    lsh = MinHashLSH(bands=16, rows=2).fit(matrix)
+    indices, scores = lsh.search(
+        matrix[:40], 5, candidate_mask=candidate_mask, mask_groups=mask_groups
+    )
+    found = scores > 0
+    assert found.any()
+    assert np.all(candidate_mask[mask_groups[:, None], indices][found])
+
+
+def test_fit_signatures(matrix):
+    lsh = MinHashLSH(bands=8, rows=3).fit(matrix)
+    row_scales = np.linspace(1, 2, 300)
+    refitted = MinHashLSH(bands=8, rows=3).fit(
+        matrix, row_scales, signatures=lsh.signatures_
+    )
+    indices, scores = refitted.search(matrix[:10], 3)
+    products = (matrix[:10] @ matrix.T).toarray() * row_scales
+    found = scores > 0
+    assert found.any()
+    np.testing.assert_array_almost_equal(
+        np.take_along_axis(products, indices, axis=1)[found], scores[found]
+    )
+    with pytest.raises(ValueError):
+        MinHashLSH(bands=8, rows=2).fit(matrix, signatures=lsh.signatures_)
+
+
+def test_errors(matrix):
+    with pytest.raises(ValueError):
+        MinHashLSH(bands=0)
+    with pytest.raises(RuntimeError):
+        MinHashLSH().search(matrix, 5)
@@ -2,13 +2,14 @@ import numpy as np
 import pandas as pd
 import os.path as path
 import pytest
-from scipy.sparse import csc_matrix
+from scipy.sparse import csc_matrix, random as sparse_random
 from sklearn.feature_extraction.text import TfidfVectorizer
 from cleanco.termdata import terms_by_country, terms_by_type
 import functools
 import operator
 import re
 import name_matching.name_matcher as nm
+from name_matching.minhash_lsh import MinHashLSH
 from distances import (
     Indel,
     DiscountedLevenshtein,
@@ -52,18 +53,6 @@ def name_match():
     return name_matcher
 
 
-@pytest.fixture
-def original_name():
-    package_dir = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
-    return pd.read_csv(path.join(package_dir, "test", "test_names.csv"))
-
-
-@pytest.fixture
-def adjusted_name():
-    package_dir = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
-    return pd.read_csv(path.join(package_dir, "test", "adjusted_test_names.csv"))
-
-
 @pytest.fixture
 def words():
     return [
@@ -703,6 +692,46 @@ def test_rate_matches(number_of_matches, match_score, metrics, result):
     assert list(ind) == result
 
 
+@pytest.mark.parametrize(
+    "metrics",
+    [
+        ["weighted_jaccard"],
+        ["weighted_jaccard", "overlap", "bag"],
+        ["overlap", "ratcliff_obershelp", "editex"],
+    ],
+)
+def test_score_matches_batch(metrics):
+    name_match = nm.NameMatcher(verbose=False)
+    name_match.set_distance_metrics(metrics)
+    to_be_matched = np.array(["De Nederlandsche Bank", "Nederlandsche Bank"])
+    possible_matches = np.array(
+        [
+            ["Nederlandsche Bank", "De Nederlancsh Bank", "De Nederlandse Bank"],
+            ["De Nederlandsche Bank", "Bank de Nederlandsche", "Bank Nederland"],
+        ],
+        dtype=object,
+    )
+    match_score = name_match._score_matches_batch(to_be_matched, possible_matches)
+    assert match_score.shape == (2, 3, len(metrics))
+    for num in range(2):
+        np.testing.assert_array_almost_equal(
+            match_score[num],
+            name_match._score_matches(to_be_matched[num], possible_matches[num]),
+        )
+
+
+@pytest.mark.parametrize("number_of_matches", [1, 2, 3, 4])
+def test_rate_matches_batch(number_of_matches):
+    name_match = nm.NameMatcher()
+    name_match._number_of_matches = number_of_matches
+    name_match.set_distance_metrics(["weighted_jaccard", "overlap", "editex"])
+    match_score = np.random.default_rng(0).random((6, 5, 3))
+    ind = name_match._rate_matches_batch(match_score)
+    assert ind.shape == (6, number_of_matches)
+    for num in range(6):
+        assert list(ind[num]) == list(name_match._rate_matches(match_score[num]))
+
+
 def test_vectorise_data(name_match):
     name_match._vectorise_data(transform=False)
     assert len(name_match._vec.vocabulary_) > 0
@@ -814,6 +843,58 @@ def test_make_no_scoring_words(
     assert not new_word_set.issuperset(set([result_2]))
 
 
+@pytest.mark.parametrize(
+    "low_memory, common_words, ngrams", [(False, False, (2, 3)), (True, True, (1, 3))]
+)
+def test_save_and_load_index(
+    tmp_path, original_name, adjusted_name, low_memory, common_words, ngrams
+):
+    name_match = nm.NameMatcher(
+        top_n=10, common_words=common_words, ngrams=ngrams, verbose=False
+    )
+    name_match.load_and_process_master_data("company_name", original_name)
+    name_match.save_index(str(tmp_path / "index"))
+
+    loaded_match = nm.NameMatcher(top_n=10, low_memory=low_memory, verbose=False)
+    loaded_match.load_index(str(tmp_path / "index"))
+    assert loaded_match._word_set == name_match._word_set
+    assert loaded_match._vec.ngram_range == ngrams
+    np.testing.assert_array_almost_equal(
+        loaded_match._n_grams_matching.toarray(), name_match._n_grams_matching.toarray()
+    )
+    pd.testing.assert_frame_equal(
+        loaded_match.match_names(adjusted_name.iloc[:20].copy(), "company_name"),
+        name_match.match_names(adjusted_name.iloc[:20].copy(), "company_name"),
+    )
+
+
+@pytest.mark.parametrize(
+    "low_memory, n_jobs", [(False, 1), (True, 1), (False, 2), (True, 2)]
+)
+def test_load_index_memory_mapped(
+    tmp_path, original_name, adjusted_name, low_memory, n_jobs
+):
+    name_match = nm.NameMatcher(top_n=10, low_memory=low_memory, verbose=False)
+    name_match.load_and_process_master_data("company_name", original_name)
+    name_match.save_index(str(tmp_path / "index"))
+
+    mapped_match = nm.NameMatcher(
+        top_n=10, low_memory=low_memory, verbose=False, n_jobs=n_jobs
+    )
+    mapped_match.load_index(str(tmp_path / "index"), mmap_mode="r")
+    assert not mapped_match._n_grams_matching.data.flags.writeable
+    assert mapped_match._n_grams_matching.format == ("coo" if low_memory else "csc")
+    pd.testing.assert_frame_equal(
+        mapped_match.match_names(adjusted_name.iloc[:20].copy(), "company_name"),
+        name_match.match_names(adjusted_name.iloc[:20].copy(), "company_name"),
+    )
+
+
+def test_save_index_error(tmp_path, name_match):
+    with pytest.raises(RuntimeError):
+        name_match.save_index(str(tmp_path / "index"))
+
+
 def test_search_for_possible_matches_error(adjusted_name):
     name_matcher = nm.NameMatcher()
     with pytest.raises(RuntimeError):
@@ -841,8 +922,12 @@ def test_search_for_possible_matches(
     name_match._number_of_rows = number_of_rows
     name_match._top_n = top_n
     name_match._process_matching_data(True)
-    possible_match = name_match._search_for_possible_matches(adjusted_name)
+    possible_match, cosine_scores = name_match._search_for_possible_matches(
+        adjusted_name
+    )
     assert possible_match.shape[1] == top_n
+    assert cosine_scores.shape == possible_match.shape
+    assert np.all(np.diff(cosine_scores, axis=1) <= 0)
     assert np.max(possible_match) < len(adjusted_name)
     assert np.all(possible_match.astype(int) == possible_match)
     assert np.max(possible_match[44, :]) == result_1
@@ -933,6 +1018,21 @@ def test_fuzzy_matches(
     assert match["match_index_1"] in possible_matches
 
 
+@pytest.mark.parametrize("common_words, num_matches", [(False, 1), (True, 2)])
+def test_fuzzy_matches_batch(name_match, adjusted_name, common_words, num_matches):
+    name_match._column_matching = "company_name"
+    name_match._number_of_matches = num_matches
+    name_match._word_set = set(["and", "group"]) if common_words else set()
+    to_be_matched = adjusted_name.iloc[[3, 44, 144], :]
+    possible_matches = np.array([[29, 343, 3, 126], [44, 2, 0, 1], [144, 7, 8, 9]])
+    matches = name_match._fuzzy_matches_batch(possible_matches, to_be_matched)
+    assert list(matches.index) == [3, 44, 144]
+    for num, (idx, row) in enumerate(to_be_matched.iterrows()):
+        match = name_match.fuzzy_matches(possible_matches[num], row)
+        for col in matches.columns:
+            assert matches.loc[idx, col] == pytest.approx(match[col])
+
+
 def test_do_name_matching_split(name_match, adjusted_name):
     name_match._preprocess_split = True
     result = name_match.match_names(adjusted_name.iloc[44, :], "company_name")
@@ -978,6 +1078,166 @@ def test_do_name_matching_switch_index(
     assert result.loc[old_index, "match_index"] == match_result
 
 
+@pytest.mark.parametrize(
+    "low_memory, preprocess_split, number_of_rows",
+    [(False, False, 5000), (True, False, 5000), (False, True, 7)],
+)
+def test_do_name_matching_n_jobs(
+    original_name, adjusted_name, low_memory, preprocess_split, number_of_rows
+):
+    results = []
+    for n_jobs in [1, 2]:
+        name_match = nm.NameMatcher(
+            top_n=10,
+            low_memory=low_memory,
+            preprocess_split=preprocess_split,
+            number_of_rows=number_of_rows,
+            verbose=False,
+            n_jobs=n_jobs,
+        )
+        name_match.load_and_process_master_data("company_name", original_name)
+        results.append(
+            name_match.match_names(adjusted_name.iloc[:30].copy(), "company_name")
+        )
+    pd.testing.assert_frame_equal(results[0], results[1])
+
+
+@pytest.mark.parametrize("low_memory, n_jobs", [(False, 1), (True, 1), (False, 2)])
+def test_do_name_matching_min_cosine(original_name, adjusted_name, low_memory, n_jobs):
+    to_be_matched = adjusted_name.iloc[:30].copy()
+    to_be_matched.loc[30, "company_name"] = "Xqzv Wkyj"
+    name_match = nm.NameMatcher(
+        top_n=10,
+        low_memory=low_memory,
+        verbose=False,
+        n_jobs=n_jobs,
+        min_cosine=0.5,
+        return_cosine_score=True,
+    )
+    name_match.load_and_process_master_data("company_name", original_name)
+    result = name_match.match_names(to_be_matched, "company_name")
+    unmatched = result["match_index"].isna()
+    assert unmatched[30]
+    assert np.all(result.loc[unmatched, "score"] == 0)
+    assert result.loc[unmatched, "match_name"].isna().all()
+    assert np.all(result.loc[~unmatched, "cosine_score"] >= 0.5)
+    assert np.all(result["cosine_score"] <= 1)
+    assert np.all(name_match._cosine_scores[name_match._cosine_scores > 0] >= 0.5)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_do_name_matching_exact_match(original_name, adjusted_name, n_jobs):
+    to_be_matched = pd.concat(
+        [adjusted_name.iloc[:20], original_name.iloc[[5, 300, 7]]]
+    ).reset_index(drop=True)
+    results = []
+    for exact_match in [True, False]:
+        name_match = nm.NameMatcher(
+            top_n=10, verbose=False, n_jobs=n_jobs, exact_match=exact_match
+        )
+        name_match.load_and_process_master_data("company_name", original_name)
+        results.append(name_match.match_names(to_be_matched.copy(), "company_name"))
+    pd.testing.assert_frame_equal(results[0], results[1], check_dtype=False)
+    assert list(results[0]["match_index"].iloc[-3:]) == [5, 300, 7]
+    assert np.all(results[0]["score"].iloc[-3:] == 100)
+
+
+def test_search_for_exact_matches(original_name):
+    name_match = nm.NameMatcher(verbose=False)
+    name_match.load_and_process_master_data("company_name", original_name)
+    name_match._column_matching = "company_name"
+    to_be_matched = name_match.preprocess(
+        pd.DataFrame({"company_name": [original_name["company_name"][8], "a b c", ""]}),
+        "company_name",
+    )
+    np.testing.assert_array_equal(
+        name_match._search_for_exact_matches(to_be_matched), [8, -1, -1]
+    )
+    name_match._number_of_matches = 2
+    np.testing.assert_array_equal(
+        name_match._search_for_exact_matches(to_be_matched), [-1, -1, -1]
+    )
+
+
+def test_do_name_matching_score_cache(original_name, adjusted_name):
+    to_be_matched = adjusted_name.iloc[:20]
+    name_match = nm.NameMatcher(top_n=10, verbose=False, score_cache_size=10000)
+    name_match.load_and_process_master_data("company_name", original_name)
+    result = name_match.match_names(to_be_matched.copy(), "company_name")
+    info = name_match.score_cache_info()
+    assert info.hits == 0
+    assert info.misses == info.currsize
+    pd.testing.assert_frame_equal(
+        name_match.match_names(to_be_matched.copy(), "company_name"), result
+    )
+    assert name_match.score_cache_info().hits == info.misses
+    name_match.set_distance_metrics(["overlap", "editex"])
+    assert name_match.score_cache_info().currsize == 0
+
+
+def test_score_pairs_duplicates(name_match):
+    names = np.array(["fun", "fun", "pool", "fun"], dtype=object)
+    possible_names = np.array(["fun inc", "fun inc", "sign", "pool"], dtype=object)
+    pair_score = name_match._score_pairs(names, possible_names, False)
+    assert pair_score.shape == (4, name_match._num_distance_metrics)
+    np.testing.assert_array_equal(pair_score[0], pair_score[1])
+    for num in range(4):
+        np.testing.assert_array_almost_equal(
+            pair_score[num],
+            name_match._score_matches(names[num], [possible_names[num]])[0],
+        )
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_match_names_iter(original_name, adjusted_name, n_jobs):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, n_jobs=n_jobs)
+    name_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = adjusted_name.iloc[:30]
+    chunks = [to_be_matched.iloc[start : start + 8].copy() for start in range(0, 30, 8)]
+    results = list(name_match.match_names_iter(chunks, "company_name"))
+    assert len(results) == 4
+    pd.testing.assert_frame_equal(
+        pd.concat(results),
+        name_match.match_names(to_be_matched.copy(), "company_name"),
+    )
+
+
+@pytest.mark.parametrize("extension", ["csv", "jsonl", "parquet"])
+def test_match_file(tmp_path, original_name, adjusted_name, extension):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    to_be_matched = adjusted_name.iloc[:25].reset_index(drop=True)
+    path_in = str(tmp_path / "to_be_matched.csv")
+    to_be_matched.to_csv(path_in, index=False)
+    path_out = str(tmp_path / f"matches.{extension}")
+
+    name_match = nm.NameMatcher(top_n=10, verbose=False, row_numbers=True)
+    name_match.load_and_process_master_data("company_name", original_name)
+    assert name_match.match_file(path_in, path_out, "company_name", chunksize=10) == 25
+
+    if extension == "csv":
+        result = pd.read_csv(path_out, index_col=0)
+    elif extension == "jsonl":
+        result = pd.read_json(path_out, lines=True).set_index("index")
+        result.index.name = None
+    else:
+        result = pd.read_parquet(path_out)
+    pd.testing.assert_frame_equal(
+        result,
+        name_match.match_names(to_be_matched.copy(), "company_name"),
+        check_dtype=False,
+        check_index_type=False,
+    )
+
+
+def test_match_file_error(tmp_path, name_match):
+    name_match._return_algorithms_score = True
+    with pytest.raises(ValueError):
+        name_match.match_file(
+            str(tmp_path / "in.csv"), str(tmp_path / "out.csv"), "company_name"
+        )
+
+
 def test_do_name_matching_error(adjusted_name):
     name_match = nm.NameMatcher()
     with pytest.raises(ValueError):
@@ -1216,3 +1476,759 @@ def test_process_legal_words(word_set, preprocess, result_1, result_2, result_3)
     number_of_words = number_of_words_in_legal_list(preprocess)
     assert (result_2 in words) == result_3
     assert len(words) == number_of_words + result_1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"low_memory": True},
+        {"number_of_matches": 3},
+        {"min_cosine": 0.5},
+        {"legal_suffixes": True, "common_words": True},
+        {"preprocess_split": True},
+        {"row_numbers": True},
+        {"exact_match": False},
+    ],
+)
+def test_match_one(original_name, adjusted_name, kwargs):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, **kwargs)
+    name_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = adjusted_name.iloc[:40]
+    result = name_match.match_names(to_be_matched.copy(), "company_name")
+    for num, name in enumerate(to_be_matched["company_name"]):
+        matches = name_match.match_one(name)
+        expected = result.iloc[num]
+        if name_match._number_of_matches == 1:
+            if pd.isna(expected["match_index"]):
+                assert matches == ()
+                continue
+            expected = expected.rename(
+                {
+                    "match_name": "match_name_0",
+                    "score": "score_0",
+                    "match_index": "match_index_0",
+                }
+            )
+        assert len(matches) == name_match._number_of_matches
+        for rank, match in enumerate(matches):
+            assert match.match_name == expected[f"match_name_{rank}"]
+            assert match.score == pytest.approx(expected[f"score_{rank}"])
+            assert match.match_index == expected[f"match_index_{rank}"]
+
+
+def test_match_one_scores(original_name):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, return_cosine_score=True)
+    name_match.load_and_process_master_data("company_name", original_name)
+    name = original_name["company_name"].iloc[3]
+    result = name_match.match_names(
+        pd.DataFrame({"company_name": [name + "x"]}), "company_name"
+    )
+    match = name_match.match_one(name + "x")[0]
+    assert match.cosine_score == pytest.approx(result["cosine_score"].iloc[0])
+    match = name_match.match_one(name.upper())[0]
+    assert match == nm.Match(
+        name_match._df_matching_data["company_name"].iloc[3],
+        100.0,
+        original_name.index[3],
+        1.0,
+    )
+
+
+def test_match_one_error():
+    name_match = nm.NameMatcher()
+    with pytest.raises(ValueError):
+        name_match.match_one("company")
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"number_of_matches": 2},
+        {"min_cosine": 0.5},
+        {"row_numbers": True},
+        {"return_cosine_score": True},
+    ],
+)
+def test_match_batch(original_name, adjusted_name, kwargs):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, **kwargs)
+    data = original_name.set_axis(pd.Index(original_name.index.values + 1000))
+    name_match.load_and_process_master_data("company_name", data)
+    names = adjusted_name["company_name"].iloc[:10].tolist()
+    # an exact match and a name without possible matches
+    names = names + [original_name["company_name"].iloc[5], "qqqq"]
+    assert name_match.match_batch([]) == []
+    for matches, name in zip(name_match.match_batch(names), names):
+        expected = name_match.match_one(name)
+        assert len(matches) == len(expected)
+        for match, expected_match in zip(matches, expected):
+            assert match[:3] == expected_match[:3]
+            assert match.cosine_score == pytest.approx(expected_match.cosine_score)
+
+
+def test_match_batch_algorithms_score(original_name, adjusted_name):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, return_algorithms_score=True)
+    name_match.load_and_process_master_data("company_name", original_name)
+    scores = name_match.match_batch(adjusted_name["company_name"].iloc[:10])
+    assert len(scores) == 10
+    assert scores[0].shape == (10, 5)
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_add_master_rows(original_name, low_memory):
+    name_match = nm.NameMatcher(
+        top_n=10, verbose=False, low_memory=low_memory, refit_fraction=None
+    )
+    name_match.load_and_process_master_data(
+        "company_name", original_name.iloc[:300].copy()
+    )
+    name_match._to_cosine_similarity(np.zeros((1, 1), dtype=int), np.zeros((1, 1)))
+    name_match.add_master_rows(original_name.iloc[300:])
+
+    names = name_match.preprocess(original_name.copy(), "company_name")
+    expected = name_match._vec.transform(names["company_name"])
+    expected = name_match._normalise_ngram_rows(expected)
+    assert name_match._n_grams_matching.format == ("coo" if low_memory else "csc")
+    np.testing.assert_allclose(
+        name_match._n_grams_matching.toarray(), expected.toarray()
+    )
+    np.testing.assert_allclose(
+        name_match._n_grams_norms, np.sqrt(expected.multiply(expected).sum(axis=1)).A1
+    )
+    pd.testing.assert_index_equal(name_match._original_index, original_name.index)
+
+    result = name_match.match_names(original_name.iloc[300:310].copy(), "company_name")
+    assert (result["match_index"] == original_name.index[300:310]).all()
+    assert (result["score"] == 100).all()
+    match = name_match.match_one(original_name["company_name"].iloc[400] + "x")
+    assert match[0].match_index == original_name.index[400]
+
+
+def test_add_master_rows_labels(original_name):
+    name_match = nm.NameMatcher(top_n=10, verbose=False)
+    name_match.load_and_process_master_data(
+        "company_name", original_name.iloc[:500].copy()
+    )
+    new_rows = pd.DataFrame({"company_name": ["zyxwv holdings", "qwerty trading"]})
+    # the labels of a default index are already used by the matching data
+    with pytest.raises(ValueError):
+        name_match.add_master_rows(new_rows)
+    name_match.add_master_rows(new_rows.set_axis([700, 701]))
+    assert name_match._original_index[-2:].tolist() == [700, 701]
+    assert name_match.match_one("zyxwv holdings")[0].match_index == 700
+
+    name_match.remove_master_rows([0])
+    assert np.flatnonzero(name_match._removed).tolist() == [0]
+    assert name_match.match_one("zyxwv holdings")[0].match_index == 700
+    # a removed row keeps its label until the matching data is compacted
+    with pytest.raises(ValueError):
+        name_match.add_master_rows(new_rows.iloc[:1])
+
+    name_match.compact_master_data()
+    name_match.add_master_rows(new_rows.set_axis([0, 702]))
+    assert name_match._original_index.is_unique
+    assert name_match._original_index[-2:].tolist() == [0, 702]
+    with pytest.raises(ValueError):
+        name_match.add_master_rows(new_rows.set_axis([1, 703]))
+    assert name_match.match_one("qwerty trading")[0].match_index == 701
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_remove_master_rows(original_name, adjusted_name, low_memory):
+    name_match = nm.NameMatcher(
+        top_n=10, verbose=False, low_memory=low_memory, refit_fraction=None
+    )
+    data = pd.concat([original_name.iloc[:5], original_name]).reset_index(drop=True)
+    name_match.load_and_process_master_data("company_name", data)
+    to_be_matched = adjusted_name.iloc[:40].copy()
+    before = name_match.match_names(to_be_matched.copy(), "company_name")
+
+    removed = [0, 1] + before["match_index"].iloc[:20].tolist()
+    name_match.remove_master_rows(removed)
+    after = name_match.match_names(to_be_matched.copy(), "company_name")
+    assert not after["match_index"].isin(removed).any()
+    pd.testing.assert_frame_equal(before.iloc[20:], after.iloc[20:])
+    for name in to_be_matched["company_name"].iloc[:20]:
+        assert name_match.match_one(name)[0].match_index not in removed
+
+    # the duplicates of the removed rows are matched exactly
+    result = name_match.match_names(data.iloc[[0, 1]].copy(), "company_name")
+    assert result["match_index"].tolist() == [5, 6]
+
+    name_match.compact_master_data(refit=False)
+    assert len(name_match._df_matching_data) == len(data) - len(set(removed))
+    pd.testing.assert_frame_equal(
+        name_match.match_names(to_be_matched.copy(), "company_name"), after
+    )
+
+    name_match.compact_master_data()
+    fresh_match = nm.NameMatcher(top_n=10, verbose=False, low_memory=low_memory)
+    fresh_match.load_and_process_master_data(
+        "company_name", data.drop(index=removed)
+    )
+    pd.testing.assert_frame_equal(
+        name_match.match_names(to_be_matched.copy(), "company_name"),
+        fresh_match.match_names(to_be_matched.copy(), "company_name"),
+    )
+
+
+def test_master_rows_refit(original_name, adjusted_name):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, refit_fraction=0.1)
+    name_match.load_and_process_master_data(
+        "company_name", original_name.iloc[:400].copy()
+    )
+    name_match.add_master_rows(original_name.iloc[400:420])
+    assert name_match._rows_changed == 20
+    name_match.add_master_rows(original_name.iloc[420:])
+    assert name_match._rows_changed == 0
+    assert name_match._rows_fitted == len(original_name)
+
+    fresh_match = nm.NameMatcher(top_n=10, verbose=False)
+    fresh_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = adjusted_name.iloc[:40]
+    pd.testing.assert_frame_equal(
+        name_match.match_names(to_be_matched.copy(), "company_name"),
+        fresh_match.match_names(to_be_matched.copy(), "company_name"),
+    )
+
+
+def test_master_rows_save_index(tmp_path, original_name, adjusted_name):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, refit_fraction=None)
+    name_match.load_and_process_master_data("company_name", original_name)
+    name_match.remove_master_rows(original_name.index[:50])
+    name_match.save_index(str(tmp_path))
+
+    loaded_match = nm.NameMatcher(top_n=10, verbose=False, refit_fraction=None)
+    loaded_match.load_index(str(tmp_path), mmap_mode="r")
+    np.testing.assert_array_equal(loaded_match._removed, name_match._removed)
+    to_be_matched = adjusted_name.iloc[:40]
+    pd.testing.assert_frame_equal(
+        loaded_match.match_names(to_be_matched.copy(), "company_name"),
+        name_match.match_names(to_be_matched.copy(), "company_name"),
+    )
+    loaded_match.remove_master_rows(original_name.index[50:60])
+    assert loaded_match._mmap_index_path is None
+    assert loaded_match._n_grams_matching.data.flags.writeable
+
+
+def test_master_rows_errors(original_name):
+    name_match = nm.NameMatcher(verbose=False)
+    with pytest.raises(RuntimeError):
+        name_match.add_master_rows(original_name)
+    name_match.load_and_process_master_data("company_name", original_name)
+    with pytest.raises(ValueError):
+        name_match.add_master_rows(original_name.rename(columns={"company_name": "a"}))
+    with pytest.raises(KeyError):
+        name_match.remove_master_rows([10**6])
+
+    data = original_name.set_axis(pd.Index(original_name.index.values + 1000))
+    name_match.load_and_process_master_data("company_name", data)
+    for labels in [[1000, 5], [5, 5]]:
+        with pytest.raises(ValueError):
+            name_match.add_master_rows(original_name.iloc[:2].set_axis(labels))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"low_memory": True}, {"preprocess_split": True}, {"n_jobs": 2}],
+)
+def test_match_names_candidate_mask(original_name, adjusted_name, kwargs):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, **kwargs)
+    name_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = pd.concat([adjusted_name.iloc[:30], original_name.iloc[[1, 2]]])
+    expected = name_match.match_names(to_be_matched.copy(), "company_name")
+    result = name_match.match_names(
+        to_be_matched.copy(),
+        "company_name",
+        candidate_mask=np.ones(len(original_name), dtype=bool),
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+    candidate_mask = original_name.index % 2 == 0
+    result = name_match.match_names(
+        to_be_matched.copy(), "company_name", candidate_mask=candidate_mask
+    )
+    assert (result["match_index"] % 2 == 0).all()
+    # the exact match of an odd row is not allowed
+    assert result["score"].iloc[-2] < 100
+    assert result["score"].iloc[-1] == 100
+    assert result["match_index"].notna().all()
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_match_names_candidate_mask_groups(original_name, adjusted_name, n_jobs):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, n_jobs=n_jobs)
+    name_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = adjusted_name.iloc[:30].copy()
+    to_be_matched["group"] = to_be_matched.index % 3
+    candidate_mask = {
+        0: original_name.index % 3 == 0,
+        1: original_name.index % 3 == 1,
+        5: original_name.index % 3 == 2,
+        6: original_name.index % 3 == 2,
+    }
+    result = name_match.match_names(
+        to_be_matched,
+        "company_name",
+        candidate_mask=candidate_mask,
+        candidate_group_column="group",
+    )
+    groups = to_be_matched["group"]
+    assert (result["match_index"][groups < 2] % 3 == groups[groups < 2]).all()
+    assert result["match_index"][groups == 2].isna().all()
+    assert (result["score"][groups == 2] == 0).all()
+    # only the masks of the groups which occur are stacked, next to the empty mask
+    assert name_match._candidate_mask.shape == (3, len(original_name))
+
+    with pytest.raises(ValueError):
+        name_match.match_names(
+            to_be_matched, "company_name", candidate_mask=candidate_mask
+        )
+    with pytest.raises(ValueError):
+        name_match.match_names(
+            to_be_matched, "company_name", candidate_mask=np.ones(5, dtype=bool)
+        )
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_ngram_encoder_hashing(tmp_path, original_name, adjusted_name, low_memory):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, low_memory=low_memory)
+    name_match.load_and_process_master_data("company_name", original_name)
+    hashing_match = nm.NameMatcher(
+        top_n=10, verbose=False, low_memory=low_memory, ngram_encoder="hashing"
+    )
+    hashing_match.load_and_process_master_data("company_name", original_name)
+    assert hashing_match._n_grams_matching.dtype == np.float32
+
+    to_be_matched = adjusted_name.iloc[:50]
+    expected = name_match.match_names(to_be_matched.copy(), "company_name")
+    result = hashing_match.match_names(to_be_matched.copy(), "company_name")
+    assert (result["match_index"] == expected["match_index"]).mean() > 0.95
+
+    hashing_match.save_index(str(tmp_path))
+    loaded_match = nm.NameMatcher(top_n=10, verbose=False, low_memory=low_memory)
+    loaded_match.load_index(str(tmp_path))
+    assert loaded_match._vec.n_features == hashing_match._vec.n_features
+    pd.testing.assert_frame_equal(
+        loaded_match.match_names(to_be_matched.copy(), "company_name"), result
+    )
+
+
+def test_ngram_encoder_custom(tmp_path, original_name, adjusted_name):
+    encoder = TfidfVectorizer(lowercase=False, analyzer="char_wb", ngram_range=(2, 4))
+    name_match = nm.NameMatcher(top_n=10, verbose=False, ngram_encoder=encoder)
+    name_match.load_and_process_master_data("company_name", original_name)
+    assert name_match._vec is encoder
+    assert len(encoder.vocabulary_) > 0
+
+    to_be_matched = adjusted_name.iloc[:20]
+    result = name_match.match_names(to_be_matched.copy(), "company_name")
+    name_match.save_index(str(tmp_path))
+    loaded_match = nm.NameMatcher(top_n=10, verbose=False)
+    loaded_match.load_index(str(tmp_path))
+    assert loaded_match._vec.analyzer == "char_wb"
+    pd.testing.assert_frame_equal(
+        loaded_match.match_names(to_be_matched.copy(), "company_name"), result
+    )
+
+
+@pytest.mark.parametrize("sparse_format", ["csc", "coo", "csr", "lil"])
+def test_row_norms(monkeypatch, sparse_format):
+    monkeypatch.setattr(nm, "_NORMS_BLOCK_SIZE", 7)
+    ngrams = sparse_random(30, 20, density=0.2, format="csc", random_state=3)
+    ngrams.data = np.rint(ngrams.data * 255).astype(np.uint8)
+    scales = np.linspace(0.5, 1, 30)
+    expected = np.sqrt((ngrams.toarray().astype(np.float64) ** 2).sum(axis=1)) * scales
+    np.testing.assert_allclose(
+        nm.NameMatcher._row_norms(ngrams.asformat(sparse_format), scales), expected
+    )
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+@pytest.mark.parametrize("index_dtype", ["float32", "uint16", "uint8"])
+def test_index_dtype(tmp_path, original_name, adjusted_name, index_dtype, low_memory):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, low_memory=low_memory)
+    name_match.load_and_process_master_data("company_name", original_name.iloc[:-20])
+    typed_match = nm.NameMatcher(
+        top_n=10, verbose=False, low_memory=low_memory, index_dtype=index_dtype
+    )
+    typed_match.load_and_process_master_data("company_name", original_name.iloc[:-20])
+    assert typed_match._n_grams_matching.dtype == np.dtype(index_dtype)
+    assert (typed_match._n_grams_scales is None) == (index_dtype == "float32")
+    np.testing.assert_allclose(
+        typed_match._master_norms(), name_match._master_norms(), rtol=0.01
+    )
+
+    to_be_matched = adjusted_name.iloc[:50]
+    expected = name_match.match_names(to_be_matched.copy(), "company_name")
+    result = typed_match.match_names(to_be_matched.copy(), "company_name")
+    assert (result["match_index"] == expected["match_index"]).mean() > 0.95
+    assert (typed_match._possible_matches == name_match._possible_matches).mean() > 0.9
+
+    typed_match.add_master_rows(original_name.iloc[-20:])
+    assert len(typed_match._master_norms()) == len(original_name)
+    if typed_match._n_grams_scales is not None:
+        assert len(typed_match._n_grams_scales) == len(original_name)
+    result = typed_match.match_names(to_be_matched.copy(), "company_name")
+    typed_match.save_index(str(tmp_path))
+    loaded_match = nm.NameMatcher(top_n=10, verbose=False, low_memory=low_memory)
+    loaded_match.load_index(str(tmp_path))
+    assert loaded_match._n_grams_matching.dtype == np.dtype(index_dtype)
+    pd.testing.assert_frame_equal(
+        loaded_match.match_names(to_be_matched.copy(), "company_name"), result
+    )
+
+
+def test_index_dtype_error():
+    with pytest.raises(ValueError):
+        nm.NameMatcher(index_dtype="int8")
+
+
+@pytest.mark.parametrize(
+    "ngram_max_df, ngram_top_k", [(0.05, None), (20, None), (None, 8), (0.05, 10)]
+)
+def test_ngram_pruning(
+    tmp_path, original_name, adjusted_name, ngram_max_df, ngram_top_k
+):
+    name_match = nm.NameMatcher(
+        top_n=10, verbose=False, ngram_max_df=ngram_max_df, ngram_top_k=ngram_top_k
+    )
+    name_match.load_and_process_master_data("company_name", original_name.iloc[:-20])
+    ngrams = name_match._n_grams_matching.tocsr()
+    lengths = np.diff(ngrams.indptr)
+    assert lengths.min() > 0
+    if ngram_top_k is not None:
+        assert lengths.max() <= ngram_top_k
+    if ngram_max_df is not None:
+        pruned = name_match._pruned_ngrams
+        assert pruned.any()
+        # only names of which all the n-grams are frequent keep frequent n-grams
+        frequent = pruned[ngrams.indices]
+        rows = np.repeat(np.arange(ngrams.shape[0]), lengths)
+        kept_frequent = np.bincount(rows[frequent], minlength=len(lengths))
+        kept_rare = np.bincount(rows[~frequent], minlength=len(lengths))
+        assert np.all(kept_frequent[kept_rare > 0] == 0)
+
+    report = name_match.candidate_recall_report(adjusted_name, "company_name")
+    assert report.index.tolist() == ["full", "pruned"]
+    assert report.loc["pruned", "ngrams"] < report.loc["full", "ngrams"]
+    assert report.loc["full", "recall"] > 0.95
+    assert report.loc["pruned", "recall_loss"] < 0.05
+
+    name_match.add_master_rows(original_name.iloc[-20:])
+    added = name_match._n_grams_matching.tocsr()[-20:]
+    if ngram_top_k is not None:
+        assert np.diff(added.indptr).max() <= ngram_top_k
+    to_be_matched = adjusted_name.iloc[:20]
+    result = name_match.match_names(to_be_matched.copy(), "company_name")
+    name_match.save_index(str(tmp_path))
+    loaded_match = nm.NameMatcher(top_n=10, verbose=False)
+    loaded_match.load_index(str(tmp_path))
+    assert loaded_match._ngram_top_k == ngram_top_k
+    assert (loaded_match._pruned_ngrams is None) == (ngram_max_df is None)
+    pd.testing.assert_frame_equal(
+        loaded_match.match_names(to_be_matched.copy(), "company_name"), result
+    )
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"ngram_max_df": 1.5}, {"ngram_max_df": 0}, {"ngram_top_k": 0}]
+)
+def test_ngram_pruning_error(kwargs):
+    with pytest.raises(ValueError):
+        nm.NameMatcher(**kwargs)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"low_memory": True}, {"index_dtype": "uint8"}, {"n_jobs": 2}],
+)
+def test_candidate_generator(original_name, adjusted_name, kwargs):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, **kwargs)
+    name_match.load_and_process_master_data("company_name", original_name.iloc[:-20])
+    index_match = nm.NameMatcher(
+        top_n=10, verbose=False, candidate_generator="inverted_index", **kwargs
+    )
+    index_match.load_and_process_master_data("company_name", original_name.iloc[:-20])
+
+    to_be_matched = adjusted_name.iloc[:50]
+    expected = name_match.match_names(to_be_matched.copy(), "company_name")
+    result = index_match.match_names(to_be_matched.copy(), "company_name")
+    pd.testing.assert_frame_equal(result, expected)
+    np.testing.assert_allclose(
+        np.sort(index_match._possible_matches, axis=1),
+        np.sort(name_match._possible_matches, axis=1),
+    )
+    matches = index_match.match_one("Ahmed Alsaeed Co")
+    expected_matches = name_match.match_one("Ahmed Alsaeed Co")
+    assert [match[:3] for match in matches] == [
+        match[:3] for match in expected_matches
+    ]
+
+    candidate_mask = original_name.index[:-20] % 2 == 0
+    result = index_match.match_names(
+        to_be_matched.copy(), "company_name", candidate_mask=candidate_mask
+    )
+    assert (result["match_index"] % 2 == 0).all()
+
+    # the inverted index is rebuilt after a change of the matching data
+    for matcher in (name_match, index_match):
+        matcher.add_master_rows(original_name.iloc[-20:])
+        matcher.remove_master_rows(original_name.index[:5])
+    pd.testing.assert_frame_equal(
+        index_match.match_names(to_be_matched.copy(), "company_name"),
+        name_match.match_names(to_be_matched.copy(), "company_name"),
+    )
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_candidate_generator_minhash_lsh(
+    tmp_path, original_name, adjusted_name, low_memory
+):
+    name_match = nm.NameMatcher(top_n=10, verbose=False, low_memory=low_memory)
+    name_match.load_and_process_master_data("company_name", original_name.iloc[:-20])
+    generator = MinHashLSH(bands=32, rows=3)
+    lsh_match = nm.NameMatcher(
+        top_n=10,
+        verbose=False,
+        low_memory=low_memory,
+        candidate_generator=generator,
+    )
+    lsh_match.load_and_process_master_data("company_name", original_name.iloc[:-20])
+
+    to_be_matched = adjusted_name.iloc[:100]
+    expected = name_match.match_names(to_be_matched.copy(), "company_name")
+    result = lsh_match.match_names(to_be_matched.copy(), "company_name")
+    assert (result["match_index"] == expected["match_index"]).mean() > 0.95
+    # a copy of the generator is fitted
+    assert generator.signatures_ is None
+    assert lsh_match._lsh_signatures.shape == (len(original_name) - 20, 96)
+
+    lsh_match.add_master_rows(original_name.iloc[-20:])
+    assert len(lsh_match._lsh_signatures) == len(original_name)
+    result = lsh_match.match_names(to_be_matched.copy(), "company_name")
+    lsh_match.save_index(str(tmp_path))
+    loaded_match = nm.NameMatcher(
+        top_n=10, verbose=False, low_memory=low_memory, candidate_generator=generator
+    )
+    loaded_match.load_index(str(tmp_path))
+    np.testing.assert_array_equal(
+        loaded_match._lsh_signatures, lsh_match._lsh_signatures
+    )
+    pd.testing.assert_frame_equal(
+        loaded_match.match_names(to_be_matched.copy(), "company_name"), result
+    )
+    # the signatures are only used for the same bands, rows and seed
+    other_match = nm.NameMatcher(candidate_generator="minhash_lsh", verbose=False)
+    other_match.load_index(str(tmp_path))
+    assert other_match._lsh_signatures is None
+
+
+@pytest.mark.parametrize(
+    "candidate_generator, error", [("wand", ValueError), (object(), TypeError)]
+)
+def test_candidate_generator_error(candidate_generator, error):
+    with pytest.raises(error):
+        nm.NameMatcher(candidate_generator=candidate_generator)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"low_memory": True}, {"index_dtype": "uint8"}])
+def test_similarity_join(original_name, adjusted_name, kwargs):
+    name_match = nm.NameMatcher(top_n=500, verbose=False, **kwargs)
+    name_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = adjusted_name.iloc[:60]
+    pairs = name_match.similarity_join(to_be_matched, "company_name", 0.5, "csr")
+    possible_matches, cosine_scores = name_match._search_for_possible_matches(
+        name_match.preprocess(to_be_matched.copy(), "company_name")
+    )
+    expected = np.zeros((60, len(original_name)))
+    found = cosine_scores > 0
+    expected[np.nonzero(found)[0], possible_matches[found]] = cosine_scores[found]
+    expected[expected < 0.5] = 0
+
+    assert pairs.shape == (60, len(original_name))
+    np.testing.assert_array_almost_equal(pairs.toarray(), expected)
+
+    table = name_match.similarity_join(to_be_matched, "company_name", 0.5)
+    assert list(table.columns) == [
+        "original_index",
+        "original_name",
+        "match_name",
+        "match_index",
+        "cosine_score",
+    ]
+    assert len(table) == pairs.nnz
+    assert (table["original_index"].diff().dropna() >= 0).all()
+    np.testing.assert_array_almost_equal(
+        table["cosine_score"],
+        expected[table["original_index"].values, table["match_index"].values],
+    )
+    assert (
+        table["match_name"].values
+        == name_match._df_matching_data["company_name"].values[table["match_index"]]
+    ).all()
+
+
+def test_similarity_join_rows(original_name, adjusted_name):
+    name_match = nm.NameMatcher(verbose=False)
+    name_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = adjusted_name.iloc[:60]
+    pairs = name_match.similarity_join(to_be_matched, "company_name", 0.4, "csr")
+
+    view = name_match._master_slice(100, 300)
+    view_pairs = view.similarity_join(to_be_matched, "company_name", 0.4, "csr")
+    expected = pairs.toarray()
+    expected[:, :100] = 0
+    expected[:, 300:] = 0
+    np.testing.assert_array_almost_equal(view_pairs.toarray(), expected)
+
+    name_match.remove_master_rows(original_name.index[:50])
+    removed_pairs = name_match.similarity_join(
+        to_be_matched, "company_name", 0.4, "csr"
+    )
+    expected = pairs.toarray()
+    expected[:, :50] = 0
+    np.testing.assert_array_almost_equal(removed_pairs.toarray(), expected)
+
+
+def test_similarity_join_error(original_name):
+    name_match = nm.NameMatcher(verbose=False)
+    with pytest.raises(ValueError):
+        name_match.similarity_join(original_name, "company_name")
+    name_match.load_and_process_master_data("company_name", original_name)
+    with pytest.raises(ValueError):
+        name_match.similarity_join(original_name, "company_name", output="coo")
+    with pytest.raises(ValueError):
+        name_match.similarity_join(original_name, "company_name", min_cosine=0)
+
+
+def test_deduplicate(original_name, adjusted_name):
+    df = pd.concat([original_name.iloc[:100], adjusted_name.iloc[:100]])
+    df.index = np.arange(300, 500)
+    unchanged = df.copy()
+    name_match = nm.NameMatcher(verbose=False)
+    result = name_match.deduplicate(df, "company_name", 0.6)
+    pd.testing.assert_frame_equal(df, unchanged)
+    assert list(result.columns) == list(df.columns) + ["cluster_id"]
+    pd.testing.assert_frame_equal(result[df.columns], df)
+    assert result["cluster_id"].iloc[0] == 0
+    assert (result["cluster_id"].cummax().diff().dropna() <= 1).all()
+
+    join_match = nm.NameMatcher(verbose=False)
+    join_match.load_and_process_master_data("company_name", df.copy())
+    pairs = join_match.similarity_join(df.copy(), "company_name", 0.6, "csr")
+    pairs = pairs.toarray()
+    np.fill_diagonal(pairs, 0)
+    clusters = result["cluster_id"].values
+    rows, matches = np.nonzero(pairs)
+    assert (clusters[rows] == clusters[matches]).all()
+    # a name which is not paired with another name is a cluster of its own
+    paired = (pairs > 0).any(axis=1)
+    assert not pd.Series(clusters[~paired]).duplicated().any()
+    assert not np.isin(clusters[~paired], clusters[paired]).any()
+    # the adjusted names are in the same cluster as the original names
+    assert (clusters[:100] == clusters[100:]).mean() > 0.8
+
+
+def test_deduplicate_keeps_master(original_name, adjusted_name):
+    name_match = nm.NameMatcher(top_n=10, verbose=False)
+    name_match.load_and_process_master_data("company_name", original_name)
+    to_be_matched = adjusted_name.iloc[:30]
+    expected = name_match.match_names(to_be_matched.copy(), "company_name")
+    master_data = name_match._df_matching_data
+    vocabulary = dict(name_match._vec.vocabulary_)
+    n_grams = name_match._n_grams_matching
+
+    df = pd.DataFrame({"company_name": ["Zeta Corp", "alpha bv", "zeta corp."]})
+    result = name_match.deduplicate(df, "company_name")
+    assert df["company_name"].tolist() == ["Zeta Corp", "alpha bv", "zeta corp."]
+    assert result["company_name"].tolist() == df["company_name"].tolist()
+    assert result["cluster_id"].tolist() == [0, 1, 0]
+
+    assert name_match._df_matching_data is master_data
+    assert name_match._n_grams_matching is n_grams
+    assert name_match._vec.vocabulary_ == vocabulary
+    pd.testing.assert_frame_equal(
+        name_match.match_names(to_be_matched.copy(), "company_name"), expected
+    )
+
+
+@pytest.mark.parametrize("number_of_matches", [1, 3])
+def test_cascade(original_name, adjusted_name, number_of_matches):
+    kwargs = {"top_n": 30, "verbose": False, "number_of_matches": number_of_matches}
+    to_be_matched = adjusted_name.iloc[:100]
+    name_match = nm.NameMatcher(**kwargs)
+    name_match.load_and_process_master_data("company_name", original_name)
+    expected = name_match.match_names(to_be_matched.copy(), "company_name")
+
+    # a stage which keeps all the possible matches does not change the matches
+    kept_match = nm.NameMatcher(**kwargs, cascade=[(["overlap"], 30)])
+    kept_match.load_and_process_master_data("company_name", original_name)
+    pd.testing.assert_frame_equal(
+        kept_match.match_names(to_be_matched.copy(), "company_name"), expected
+    )
+
+    cascade_match = nm.NameMatcher(
+        **kwargs, cascade=[(["overlap", "weighted_jaccard"], 10), (["bag"], 5)]
+    )
+    cascade_match.load_and_process_master_data("company_name", original_name)
+    result = cascade_match.match_names(to_be_matched.copy(), "company_name")
+    index_column = "match_index" if number_of_matches == 1 else "match_index_0"
+    assert (result[index_column] == expected[index_column]).mean() > 0.9
+    first_match = cascade_match.match_one(to_be_matched["company_name"].iloc[0])
+    assert first_match[0].match_index == result[index_column].iloc[0]
+
+
+def test_cascade_scored_candidates(original_name, adjusted_name, monkeypatch):
+    name_match = nm.NameMatcher(
+        top_n=30,
+        verbose=False,
+        return_algorithms_score=True,
+        exact_match=False,
+        cascade=[(["overlap", "weighted_jaccard"], 8)],
+    )
+    name_match.load_and_process_master_data("company_name", original_name)
+    scores = name_match.match_names(adjusted_name.iloc[:20].copy(), "company_name")
+    for score in scores:
+        assert score.shape == (30, 5)
+        assert (score > 0).any(axis=1).sum() <= 8
+        assert (score > 0).any()
+
+    scored = []
+    score_pairs = name_match._score_pairs
+
+    def counted_score_pairs(names, possible_names, verbose, methods=None):
+        scored.append((len(names), methods is None))
+        return score_pairs(names, possible_names, verbose, methods)
+
+    monkeypatch.setattr(name_match, "_score_pairs", counted_score_pairs)
+    name_match.match_names(adjusted_name.iloc[:20].copy(), "company_name")
+    # the distance metrics only score the kept possible matches
+    assert scored == [(20 * 30, False), (20 * 8, True)]
+
+
+def test_cascade_match_one_print(capfd, original_name):
+    name_match = nm.NameMatcher(
+        top_n=50, cascade=[(["overlap", "weighted_jaccard"], 10)]
+    )
+    name_match.load_and_process_master_data("company_name", original_name)
+    capfd.readouterr()
+    assert len(name_match.match_one("torphy corkerry holding")) == 1
+    out, err = capfd.readouterr()
+    assert out == ""
+    assert err == ""
+
+
+@pytest.mark.parametrize(
+    "cascade, error",
+    [
+        ([(["overlap"], 2)], ValueError),
+        ([(["overlap"], 2.5)], ValueError),
+        ([([], 10)], ValueError),
+        ([(["quick"], 10)], TypeError),
+    ],
+)
+def test_cascade_error(cascade, error):
+    with pytest.raises(error):
+        nm.NameMatcher(number_of_matches=3, cascade=cascade)
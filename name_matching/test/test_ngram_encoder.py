@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import os.path as path
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from name_matching.ngram_encoder import HashingNgramEncoder, make_ngram_encoder
+
+
+@pytest.fixture
+def names():
+    package_dir = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+    data = pd.read_csv(path.join(package_dir, "test", "test_names.csv"))
+    return data["company_name"].astype(str).tolist() + [
+        "a  \t b",
+        "tab\tname",
+        "x",
+        "",
+        "société   générale",
+    ]
+
+
+@pytest.mark.parametrize("ngram_range", [(2, 3), (1, 1), (3, 5)])
+def test_hashing_encoder_tfidf(names, ngram_range):
+    names = names[:100] + names[-5:]
+    tfidf = TfidfVectorizer(lowercase=False, analyzer="char", ngram_range=ngram_range)
+    expected = tfidf.fit_transform(names)
+    encoder = HashingNgramEncoder(ngram_range=ngram_range, n_features=2**24)
+    result = encoder.fit_transform(names)
+    assert result.dtype == np.float32
+    assert result.shape == (len(names), 2**24)
+    # the comparison is only exact if no two n-grams share a feature
+    assert len(np.unique(result.indices)) == len(tfidf.vocabulary_)
+    assert result.nnz == expected.nnz
+    np.testing.assert_allclose(
+        (result @ result.T).toarray(), (expected @ expected.T).toarray(), atol=1e-6
+    )
+
+
+def test_hashing_encoder_chunks(names):
+    encoder = HashingNgramEncoder(n_features=2**16)
+    expected = encoder.fit_transform(names)
+    chunked = HashingNgramEncoder(n_features=2**16, chunk_size=37, n_jobs=3)
+    result = chunked.fit_transform(names)
+    np.testing.assert_array_equal(chunked.idf_, encoder.idf_)
+    assert abs(result - expected).max() == 0
+    assert abs(chunked.transform(names) - expected).max() == 0
+    assert abs(encoder.fit(names).transform(names) - expected).max() == 0
+
+
+def test_hashing_encoder_errors():
+    with pytest.raises(ValueError):
+        HashingNgramEncoder(ngram_range=(3, 2))
+    with pytest.raises(RuntimeError):
+        HashingNgramEncoder().transform(["name"])
+
+
+def test_make_ngram_encoder():
+    assert isinstance(make_ngram_encoder("tfidf", (2, 3)), TfidfVectorizer)
+    encoder = make_ngram_encoder("hashing", (2, 4), n_jobs=2)
+    assert isinstance(encoder, HashingNgramEncoder)
+    assert (encoder.ngram_range, encoder.n_jobs) == ((2, 4), 2)
+    custom = TfidfVectorizer(analyzer="char_wb")
+    assert make_ngram_encoder(custom, (2, 3)) is custom
+    with pytest.raises(ValueError):
+        make_ngram_encoder("unknown", (2, 3))
+    with pytest.raises(TypeError):
+        make_ngram_encoder(object(), (2, 3))
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from scipy.sparse import csc_matrix
+
+from name_matching.parallel import share_sparse_matrix, attach_sparse_matrix
+
+
+@pytest.mark.parametrize("sparse_format", ["csc", "coo"])
+def test_share_sparse_matrix(sparse_format):
+    matrix = csc_matrix(
+        np.array([[0.0, 0.2, 0.0], [0.5, 0.0, 0.1], [0.0, 0.0, 0.9], [0.3, 0.4, 0.0]])
+    ).asformat(sparse_format)
+    shared_memory_blocks, spec = share_sparse_matrix(matrix)
+    try:
+        attached_memory_blocks, shared_matrix = attach_sparse_matrix(spec)
+        assert shared_matrix.format == sparse_format
+        np.testing.assert_array_equal(shared_matrix.toarray(), matrix.toarray())
+        del shared_matrix
+        for shared_memory in attached_memory_blocks:
+            shared_memory.close()
+    finally:
+        for shared_memory in shared_memory_blocks:
+            shared_memory.close()
+            shared_memory.unlink()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from re import sub
+from unicodedata import normalize
+from name_matching.preprocessing import (
+    NameNormaliser,
+    fold_ascii,
+    normalise_unique,
+    remove_punctuation,
+)
+
+_NAMES = [
+    "Ahmadi, Kroger & Orellana",
+    "  Société Générale S.A.  ",
+    "Ｆｕｌｌｗｉｄｔｈ ﬁnance ½",
+    "Straße-Müller GmbH",
+    "ΣΟΦΙΑ Ltd.",
+    "a .  b",
+    "",
+    "İstanbul Holding",
+    "Société Générale S.A.",
+]
+
+
+def _preprocess(name, lowercase, punctuations, remove_ascii):
+    if lowercase:
+        name = name.lower()
+    if punctuations:
+        name = sub(r"[^\w\s]", "", name).replace("  ", " ").strip()
+    if remove_ascii:
+        name = normalize("NFKD", name).encode("ASCII", "ignore").decode()
+    return name
+
+
+@pytest.mark.parametrize("name", _NAMES)
+def test_remove_punctuation(name):
+    assert remove_punctuation(name) == sub(r"[^\w\s]", "", name)
+
+
+@pytest.mark.parametrize("name", _NAMES)
+def test_fold_ascii(name):
+    expected = normalize("NFKD", name).encode("ASCII", "ignore").decode()
+    assert fold_ascii(name) == expected
+
+
+@pytest.mark.parametrize(
+    "lowercase, punctuations, remove_ascii",
+    [
+        (True, True, True),
+        (False, True, True),
+        (True, False, True),
+        (True, True, False),
+        (False, False, False),
+    ],
+)
+def test_name_normaliser(lowercase, punctuations, remove_ascii):
+    normaliser = NameNormaliser(lowercase, punctuations, remove_ascii)
+    expected = [
+        _preprocess(name, lowercase, punctuations, remove_ascii) for name in _NAMES
+    ]
+    assert [normaliser(name) for name in _NAMES] == expected
+    result = normaliser.normalise_array(np.array(_NAMES, dtype=object))
+    assert result.dtype == object
+    assert result.tolist() == expected
+
+
+def test_normalise_unique():
+    calls = []
+
+    def function(name):
+        calls.append(name)
+        return name.upper()
+
+    names = np.array(["a", "b", np.nan, "a", "b"], dtype=object)
+    result = normalise_unique(names, function)
+    assert sorted(calls) == ["a", "b"]
+    assert result[[0, 1, 3, 4]].tolist() == ["A", "B", "A", "B"]
+    assert pd.isna(result[2])
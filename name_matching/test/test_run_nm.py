@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import os.path as path
 import pytest
@@ -103,3 +104,61 @@ def test_match_names_combine_data_2(original_name, adjusted_name):
     )
     assert len(data_a) == 82
     assert data_a.loc[341, "score"] == 100
+
+
+def test_match_names_group_rows():
+    data = pd.DataFrame({"group": ["b", "a", None, "b", "c", "a"], "x": range(6)})
+    data, group_rows = run_nm._match_names_group_rows(data, "group")
+    assert list(data["x"]) == [0, 3, 1, 5, 4, 2]
+    assert group_rows == {"b": (0, 2), "a": (2, 4), "c": (4, 5)}
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"low_memory": True}, {"min_cosine": 0.5}])
+def test_match_names_groups(original_name, adjusted_name, kwargs):
+    original_name = original_name.iloc[:60].copy()
+    adjusted_name = adjusted_name.iloc[:60].copy()
+    original_name["group"] = original_name.index % 3
+    adjusted_name["group"] = adjusted_name.index % 3
+    # a group without matching data is not matched
+    original_name.loc[original_name.index[:2], "group"] = 5
+    matches = run_nm.match_names(
+        original_name,
+        adjusted_name,
+        "company_name",
+        "company_name",
+        "group",
+        "group",
+        threshold=0,
+        top_n=10,
+        verbose=False,
+        **kwargs,
+    )
+    assert len(matches) > 50
+    assert not matches.index.isin(original_name.index[:2]).any()
+    np.testing.assert_array_equal(
+        adjusted_name.loc[matches["match_index"], "group"].values,
+        original_name.loc[matches.index, "group"].values,
+    )
+
+
+def test_match_names_groups_parallel(original_name, adjusted_name):
+    original_name = original_name.iloc[:100].copy()
+    adjusted_name = adjusted_name.iloc[:100].copy()
+    original_name["group"] = original_name.index % 7
+    adjusted_name["group"] = adjusted_name.index % 7
+    results = [
+        run_nm.match_names(
+            original_name.copy(),
+            adjusted_name.copy(),
+            "company_name",
+            "company_name",
+            "group",
+            "group",
+            threshold=0,
+            top_n=10,
+            verbose=False,
+            n_jobs=n_jobs,
+        )
+        for n_jobs in [1, 2]
+    ]
+    pd.testing.assert_frame_equal(results[1], results[0])
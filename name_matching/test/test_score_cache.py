@@ -0,0 +1,49 @@
+import pickle
+
+from name_matching.score_cache import PairScoreCache, CacheInfo
+
+
+def test_score_cache_get_put():
+    cache = PairScoreCache(maxsize=2)
+    assert cache.get_many([("a", "b")]) == [None]
+    cache.put_many([("a", "b"), ("a", "c")], [[0.1, 0.2], [0.3, 0.4]])
+    assert cache.get_many([("a", "b"), ("a", "c"), ("b", "a")]) == [
+        [0.1, 0.2],
+        [0.3, 0.4],
+        None,
+    ]
+    assert cache.info() == CacheInfo(hits=2, misses=2, maxsize=2, currsize=2)
+
+
+def test_score_cache_least_recently_used():
+    cache = PairScoreCache(maxsize=2)
+    cache.put_many([("a", "b"), ("a", "c")], [[0.1], [0.2]])
+    cache.get_many([("a", "b")])
+    cache.put_many([("a", "d")], [[0.3]])
+    assert cache.get_many([("a", "b"), ("a", "c"), ("a", "d")]) == [
+        [0.1],
+        None,
+        [0.3],
+    ]
+
+
+def test_score_cache_disabled():
+    cache = PairScoreCache()
+    cache.put_many([("a", "b")], [[0.1]])
+    assert cache.get_many([("a", "b")]) == [None]
+    assert cache.info().currsize == 0
+
+
+def test_score_cache_clear():
+    cache = PairScoreCache(maxsize=5)
+    cache.put_many([("a", "b")], [[0.1]])
+    cache.get_many([("a", "b")])
+    cache.clear()
+    assert cache.info() == CacheInfo(hits=0, misses=0, maxsize=5, currsize=0)
+
+
+def test_score_cache_pickle():
+    cache = PairScoreCache(maxsize=5)
+    cache.put_many([("a", "b")], [[0.1]])
+    cache = pickle.loads(pickle.dumps(cache))
+    assert cache.get_many([("a", "b")]) == [[0.1]]
@@ -0,0 +1,130 @@
+import json
+import os.path as path
+import threading
+import urllib.error
+import urllib.request
+import pytest
+import name_matching.name_matcher as nm
+from name_matching.server import MatchService, make_server
+from name_matching.__main__ import main
+
+
+@pytest.fixture
+def index_paths(tmp_path, original_name):
+    paths = []
+    for num, data in enumerate([original_name, original_name.iloc[:50]]):
+        name_match = nm.NameMatcher(verbose=False)
+        name_match.load_and_process_master_data("company_name", data)
+        paths.append(str(tmp_path / f"index_{num}"))
+        name_match.save_index(paths[-1])
+    return paths
+
+
+@pytest.fixture
+def server(index_paths, tmp_path):
+    server = make_server(
+        MatchService(index_paths[0], top_n=10), port=0, reload_root=str(tmp_path)
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, url_path, body=None):
+    url = f"http://127.0.0.1:{server.server_address[1]}{url_path}"
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    try:
+        with urllib.request.urlopen(url, data=data) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_match(server, original_name):
+    names = ["Ahmadi, Kroger and Orellana", original_name["company_name"].iloc[5]]
+    status, content = _request(server, "/match", {"names": names})
+    assert status == 200
+    assert len(content["matches"]) == 2
+    name_match = nm.NameMatcher(top_n=10, verbose=False)
+    name_match.load_and_process_master_data("company_name", original_name)
+    for matches, name in zip(content["matches"], names):
+        expected = name_match.match_one(name)[0]
+        assert matches[0]["match_name"] == expected.match_name
+        assert matches[0]["score"] == pytest.approx(expected.score)
+        assert matches[0]["match_index"] == expected.match_index
+        assert matches[0]["cosine_score"] == pytest.approx(expected.cosine_score)
+
+    status, content = _request(server, "/match", {"name": names[1]})
+    assert status == 200
+    assert content["matches"][0]["score"] == 100
+
+    status, content = _request(server, "/stats")
+    assert status == 200
+    assert content["requests"] == 2
+    assert content["names"] == 3
+    assert content["version"] == 1
+    assert content["latency_p99_ms"] > 0
+
+
+@pytest.mark.parametrize(
+    "url_path, body, status",
+    [
+        ("/match", {"names": "abc"}, 400),
+        ("/match", {"names": [1, 2]}, 400),
+        ("/match", [1], 400),
+        ("/unknown", {"names": ["abc"]}, 404),
+        ("/reload", {"index": 1}, 400),
+        ("/reload", {"index": "does_not_exist"}, 500),
+        ("/reload", {"index": "/does/not/exist"}, 403),
+        ("/reload", {"index": "../index_0"}, 403),
+    ],
+)
+def test_invalid_requests(server, url_path, body, status):
+    assert _request(server, url_path, body)[0] == status
+    assert _request(server, "/health") == (200, {"status": "ok", "version": 1})
+
+
+def test_reload(server, index_paths):
+    errors = []
+
+    def match_repeatedly():
+        for _ in range(10):
+            status, _ = _request(server, "/match", {"names": ["Ahmadi Kroger"]})
+            if status != 200:
+                errors.append(status)
+
+    threads = [threading.Thread(target=match_repeatedly) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    status, content = _request(server, "/reload", {"index": "index_1"})
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert status == 200
+    assert content == {"index": path.realpath(index_paths[1]), "version": 2}
+    status, content = _request(server, "/stats")
+    assert content["index"] == path.realpath(index_paths[1])
+    assert content["requests"] == 30
+    status, content = _request(server, "/match", {"names": ["Ahmadi Kroger"]})
+    assert content["matches"][0][0]["match_index"] < 50
+
+
+def test_reload_disabled(index_paths):
+    server = make_server(MatchService(index_paths[0]), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        status, _ = _request(server, "/reload", {"index": index_paths[1]})
+        assert status == 403
+        assert _request(server, "/health") == (200, {"status": "ok", "version": 1})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_main_arguments():
+    with pytest.raises(SystemExit):
+        main(["serve"])
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix, vstack
+
+import name_matching.sparse_cosine as sparse_cosine
+from name_matching.similarity_join import similarity_join
+
+
+@pytest.fixture
+def vectors(vectors, matrix):
+    # a few vectors equal to a row of the matrix
+    return vstack([vectors[:10], matrix[[40, 41]] * 3, vectors[12:]], format="csr")
+
+
+def _cosine_similarities(matrix, vectors):
+    products = (vectors @ matrix.T).toarray()
+    norms_matrix = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms_vectors = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)))
+    return np.divide(
+        products,
+        norms_vectors * norms_matrix,
+        out=np.zeros_like(products),
+        where=products > 0,
+    )
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+@pytest.mark.parametrize("row_range", [None, (20, 250)])
+@pytest.mark.parametrize("min_similarity", [0.1, 0.3, 0.6, 1])
+def test_similarity_join(
+    numba_available, row_range, min_similarity, monkeypatch, matrix, vectors
+):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    expected = _cosine_similarities(matrix, vectors)
+    start, end = (0, 300) if row_range is None else row_range
+    expected[:, :start] = 0
+    expected[:, end:] = 0
+    # the rounding of a similarity of 1 may be at either side of the cut off
+    expected[np.isclose(expected, 1)] = 1
+    expected[expected < min_similarity] = 0
+
+    pairs = similarity_join(matrix, vectors, min_similarity, row_range=row_range)
+    assert pairs.shape == (25, 300)
+    assert pairs.has_sorted_indices
+    found = pairs.toarray()
+    found[np.isclose(found, 1)] = 1
+    np.testing.assert_array_equal(found > 0, expected > 0)
+    np.testing.assert_array_almost_equal(found, expected)
+    if row_range is None:
+        assert found[10, 40] == 1
+
+
+def test_row_scales(matrix, vectors):
+    row_scales = np.linspace(0.01, 0.02, 300).astype(np.float32)
+    quantised = csr_matrix(matrix)
+    quantised.data = np.rint(quantised.data * 100).astype(np.uint8)
+    scaled = quantised.astype(np.float64).multiply(row_scales[:, None]).tocsr()
+    expected = _cosine_similarities(scaled, vectors)
+    expected[expected < 0.3] = 0
+
+    pairs = similarity_join(quantised, vectors, 0.3, row_scales=row_scales)
+    np.testing.assert_array_almost_equal(pairs.toarray(), expected)
+
+
+def test_errors(matrix, vectors):
+    with pytest.raises(ValueError):
+        similarity_join(matrix, vectors, 0)
+    with pytest.raises(ValueError):
+        similarity_join(matrix, vectors, 1.5)
+    assert similarity_join(matrix, vectors[3], 0.5).nnz == 0
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+@pytest.mark.parametrize("min_similarity", [0.1, 0.3, 0.6])
+def test_self_join(numba_available, min_similarity, monkeypatch, matrix):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    matrix = vstack([matrix, matrix[[40, 41]] * 2], format="csr")
+    expected = np.triu(_cosine_similarities(matrix, matrix), 1)
+    expected[expected < min_similarity] = 0
+
+    pairs = similarity_join(matrix, None, min_similarity)
+    assert pairs.shape == (302, 302)
+    assert pairs.has_sorted_indices
+    found = pairs.toarray()
+    np.testing.assert_array_equal(found > 0, expected > 0)
+    np.testing.assert_array_almost_equal(found, expected)
+    assert found[40, 300] == pytest.approx(1)
@@ -1,10 +1,12 @@
 import numpy as np
 import pytest
-from scipy.sparse import csc_matrix
+from scipy.sparse import csc_matrix, csr_matrix
 
+import name_matching.sparse_cosine as sparse_cosine
 from name_matching.sparse_cosine import (
     _sparse_cosine_top_n_standard,
     _sparse_cosine_low_memory,
+    _sparse_cosine_low_memory_block,
     sparse_cosine_top_n,
 )
 
@@ -166,7 +168,7 @@ def result_c_d4():
 
 @pytest.mark.parametrize("top_n, num_rows", [(10, 10), (10, 8), (10, 7), (10, 1)])
 def test_cosine_standard(top_n, num_rows, mat_a, mat_b, result_a_b):
-    results = _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False)
+    results = _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False)[0]
     for row_0, row_1 in zip(results, result_a_b):
         np.testing.assert_array_equal(np.sort(row_0), np.sort(row_1))
 
@@ -174,27 +176,27 @@ def test_cosine_standard(top_n, num_rows, mat_a, mat_b, result_a_b):
 @pytest.mark.parametrize("top_n, num_rows", [(1, 10), (1, 8), (1, 7), (1, 1)])
 def test_cosine_standard1(top_n, num_rows, mat_a, mat_b, result_a_b1):
     np.testing.assert_array_equal(
-        _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False), result_a_b1
+        _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False)[0], result_a_b1
     )
 
 
 @pytest.mark.parametrize("top_n, num_rows", [(3, 10), (3, 8), (3, 7), (3, 1)])
 def test_cosine_standard3(top_n, num_rows, mat_a, mat_b, result_a_b3):
-    results = _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False)
+    results = _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False)[0]
     for row_0, row_1 in zip(results, result_a_b3):
         np.testing.assert_array_equal(np.sort(row_0), np.sort(row_1))
 
 
 @pytest.mark.parametrize("top_n, num_rows", [(7, 10), (6, 8), (9, 7), (6, 1)])
 def test_cosine_standard_c(top_n, num_rows, mat_c, mat_d, result_c_d):
-    results = _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False)[:, :6]
+    results = _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False)[0][:, :6]
     for row_0, row_1 in zip(results, result_c_d):
         np.testing.assert_array_equal(np.sort(row_0), np.sort(row_1))
 
 
 @pytest.mark.parametrize("top_n, num_rows", [(4, 5), (4, 4), (4, 3), (4, 1)])
 def test_cosine_standard_c4(top_n, num_rows, mat_c, mat_d, result_c_d4):
-    results = _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False)
+    results = _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False)[0]
     for row_0, row_1 in zip(results, result_c_d4):
         np.testing.assert_array_equal(np.sort(row_0), np.sort(row_1))
 
@@ -202,7 +204,7 @@ def test_cosine_standard_c4(top_n, num_rows, mat_c, mat_d, result_c_d4):
 @pytest.mark.parametrize("top_n, num_rows", [(1, 10), (1, 3), (1, 2), (1, 1)])
 def test_cosine_standard_c1(top_n, num_rows, mat_c, mat_d, result_c_d1):
     np.testing.assert_array_equal(
-        _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False), result_c_d1
+        _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False)[0], result_c_d1
     )
 
 
@@ -242,15 +244,15 @@ def test_cosine_top_n_cd(top_n, num_rows, row, mat_c, mat_d):
         assert_values_in_array(
             sparse_cosine_top_n(
                 mat_c.tocoo(), mat_d[row, :].tocsr(), top_n, True, num_rows, False
-            ).reshape(1, -1),
+            )[0].reshape(1, -1),
             _sparse_cosine_top_n_standard(
                 mat_c, mat_d[row, :], num_rows + 1, top_n, False
-            ),
+            )[0],
         )
     else:
         np.testing.assert_array_equal(
-            sparse_cosine_top_n(mat_c, mat_d, top_n, False, num_rows, False),
-            _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False),
+            sparse_cosine_top_n(mat_c, mat_d, top_n, False, num_rows, False)[0],
+            _sparse_cosine_top_n_standard(mat_c, mat_d, num_rows, top_n, False)[0],
         )
 
 
@@ -275,13 +277,291 @@ def test_cosine_top_n_ab(top_n, num_rows, row, mat_a, mat_b):
         assert_values_in_array(
             sparse_cosine_top_n(
                 mat_a.tocoo(), mat_b[row, :].tocsr(), top_n, True, num_rows, False
-            ).reshape(1, -1),
+            )[0].reshape(1, -1),
             _sparse_cosine_top_n_standard(
                 mat_a, mat_b[row, :], num_rows + 1, top_n, False
-            ),
+            )[0],
         )
     else:
         np.testing.assert_array_equal(
-            sparse_cosine_top_n(mat_a, mat_b, top_n, False, num_rows, False),
-            _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False),
+            sparse_cosine_top_n(mat_a, mat_b, top_n, False, num_rows, False)[0],
+            _sparse_cosine_top_n_standard(mat_a, mat_b, num_rows, top_n, False)[0],
         )
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+def test_cosine_low_memory_block(numba_available, monkeypatch, mat_a, mat_b):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    mat_a_co = mat_a.tocoo()
+    mat_b_csr = mat_b.tocsr()
+    low_memory_result = _sparse_cosine_low_memory_block(
+        matrix_row=mat_a_co.row,
+        matrix_col=mat_a_co.col,
+        matrix_data=mat_a_co.data,
+        matrix_len=mat_a_co.shape[0],
+        vector_ptr=mat_b_csr.indptr,
+        vector_ind=mat_b_csr.indices,
+        vector_data=mat_b_csr.data,
+    )
+    np.testing.assert_array_almost_equal(
+        low_memory_result, (mat_b * mat_a.T).toarray(), decimal=5
+    )
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+def test_cosine_low_memory_empty_vector(numba_available, monkeypatch, mat_a):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    mat_a_co = mat_a.tocoo()
+    low_memory_result = _sparse_cosine_low_memory(
+        matrix_row=mat_a_co.row,
+        matrix_col=mat_a_co.col,
+        matrix_data=mat_a_co.data,
+        matrix_len=mat_a_co.shape[0],
+        vector_ind=np.array([], dtype=np.int32),
+        vector_data=np.array([], dtype=np.float64),
+    )
+    np.testing.assert_array_equal(low_memory_result, np.zeros(10))
+
+
+@pytest.mark.parametrize("buffer_size, top_n", [(10, 3), (25, 1), (1000, 4)])
+def test_cosine_top_n_low_memory_blocks(
+    buffer_size, top_n, monkeypatch, mat_a, mat_b
+):
+    monkeypatch.setattr(sparse_cosine, "_LOW_MEMORY_BUFFER_SIZE", buffer_size)
+    results = sparse_cosine_top_n(mat_a.tocoo(), mat_b.tocsr(), top_n, True, 0, False)[0]
+    assert results.shape == (10, top_n)
+    for row in range(10):
+        assert_values_in_array(
+            results[row : row + 1],
+            _sparse_cosine_top_n_standard(mat_a, mat_b[row, :], 1, top_n, False)[0],
+        )
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+@pytest.mark.parametrize(
+    "top_n, num_rows, n_threads", [(3, 10, 1), (1, 2, 1), (4, 3, 3), (12, 1, 2)]
+)
+def test_cosine_standard_kernel(
+    numba_available, top_n, num_rows, n_threads, monkeypatch, mat_a, mat_b
+):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    results = _sparse_cosine_top_n_standard(
+        mat_a, mat_b, num_rows, top_n, False, n_threads=n_threads
+    )[0]
+    similarity = (mat_b * mat_a.T).toarray()
+    assert results.shape == (10, top_n)
+    for row in range(10):
+        expected = np.sort(similarity[row])[::-1][:top_n]
+        expected = expected[expected > 0]
+        np.testing.assert_array_almost_equal(
+            similarity[row, results[row, : len(expected)].astype(int)], expected
+        )
+        np.testing.assert_array_equal(results[row, len(expected) :], 0)
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+def test_cosine_standard_min_similarity(numba_available, monkeypatch, mat_a, mat_b):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    results = sparse_cosine_top_n(
+        mat_a, mat_b, 10, False, 5, False, min_similarity=1.5
+    )[0]
+    similarity = (mat_b * mat_a.T).toarray()
+    for row in range(10):
+        number_above = np.sum(similarity[row] >= 1.5)
+        assert np.all(
+            similarity[row, results[row, :number_above].astype(int)] >= 1.5
+        )
+        np.testing.assert_array_equal(results[row, number_above:], 0)
+
+
+def test_cosine_standard_numpy_split(monkeypatch, mat_a, mat_b):
+    monkeypatch.setattr(sparse_cosine, "_numba_available", False)
+    expected = _sparse_cosine_top_n_standard(mat_a, mat_b, 10, 3, False)[0]
+    monkeypatch.setattr(sparse_cosine, "_TOP_N_BUFFER_SIZE", 5)
+    np.testing.assert_array_equal(
+        _sparse_cosine_top_n_standard(mat_a, mat_b, 10, 3, False)[0], expected
+    )
+
+
+@pytest.mark.parametrize(
+    "low_memory, min_similarity", [(True, 0), (False, 0), (True, 1.5), (False, 1.5)]
+)
+def test_cosine_top_n_scores(low_memory, min_similarity, mat_a, mat_b):
+    matrix_a = mat_a.tocoo() if low_memory else mat_a
+    indices, scores = sparse_cosine_top_n(
+        matrix_a, mat_b, 4, low_memory, 3, False, min_similarity=min_similarity
+    )
+    similarity = (mat_b * mat_a.T).toarray()
+    assert np.issubdtype(indices.dtype, np.integer)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+    np.testing.assert_array_almost_equal(
+        np.where(scores > 0, np.take_along_axis(similarity, indices, axis=1), 0),
+        scores,
+        decimal=5,
+    )
+    np.testing.assert_array_almost_equal(
+        scores[:, 0],
+        np.where(similarity.max(axis=1) >= min_similarity, similarity.max(axis=1), 0),
+        decimal=5,
+    )
+    assert np.all(indices[scores == 0] == 0)
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+@pytest.mark.parametrize("low_memory", [True, False])
+@pytest.mark.parametrize("row_range", [(0, 10), (3, 8), (9, 10), (2, 4)])
+def test_cosine_top_n_row_range(
+    numba_available, low_memory, row_range, monkeypatch, mat_a, mat_b
+):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    start, end = row_range
+    matrix_a = mat_a.tocoo() if low_memory else mat_a
+    indices, scores = sparse_cosine_top_n(
+        matrix_a, mat_b, 3, low_memory, 4, False, row_range=row_range
+    )
+    sliced_a = mat_a[start:end].tocoo() if low_memory else mat_a[start:end]
+    expected_indices, expected_scores = sparse_cosine_top_n(
+        sliced_a, mat_b, 3, low_memory, 4, False
+    )
+    np.testing.assert_array_almost_equal(scores, expected_scores)
+    np.testing.assert_array_equal(indices, expected_indices + start)
+    assert np.all((indices >= start) & (indices < end))
+
+
+def test_cosine_top_n_low_memory_row_range_width(monkeypatch, mat_a, mat_b):
+    widths = []
+    low_memory_block = sparse_cosine._sparse_cosine_low_memory_block
+
+    def recorded_block(*args):
+        widths.append(args[3])
+        return low_memory_block(*args)
+
+    monkeypatch.setattr(
+        sparse_cosine, "_sparse_cosine_low_memory_block", recorded_block
+    )
+    sparse_cosine_top_n(mat_a.tocoo(), mat_b, 3, True, 0, False, row_range=(3, 8))
+    # only the rows within the range are accumulated
+    assert set(widths) == {5}
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+@pytest.mark.parametrize("low_memory", [True, False])
+@pytest.mark.parametrize("row_range", [None, (2, 9)])
+def test_cosine_top_n_candidate_mask(
+    numba_available, low_memory, row_range, monkeypatch, mat_a, mat_b
+):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    rng = np.random.default_rng(3)
+    candidate_mask = rng.random((3, 10)) > 0.4
+    mask_groups = rng.integers(0, 3, 10)
+    matrix_a = mat_a.tocoo() if low_memory else mat_a
+    indices, scores = sparse_cosine_top_n(
+        matrix_a,
+        mat_b,
+        4,
+        low_memory,
+        3,
+        False,
+        row_range=row_range,
+        candidate_mask=candidate_mask,
+        mask_groups=mask_groups,
+    )
+    start, end = (0, 10) if row_range is None else row_range
+    similarity = (mat_b * mat_a.T).toarray()
+    similarity[:, :start] = 0
+    similarity[:, end:] = 0
+    similarity[~candidate_mask[mask_groups]] = 0
+    for row in range(10):
+        expected = np.sort(similarity[row])[::-1][:4]
+        np.testing.assert_array_almost_equal(scores[row], expected)
+        found = indices[row][scores[row] > 0]
+        assert np.all(candidate_mask[mask_groups[row], found])
+        np.testing.assert_array_almost_equal(
+            similarity[row, found], expected[: len(found)]
+        )
+
+
+def test_cosine_top_n_candidate_mask_global(mat_a, mat_b):
+    candidate_mask = np.arange(10) % 2 == 0
+    indices, scores = sparse_cosine_top_n(
+        mat_a, mat_b, 3, False, 5, False, candidate_mask=candidate_mask
+    )
+    assert np.all(indices[scores > 0] % 2 == 0)
+    with pytest.raises(ValueError):
+        sparse_cosine_top_n(
+            mat_a, mat_b, 3, False, 5, False, candidate_mask=candidate_mask[:5]
+        )
+    with pytest.raises(ValueError):
+        sparse_cosine_top_n(
+            mat_a,
+            mat_b,
+            3,
+            False,
+            5,
+            False,
+            candidate_mask=candidate_mask,
+            mask_groups=np.ones(10),
+        )
+
+
+@pytest.mark.parametrize("numba_available", [True, False])
+@pytest.mark.parametrize("low_memory", [True, False])
+@pytest.mark.parametrize("row_range", [None, (2, 9)])
+def test_cosine_top_n_row_scales(
+    numba_available, low_memory, row_range, monkeypatch, mat_a, mat_b
+):
+    monkeypatch.setattr(
+        sparse_cosine,
+        "_numba_available",
+        numba_available & sparse_cosine._numba_available,
+    )
+    row_scales = np.linspace(0.5, 2, 10).astype(np.float32)
+    quantised = csr_matrix(mat_a)
+    quantised.data = np.rint(quantised.data * 10).astype(np.uint8)
+    scaled = csr_matrix(quantised.astype(np.float64).multiply(row_scales[:, None]))
+    quantised = quantised.tocsc()
+    indices, scores = sparse_cosine_top_n(
+        quantised.tocoo() if low_memory else quantised,
+        mat_b,
+        3,
+        low_memory,
+        4,
+        False,
+        row_range=row_range,
+        row_scales=row_scales,
+    )
+    expected_indices, expected_scores = sparse_cosine_top_n(
+        scaled.tocsc().tocoo() if low_memory else scaled.tocsc(),
+        mat_b,
+        3,
+        low_memory,
+        4,
+        False,
+        row_range=row_range,
+    )
+    np.testing.assert_array_almost_equal(scores, expected_scores, decimal=5)
+    np.testing.assert_array_equal(indices, expected_indices)
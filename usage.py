@@ -304,18 +304,17 @@ class CompanyMatcher:
         # Normalize and tokenize the input
         user_input_segmented = self.company_words_regulator(user_input)
         user_input_segmented = " ".join(jieba.cut(user_input_segmented))
-        to_be_matched = pd.DataFrame({"name": [user_input_segmented]})
 
         # Matches the name entered by the user
-        result = self.matcher.match_names(to_be_matched, column_matching="name")
+        result = self.matcher.match_one(user_input_segmented)
 
         # No match, returns an empty string
-        if result.empty:
+        if not result:
             return ''
 
         # Get the best matching results
-        best_match = result.iloc[0]["match_name"]
-        match_score = result.iloc[0]["score"]
+        best_match = result[0].match_name
+        match_score = result[0].score
 
         # If the match score exceeds the threshold, it is considered a successful match.
         if match_score >= threshold: